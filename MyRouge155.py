@@ -8,6 +8,7 @@ import platform
 from subprocess import check_output
 from tempfile import mkdtemp
 from functools import partial
+from itertools import chain
 import subprocess
 try:
     from configparser import ConfigParser
@@ -16,6 +17,7 @@ except ImportError:
 
 from pyrouge.utils import log
 from pyrouge.utils.file_utils import DirectoryProcessor
+from pyrouge.utils.file_utils import ModelFilenameIndex
 from pyrouge.utils.file_utils import verify_dir
 
 
@@ -258,35 +260,18 @@ class MyRouge155(object):
                                         will appear in the ROUGE output.
 
         """
-        system_filenames = [f for f in os.listdir(system_dir)]
-        system_models_tuples = []
-
-        system_filename_pattern = re.compile(system_filename_pattern)
-        for system_filename in sorted(system_filenames):
-            match = system_filename_pattern.match(system_filename)
-            if match:
-                id = match.groups(0)[0]
-                model_filenames = MyRouge155.__get_model_filenames_for_id(
-                    id, model_dir, model_filename_pattern)
-                system_models_tuples.append(
-                    (system_filename, sorted(model_filenames)))
-        if not system_models_tuples:
+        system_models_tuples = MyRouge155.__iter_system_models_tuples(
+            system_dir, system_filename_pattern,
+            model_dir, model_filename_pattern)
+        first_tuple = next(system_models_tuples, None)
+        if first_tuple is None:
             raise Exception(
                 "Did not find any files matching the pattern {} "
                 "in the system summaries directory {}.".format(
-                    system_filename_pattern.pattern, system_dir))
-
-        with codecs.open(config_file_path, 'w', encoding='utf-8') as f:
-            f.write('<ROUGE-EVAL version="1.55">')
-            for task_id, (system_filename, model_filenames) in enumerate(
-                    system_models_tuples, start=1):
-
-                eval_string = MyRouge155.__get_eval_string(
-                    task_id, system_id,
-                    system_dir, system_filename,
-                    model_dir, model_filenames)
-                f.write(eval_string)
-            f.write("</ROUGE-EVAL>")
+                    system_filename_pattern, system_dir))
+        MyRouge155.__write_config_entries(
+            config_file_path, system_id, system_dir, model_dir,
+            chain([first_tuple], system_models_tuples))
 
     def write_config(self, config_file_path=None, system_id=None):
         """
@@ -480,6 +465,52 @@ class MyRouge155(object):
         rouge_home_dir = config.get('pyrouge settings', 'home_dir')
         return rouge_home_dir
 
+    @staticmethod
+    def __iter_system_models_tuples(system_dir, system_filename_pattern,
+                                    model_dir, model_filename_pattern):
+        """
+        Lazily yield (system_filename, model_filenames) tuples for the
+        system summaries matching system_filename_pattern, in sorted
+        filename order.
+
+        """
+        model_index = ModelFilenameIndex(model_dir, model_filename_pattern)
+        system_filename_pattern = re.compile(system_filename_pattern)
+        for system_filename in sorted(os.listdir(system_dir)):
+            match = system_filename_pattern.match(system_filename)
+            if match:
+                id = match.groups(0)[0]
+                yield system_filename, model_index.filenames_for_id(id)
+
+    @staticmethod
+    def __write_config_entries(config_file_path, system_id,
+                               system_dir, model_dir, system_models_tuples,
+                               buffer_size=1 << 20):
+        """
+        Write one <EVAL> element per (system_filename, model_filenames)
+        tuple through a buffered writer, consuming the tuples as they are
+        produced. A partially written configuration file is removed if
+        finding the model summaries fails. The file is opened before that
+        guard, so that an error opening it is raised unchanged.
+
+        """
+        f = codecs.open(config_file_path, 'w', encoding='utf-8',
+                        buffering=buffer_size)
+        try:
+            with f:
+                f.write('<ROUGE-EVAL version="1.55">')
+                for task_id, (system_filename, model_filenames) in enumerate(
+                        system_models_tuples, start=1):
+                    f.write(MyRouge155.__get_eval_string(
+                        task_id, system_id,
+                        system_dir, system_filename,
+                        model_dir, model_filenames))
+                f.write("</ROUGE-EVAL>")
+        except Exception:
+            if os.path.exists(config_file_path):
+                os.remove(config_file_path)
+            raise
+
     @staticmethod
     def __get_eval_string(
             task_id, system_id,
@@ -556,18 +587,6 @@ class MyRouge155(object):
         self.log.info("Writing summaries.")
         self.__process_summaries(self.convert_summaries_to_rouge_format)
 
-    @staticmethod
-    def __get_model_filenames_for_id(id, model_dir, model_filenames_pattern):
-        pattern = re.compile(model_filenames_pattern.replace('#ID#', id))
-        model_filenames = [
-            f for f in os.listdir(model_dir) if pattern.match(f)]
-        if not model_filenames:
-            raise Exception(
-                "Could not find any model summaries for the system"
-                " summary with ID {}. Specified model filename pattern was: "
-                "{}".format(id, model_filenames_pattern))
-        return model_filenames
-
     def __get_options(self, rouge_args=None):
         """
         Get supplied command line arguments for ROUGE or use default
@@ -735,7 +754,7 @@ class MyRouge155(object):
 ##        model_filenames_pattern = r'p14-#ID#.xhtml.[A-Z].html'
 ##        system_filename_pattern =r'P14-(\d+).xhtml.html.0[1-7]'
 ##        perlpathname=r'D:\Perl\bin\perl'
-        system_filenames = os.listdir(system_dir)
+        system_filenames = sorted(os.listdir(system_dir))
         all_id_system_file =[]
         for eachdir in system_idset:
 #            systempattern = r'P14-(\d+).xhtml.html.'+eachdir
@@ -743,7 +762,7 @@ class MyRouge155(object):
             system_re = re.compile(syspattern)
         #    print(syspattern)
             id_file_set = []
-            for system_filename in sorted(system_filenames):
+            for system_filename in system_filenames:
        #         print(system_filename)
 
                 match = system_re.match(system_filename)
@@ -757,8 +776,9 @@ class MyRouge155(object):
         model_files_for_each_system = []
         i = 0;
         model_system_tuple = []
+        model_index = ModelFilenameIndex(model_dir, model_filenames_pattern)
         for eachsystem in all_id_system_file[0]:
-            model_file_set = MyRouge155.__get_model_filenames_for_id(eachsystem[0],model_dir,model_filenames_pattern)
+            model_file_set = model_index.filenames_for_id(eachsystem[0])
             system_id_set = []
             for eachsystemset in all_id_system_file:
                 system_id_set.append(eachsystemset[i])
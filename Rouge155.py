@@ -3,20 +3,69 @@ from __future__ import print_function, unicode_literals, division
 import os
 import re
 import codecs
+import errno
+import hashlib
 import platform
+import shutil
+import xml.etree.ElementTree as et
 
+from collections import OrderedDict
+from itertools import chain
 from subprocess import check_output
-from tempfile import mkdtemp
 from functools import partial
+from multiprocessing.pool import ThreadPool
 import subprocess
 try:
     from configparser import ConfigParser
 except ImportError:
     from ConfigParser import ConfigParser
 
+from pyrouge.scoring.rouge_scorer import RougeScorer
+from pyrouge.scoring.tokenization import summary_sentences
 from pyrouge.utils import log
 from pyrouge.utils.file_utils import DirectoryProcessor
+from pyrouge.utils.file_utils import ModelFilenameIndex
+from pyrouge.utils.file_utils import dir_fingerprint
+from pyrouge.utils.file_utils import model_filename_filter
 from pyrouge.utils.file_utils import verify_dir
+from pyrouge.utils.rouge_output import eval_id_sort_key
+from pyrouge.utils.rouge_output import format_average_scores
+from pyrouge.utils.rouge_output import averages_to_dict
+from pyrouge.utils.rouge_output import iter_output_records
+from pyrouge.utils.rouge_output import parse_per_document_scores
+from pyrouge.utils.rouge_worker import RougeWorkerPool
+from pyrouge.utils.summary_sources import open_summary_source
+from pyrouge.utils.workspace import Workspace
+
+
+def convert_text_to_rouge_format(text, title="dummy title"):
+    """
+    Convert a text to a format ROUGE understands. The text is
+    assumed to contain one sentence per line.
+
+        text:   The text to convert, containg one sentence per line.
+        title:  Optional title for the text. The title will appear
+                in the converted file, but doesn't seem to have
+                any other relevance.
+
+    Returns: The converted text as string.
+
+    """
+    sentences = text.split("\n")
+    sent_elems = [
+        "<a name=\"{i}\">[{i}]</a> <a href=\"#{i}\" id={i}>"
+        "{text}</a>".format(i=i, text=sent)
+        for i, sent in enumerate(sentences, start=1)]
+    html = """<html>
+<head>
+<title>{title}</title>
+</head>
+<body bgcolor="white">
+{elems}
+</body>
+</html>""".format(title=title, elems="\n".join(sent_elems))
+
+    return html
 
 
 class Rouge155(object):
@@ -89,6 +138,50 @@ class Rouge155(object):
         self.args = self.__clean_rouge_args(rouge_args)
         self._system_filename_pattern = None
         self._model_filename_pattern = None
+        self._config_cache = {}
+        self._config_cache_dir = None
+        self._worker_pool = None
+        self._scorers = {}
+        self._conversion_workers = 1
+        self._conversion_cache_dir = None
+        self._conversion_cache_hash = False
+        self._workspace = None
+        self._summaries_dir = None
+        self._summaries_on_disk = False
+        # The system and model directories the summaries in the
+        # workspace were converted from.
+        self._source_dirs = (None, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """
+        Stop the ROUGE workers and remove the workspace with all
+        converted summaries and configuration files written in it.
+        system_dir and model_dir are set back to the directories the
+        summaries were converted from, and config_file is cleared if it
+        was in the workspace, so using the object afterwards starts a
+        new workspace.
+
+        """
+        self.stop_workers()
+        if self._workspace is not None:
+            self._system_dir, self._model_dir = [
+                source if self._workspace.contains(path) else path
+                for path, source in zip(
+                    (self._system_dir, self._model_dir), self._source_dirs)]
+            if self._workspace.contains(self._config_file):
+                self._config_file = None
+            self._workspace.close()
+            self._workspace = None
+        self._source_dirs = (None, None)
+        self._config_cache = {}
+        self._summaries_dir = None
+        self._summaries_on_disk = False
 
     def save_home_dir(self):
         config = ConfigParser()
@@ -172,22 +265,105 @@ class Rouge155(object):
         verify_dir(config_dir, "configuration file")
         self._config_file = path
 
+    @property
+    def config_cache_dir(self):
+        """
+        Optional directory in which generated configuration files are
+        kept across Rouge155 instances and processes. If it is not set,
+        configuration files are only reused within this instance.
+
+        """
+        return self._config_cache_dir
+
+    @config_cache_dir.setter
+    def config_cache_dir(self, path):
+        if path is not None:
+            verify_dir(path, "configuration cache")
+        self._config_cache_dir = path
+
+    @property
+    def conversion_cache_dir(self):
+        """
+        Optional directory in which the sentence split and converted
+        summaries of split_sentences() and convert_and_evaluate() are
+        kept across runs. Repeated runs then only process the summaries
+        which changed, as detected by their size and modification time,
+        or by their contents if conversion_cache_hash is set. If it is
+        not set, every run processes all summaries into a new temporary
+        directory.
+
+        """
+        return self._conversion_cache_dir
+
+    @conversion_cache_dir.setter
+    def conversion_cache_dir(self, path):
+        if path is not None:
+            verify_dir(path, "conversion cache")
+        self._conversion_cache_dir = path
+
+    @property
+    def conversion_cache_hash(self):
+        """
+        Whether the conversion cache compares the contents of summaries
+        whose modification time changed, False by default.
+
+        """
+        return self._conversion_cache_hash
+
+    @conversion_cache_hash.setter
+    def conversion_cache_hash(self, content_hash):
+        self._conversion_cache_hash = content_hash
+
+    @property
+    def workspace(self):
+        """
+        The Workspace in which this object writes converted summaries,
+        configuration files and ROUGE shard files, in a RAM-backed
+        directory such as /dev/shm if there is one. It is created on
+        first use, shared by all evaluations of this object and removed
+        by close(), e.g. at the end of a with statement:
+
+        with Rouge155() as rouge:
+            ...
+
+        """
+        if self._workspace is None or self._workspace.closed:
+            self._workspace = Workspace()
+        return self._workspace
+
+    @workspace.setter
+    def workspace(self, workspace):
+        self._workspace = workspace
+
+    @property
+    def conversion_workers(self):
+        """
+        Number of processes which split sentences and convert summaries
+        to ROUGE's format in split_sentences() and
+        convert_and_evaluate(), 1 by default.
+
+        """
+        return self._conversion_workers
+
+    @conversion_workers.setter
+    def conversion_workers(self, workers):
+        if workers < 1:
+            raise Exception(
+                "The number of conversion workers must be at least 1.")
+        self._conversion_workers = workers
+
     def split_sentences(self):
         """
         ROUGE requires texts split into sentences. In case the texts
         are not already split, this method can be used.
 
         """
-        from pyrouge.utils.sentence_splitter import PunktSentenceSplitter
+        from pyrouge.utils.sentence_splitter import split_to_string
         self.log.info("Splitting sentences.")
-        ss = PunktSentenceSplitter()
-        sent_split_to_string = lambda s: "\n".join(ss.split(s))
-        process_func = partial(
-            DirectoryProcessor.process, function=sent_split_to_string)
-        self.__process_summaries(process_func)
+        self.__process_summaries(split_to_string, "sentences")
 
     @staticmethod
-    def convert_summaries_to_rouge_format(input_dir, output_dir):
+    def convert_summaries_to_rouge_format(input_dir, output_dir, workers=1):
         """
         Convert all files in input_dir into a format ROUGE understands
         and saves the files to output_dir. The input files are assumed
@@ -196,40 +372,22 @@ class Rouge155(object):
             input_dir:  Path of directory containing the input files.
             output_dir: Path of directory in which the converted files
                         will be saved.
+            workers:    Number of processes converting the files.
 
         """
         DirectoryProcessor.process(
-            input_dir, output_dir, Rouge155.convert_text_to_rouge_format)
+            input_dir, output_dir, convert_text_to_rouge_format, workers)
 
     @staticmethod
     def convert_text_to_rouge_format(text, title="dummy title"):
         """
-        Convert a text to a format ROUGE understands. The text is
-        assumed to contain one sentence per line.
-
-            text:   The text to convert, containg one sentence per line.
-            title:  Optional title for the text. The title will appear
-                    in the converted file, but doesn't seem to have
-                    any other relevance.
-
-        Returns: The converted text as string.
+        Convert a text to a format ROUGE understands (cf. the
+        module-level convert_text_to_rouge_format, which, unlike this
+        static method, can be pickled for worker processes under
+        Python 2).
 
         """
-        sentences = text.split("\n")
-        sent_elems = [
-            "<a name=\"{i}\">[{i}]</a> <a href=\"#{i}\" id={i}>"
-            "{text}</a>".format(i=i, text=sent)
-            for i, sent in enumerate(sentences, start=1)]
-        html = """<html>
-<head>
-<title>{title}</title>
-</head>
-<body bgcolor="white">
-{elems}
-</body>
-</html>""".format(title=title, elems="\n".join(sent_elems))
-
-        return html
+        return convert_text_to_rouge_format(text, title)
 
     @staticmethod
     def write_config_static(system_dir, system_filename_pattern,
@@ -258,35 +416,18 @@ class Rouge155(object):
                                         will appear in the ROUGE output.
 
         """
-        system_filenames = [f for f in os.listdir(system_dir)]
-        system_models_tuples = []
-
-        system_filename_pattern = re.compile(system_filename_pattern)
-        for system_filename in sorted(system_filenames):
-            match = system_filename_pattern.match(system_filename)
-            if match:
-                id = match.groups(0)[0]
-                model_filenames = Rouge155.__get_model_filenames_for_id(
-                    id, model_dir, model_filename_pattern)
-                system_models_tuples.append(
-                    (system_filename, sorted(model_filenames)))
-        if not system_models_tuples:
+        system_models_tuples = Rouge155.__iter_system_models_tuples(
+            system_dir, system_filename_pattern,
+            model_dir, model_filename_pattern)
+        first_tuple = next(system_models_tuples, None)
+        if first_tuple is None:
             raise Exception(
                 "Did not find any files matching the pattern {} "
                 "in the system summaries directory {}.".format(
-                    system_filename_pattern.pattern, system_dir))
-
-        with codecs.open(config_file_path, 'w', encoding='utf-8') as f:
-            f.write('<ROUGE-EVAL version="1.55">')
-            for task_id, (system_filename, model_filenames) in enumerate(
-                    system_models_tuples, start=1):
-
-                eval_string = Rouge155.__get_eval_string(
-                    task_id, system_id,
-                    system_dir, system_filename,
-                    model_dir, model_filenames)
-                f.write(eval_string)
-            f.write("</ROUGE-EVAL>")
+                    system_filename_pattern, system_dir))
+        Rouge155.__write_config_entries(
+            config_file_path, system_id, system_dir, model_dir,
+            chain([first_tuple], system_models_tuples))
     @staticmethod
     def write_config_staticA(system_dir, system_filename_pattern,
                             model_dir, model_filename_pattern,
@@ -314,35 +455,18 @@ class Rouge155(object):
                                         will appear in the ROUGE output.
 
         """
-        system_filenames = [f for f in os.listdir(system_dir)]
-        system_models_tuples = []
-
-        system_filename_pattern = re.compile(system_filename_pattern)
-        for system_filename in sorted(system_filenames):
-            match = system_filename_pattern.match(system_filename)
-            if match:
-                id = match.groups(0)[0]
-                model_filenames = Rouge155.__get_model_filenames_for_id(
-                    id, model_dir, model_filename_pattern)
-                system_models_tuples.append(
-                    (system_filename, sorted(model_filenames)))
-        if not system_models_tuples:
+        system_models_tuples = Rouge155.__iter_system_models_tuples(
+            system_dir, system_filename_pattern,
+            model_dir, model_filename_pattern)
+        first_tuple = next(system_models_tuples, None)
+        if first_tuple is None:
             raise Exception(
                 "Did not find any files matching the pattern {} "
                 "in the system summaries directory {}.".format(
-                    system_filename_pattern.pattern, system_dir))
-
-        with codecs.open(config_file_path, 'w', encoding='utf-8') as f:
-            f.write('<ROUGE-EVAL version="1.55">')
-            for task_id, (system_filename, model_filenames) in enumerate(
-                    system_models_tuples, start=1):
-
-                eval_string = Rouge155.__get_eval_string(
-                    task_id, system_id,
-                    system_dir, system_filename,
-                    model_dir, model_filenames)
-                f.write(eval_string)
-            f.write("</ROUGE-EVAL>")
+                    system_filename_pattern, system_dir))
+        Rouge155.__write_config_entries(
+            config_file_path, system_id, system_dir, model_dir,
+            chain([first_tuple], system_models_tuples))
 
     def write_config(self, config_file_path=None, system_id=None):
         """
@@ -350,6 +474,10 @@ class Rouge155(object):
         of system summary files and their matching model summary files.
 
         This is a non-static version of write_config_file_static().
+        If no config_file_path is given, a configuration file written
+        earlier for the same directories, filename patterns and system
+        ID is reused as long as the summary files are unchanged (cf.
+        config_cache_dir).
 
             config_file_path:   Path of the configuration file.
             system_id:          Optional system ID string which will
@@ -361,11 +489,9 @@ class Rouge155(object):
         if not system_id:
             system_id = 1
         if (not config_file_path) or (not self._config_dir):
-            self._config_dir = mkdtemp()
-            config_filename = "rouge_conf.xml"
-        else:
-            config_dir, config_filename = os.path.split(config_file_path)
-            verify_dir(config_dir, "configuration file")
+            self.__write_cached_config(system_id)
+            return
+        verify_dir(self._config_dir, "configuration file")
         self._config_file = os.path.join(self._config_dir, config_filename)
         Rouge155.write_config_static(
             self._system_dir, self._system_filename_pattern,
@@ -374,7 +500,7 @@ class Rouge155(object):
         self.log.info(
             "Written ROUGE configuration to {}".format(self._config_file))
 
-    def evaluate(self, system_id='None',conf_path = None, PerlPath =ur'D:\Perl\bin\perl', rouge_args=None ):
+    def evaluate(self, system_id='None',conf_path = None, PerlPath =ur'D:\Perl\bin\perl', rouge_args=None, parallel=None):
         """
         Run ROUGE to evaluate the system summaries in system_dir against
         the model summaries in model_dir. The summaries are assumed to
@@ -382,19 +508,143 @@ class Rouge155(object):
 
             system_id:  Optional system ID which will be printed in
                         ROUGE's output.
+            parallel:   Optional number of ROUGE processes. If it is
+                        larger than 1, the <EVAL> entries of the
+                        configuration file are split into that many
+                        shards which are evaluated concurrently, and the
+                        per-document scores of the shards are merged
+                        into one output (cf. __evaluate_sharded).
 
         Returns: Rouge output as string.
 
         """
         self.write_config(system_id=system_id, config_file_path = conf_path)
         options = self.__get_options(rouge_args)
+        if parallel and parallel > 1:
+            return self.__evaluate_sharded(PerlPath, options, parallel)
         command = [PerlPath] + [self._bin_path] + options
         print(command)
         self.log.info(
             "Running ROUGE with command {}".format(" ".join(command)))
-        rouge_output = check_output(command).decode("UTF-8")
+        rouge_output = self.__run_rouge(PerlPath, options).decode("UTF-8")
         return rouge_output
 
+    def evaluate_stream(self, system_id=1, conf_path=None,
+                        PerlPath=r'D:\Perl\bin\perl', rouge_args=None):
+        """
+        Run ROUGE like evaluate(), but parse its output line by line
+        while ROUGE is still running instead of buffering all of it, so
+        that memory stays bounded even for the per-document scores of
+        large corpora (-d option), and callers can act on the first
+        scores before ROUGE has finished. ROUGE always runs in a new
+        perl process, not on the workers of start_workers().
+
+        If the generator is closed before it is exhausted, e.g. by
+        breaking out of a for loop, the ROUGE process is killed.
+
+        Yields: DocumentScore and AverageScore records (cf.
+                pyrouge.utils.rouge_output.iter_output_records) in the
+                order in which ROUGE prints them. Use averages_to_dict()
+                to collect the averages like output_to_dict().
+
+        """
+        self.write_config(system_id=system_id, config_file_path=conf_path)
+        command = [PerlPath, self._bin_path] + self.__get_options(rouge_args)
+        self.log.info(
+            "Running ROUGE with command {}".format(" ".join(command)))
+        process = subprocess.Popen(command, stdout=subprocess.PIPE)
+        try:
+            # readline() instead of iterating over the file, which reads
+            # ahead in large blocks under Python 2.
+            for record in iter_output_records(
+                    iter(process.stdout.readline, b"")):
+                yield record
+            if process.wait():
+                raise subprocess.CalledProcessError(
+                    process.returncode, command)
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+
+    def start_workers(self, size=1, PerlPath=r'D:\Perl\bin\perl'):
+        """
+        Start size persistent ROUGE processes which have ROUGE-1.5.5.pl
+        compiled, its modules loaded and the WordNet exception database
+        and stopword list of data_dir opened (cf.
+        pyrouge/utils/rouge_worker.pl). Until stop_workers() is called,
+        evaluate() runs ROUGE on these workers instead of starting a new
+        perl process for every evaluation. With evaluate(parallel=N),
+        the shards are distributed over the workers.
+
+            size:       Number of worker processes.
+            PerlPath:   Path of the perl executable.
+
+        """
+        self.stop_workers()
+        self._worker_pool = RougeWorkerPool(
+            size, PerlPath, self._bin_path, self._data_dir)
+
+    def stop_workers(self):
+        """
+        Stop the ROUGE workers started by start_workers(), if any.
+
+        """
+        if self._worker_pool is not None:
+            self._worker_pool.close()
+            self._worker_pool = None
+
+    def score_pair(self, system_text, model_texts, options=None):
+        """
+        Score a system summary against model summaries in-process, with
+        no temporary files, configuration file or ROUGE process. The
+        texts are read like convert_text_to_rouge_format() and ROUGE
+        would read them, one sentence per line, and the scores are those
+        ROUGE-1.5.5.pl would compute for the options (cf.
+        pyrouge.scoring.rouge_scorer.RougeScorer).
+
+            system_text:    Text of the system summary.
+            model_texts:    List of the texts of the model summaries.
+            options:        Optional ROUGE arguments as in evaluate(),
+                            the default pyrouge arguments otherwise.
+
+        Returns: Dictionary like output_to_dict() returns for ROUGE's
+                 output.
+
+        """
+        scorer = self.__get_scorer(options)
+        scores = scorer.score_summaries(
+            summary_sentences(system_text),
+            [summary_sentences(text) for text in model_texts])
+        return scorer.pair_to_dict(scores)
+
+    def evaluate_pairs(self, pairs, options=None, chunk_size=1000):
+        """
+        Score a stream of documents in-process, like score_pair() but
+        with averages and confidence intervals over all documents, and
+        with memory bounded by chunk_size (cf.
+        RougeScorer.evaluate_pairs).
+
+            pairs:      Iterable of (document ID, system text, list of
+                        model texts) tuples, which is consumed lazily.
+            options:    Optional ROUGE arguments as in evaluate().
+            chunk_size: Number of documents scored per chunk.
+
+        Yields: (document ID, scores) tuples, where scores is an
+                OrderedDict mapping the ROUGE type to a (recall,
+                precision, f_score) tuple, and finally a (None,
+                averages) tuple, where averages is a dictionary like
+                output_to_dict() returns.
+
+        """
+        scorer = self.__get_scorer(options)
+        sentences = (
+            (doc_id, summary_sentences(system_text),
+             [summary_sentences(text) for text in model_texts])
+            for doc_id, system_text, model_texts in pairs)
+        return scorer.evaluate_pairs(sentences, chunk_size)
+
 ##    def evaluate(self, system_id=1,conf_path = None, rouge_args=None):
 ##        """
 ##        Run ROUGE to evaluate the system summaries in system_dir against
@@ -423,6 +673,97 @@ class Rouge155(object):
 ####           # raise CalledProcessError(retcode, cmd, output=output)
 ##        rouge_output = output.decode("UTF-8")
 ##        return rouge_output, retcode
+
+    def evaluate_sources(self, system_source, model_source, system_id=1,
+                         rouge_args=None, in_process=False,
+                         PerlPath=r'D:\Perl\bin\perl'):
+        """
+        Evaluate plain text system summaries against plain text model
+        summaries read from directories, JSONL files, tar or zip archives
+        (cf. pyrouge.utils.summary_sources), without extracting them.
+        system_filename_pattern and model_filename_pattern are matched
+        against the summary names, i.e. filenames, member names or the
+        IDs of JSON records.
+
+        Each source is read in a single pass, so tar archives and
+        gzipped JSONL files can also be read from pipes. The matched
+        system summaries and the model summaries which can belong to
+        them are spooled to the workspace one at a time, converted to
+        ROUGE's format for ROUGE-1.5.5.pl or as plain text with
+        in_process, where they are scored by evaluate_pairs().
+
+            system_source:  Path or SummarySource of the system summaries.
+            model_source:   Path or SummarySource of the model summaries.
+            in_process:     Score in-process instead of running ROUGE.
+
+        Returns: Dictionary like output_to_dict() returns.
+
+        """
+        system_source = open_summary_source(system_source)
+        model_source = open_summary_source(model_source)
+        pattern = re.compile(self._system_filename_pattern)
+        if in_process:
+            write = Rouge155.__write_text
+        else:
+            write = Rouge155.__write_rouge_format
+        temp_dir = self.workspace.mkdtemp("sources_")
+        try:
+            system_dir = os.path.join(temp_dir, "system")
+            model_dir = os.path.join(temp_dir, "model")
+            os.mkdir(system_dir)
+            os.mkdir(model_dir)
+            # Member names may contain directories, so the files are
+            # numbered.
+            system_files = {}
+            for name, text in system_source.items():
+                match = pattern.match(name)
+                if match:
+                    filename = "S.{}".format(len(system_files))
+                    write(os.path.join(system_dir, filename), text)
+                    system_files[name] = match.groups(0)[0], filename
+            if not system_files:
+                raise Exception(
+                    "Did not find any summaries matching the pattern {} "
+                    "in the system summaries {}.".format(
+                        self._system_filename_pattern, system_source))
+            is_model = model_filename_filter(
+                self._model_filename_pattern,
+                [id for id, _ in system_files.values()])
+            model_files = {}
+            for name, text in model_source.items():
+                if is_model(name):
+                    filename = "M.{}".format(len(model_files))
+                    write(os.path.join(model_dir, filename), text)
+                    model_files[name] = filename
+            model_index = ModelFilenameIndex(
+                None, self._model_filename_pattern, model_files)
+            system_models = [
+                (name, filename,
+                 [model_files[m] for m in model_index.filenames_for_id(id)])
+                for name, (id, filename) in sorted(system_files.items())]
+            if in_process:
+                pairs = (
+                    (name,
+                     Rouge155.__read_text(os.path.join(system_dir, filename)),
+                     [Rouge155.__read_text(os.path.join(model_dir, m))
+                      for m in models])
+                    for name, filename, models in system_models)
+                for _, results in self.evaluate_pairs(pairs, rouge_args):
+                    pass
+                return results
+            self._config_file = os.path.join(temp_dir, "rouge_conf.xml")
+            Rouge155.__write_config_entries(
+                self._config_file, system_id, system_dir, model_dir,
+                ((filename, models)
+                 for _, filename, models in system_models))
+            options = self.__get_options(rouge_args)
+            self.log.info("Running ROUGE on {} summaries from {}.".format(
+                len(system_models), system_source))
+            output = self.__run_rouge(PerlPath, options).decode("UTF-8")
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        return self.output_to_dict(output)
+
     def convert_and_evaluate(self, system_id=1,
                              split_sentences=False, rouge_args=None):
         """
@@ -454,27 +795,7 @@ class Rouge155(object):
         processing.
 
         """
-        #0 ROUGE-1 Average_R: 0.02632 (95%-conf.int. 0.02632 - 0.02632)
-        pattern = re.compile(
-            r"(\d+) (ROUGE-\S+) (Average_\w): (\d.\d+) "
-            r"\(95%-conf.int. (\d.\d+) - (\d.\d+)\)")
-        results = {}
-        for line in output.split("\n"):
-            match = pattern.match(line)
-            if match:
-                sys_id, rouge_type, measure, result, conf_begin, conf_end = \
-                    match.groups()
-                measure = {
-                    'Average_R': 'recall',
-                    'Average_P': 'precision',
-                    'Average_F': 'f_score'
-                    }[measure]
-                rouge_type = rouge_type.lower().replace("-", '_')
-                key = "{}_{}".format(rouge_type, measure)
-                results[key] = float(result)
-                results["{}_cb".format(key)] = float(conf_begin)
-                results["{}_ce".format(key)] = float(conf_end)
-        return results
+        return averages_to_dict(iter_output_records(output.split("\n")))
 
     ###################################################################
     # Private methods
@@ -498,6 +819,170 @@ class Rouge155(object):
                 "correct path by running pyrouge_set_rouge_path "
                 "/path/to/rouge/home.".format(self._bin_path))
 
+    def __write_cached_config(self, system_id):
+        """
+        Point config_file to a configuration file for the current
+        directories, filename patterns and system ID, writing it only if
+        no configuration file has been written for them yet. The cache
+        key includes a fingerprint of the names, sizes and modification
+        times of the files in the system and model directories, so any
+        change to the summaries invalidates the cached configuration.
+
+        """
+        key = hashlib.sha1()
+        for part in [
+                self._system_dir, os.path.abspath(self._system_dir),
+                self._system_filename_pattern,
+                dir_fingerprint(self._system_dir),
+                self._model_dir, os.path.abspath(self._model_dir),
+                self._model_filename_pattern,
+                dir_fingerprint(self._model_dir),
+                system_id]:
+            key.update("{}\n".format(part).encode("UTF-8"))
+        key = key.hexdigest()
+        if self._config_cache_dir:
+            config_file = os.path.join(
+                self._config_cache_dir, "rouge_conf_{}.xml".format(key))
+        else:
+            config_file = self._config_cache.get(key)
+        if config_file and os.path.exists(config_file):
+            self._config_dir, _ = os.path.split(config_file)
+            self._config_file = config_file
+            self.log.info(
+                "Reusing ROUGE configuration {}".format(self._config_file))
+            return
+        if self._config_cache_dir:
+            # Write to a temporary name first, so that an interrupted run
+            # never leaves a truncated file under the cache key.
+            self._config_dir = self._config_cache_dir
+            temp_file = "{}.{}.tmp".format(config_file, os.getpid())
+            Rouge155.write_config_static(
+                self._system_dir, self._system_filename_pattern,
+                self._model_dir, self._model_filename_pattern,
+                temp_file, system_id)
+            if os.path.exists(config_file):
+                os.remove(temp_file)
+            else:
+                os.rename(temp_file, config_file)
+        else:
+            self._config_dir = self.workspace.path
+            config_file = os.path.join(
+                self._config_dir, "rouge_conf_{}.xml".format(key))
+            Rouge155.write_config_static(
+                self._system_dir, self._system_filename_pattern,
+                self._model_dir, self._model_filename_pattern,
+                config_file, system_id)
+            self._config_cache[key] = config_file
+        self._config_file = config_file
+        self.log.info(
+            "Written ROUGE configuration to {}".format(self._config_file))
+
+    def __evaluate_sharded(self, perl_path, options, n_shards):
+        """
+        Split the configuration file into n_shards shard configurations,
+        run one ROUGE process with the -d option per shard in a pool of
+        n_shards workers and merge the per-document scores.
+
+        The averages are recomputed from the per-document recall,
+        precision and F-measure, which ROUGE prints with five decimals,
+        so they can differ from a single ROUGE run in the last decimal.
+        The confidence intervals are estimated by bootstrap resampling
+        of the merged per-document scores with the -r and -c settings,
+        but with Python's random number generator instead of Perl's.
+
+        """
+        if Rouge155.__get_option_value(options[:-1], '-t', '0') != '0':
+            raise Exception(
+                "Parallel evaluation requires ROUGE's default counting "
+                "unit (-t 0), because the averages are rebuilt from the "
+                "per-document scores.")
+        shard_dir = self.workspace.mkdtemp("shards_")
+        try:
+            shard_files = Rouge155.__split_config(
+                self._config_file, n_shards, shard_dir)
+            shard_options = [
+                ['-d'] + options[:-1] + [path] for path in shard_files]
+            self.log.info(
+                "Running ROUGE on {} shards of {}".format(
+                    len(shard_options), self._config_file))
+            pool = ThreadPool(len(shard_options))
+            try:
+                outputs = pool.map(
+                    partial(self.__run_rouge, perl_path), shard_options)
+            finally:
+                pool.close()
+        finally:
+            shutil.rmtree(shard_dir)
+        scores = None
+        for output in outputs:
+            scores = parse_per_document_scores(output.decode("UTF-8"), scores)
+        # Restore the configuration file order, so that the resampled
+        # confidence intervals do not depend on the number of shards.
+        for documents in scores.values():
+            documents.sort(key=lambda d: eval_id_sort_key(d[0]))
+        return format_average_scores(
+            scores,
+            samples=int(Rouge155.__get_option_value(options, '-r', 1000)),
+            confidence=int(Rouge155.__get_option_value(options, '-c', 95)),
+            detailed='-d' in options[:-1])
+
+    def __run_rouge(self, perl_path, options):
+        """
+        Run ROUGE with the command line options, on a worker if
+        start_workers() has been called and in a new perl process
+        otherwise.
+
+        Returns: ROUGE output as bytes.
+
+        """
+        if self._worker_pool is not None:
+            return self._worker_pool.run(options)
+        return check_output([perl_path, self._bin_path] + options)
+
+    @staticmethod
+    def __get_option_value(options, flag, default):
+        if flag in options:
+            return options[options.index(flag) + 1]
+        return default
+
+    @staticmethod
+    def __split_config(config_file_path, n_shards, output_dir):
+        """
+        Distribute the <EVAL> elements of a ROUGE configuration file
+        round-robin over n_shards new configuration files in output_dir.
+        The file is parsed incrementally, so that only one <EVAL>
+        element is held in memory at a time.
+
+        Returns: Paths of the non-empty shard configuration files.
+
+        """
+        shard_files = [
+            os.path.join(output_dir, "rouge_conf_{}.xml".format(i))
+            for i in range(n_shards)]
+        shard_sizes = [0] * n_shards
+        outputs = [open(path, 'wb') for path in shard_files]
+        try:
+            root = None
+            eval_count = 0
+            for event, elem in et.iterparse(
+                    config_file_path, events=('start', 'end')):
+                if root is None:
+                    root = elem
+                    for f in outputs:
+                        f.write(b'<ROUGE-EVAL version="1.55">\n')
+                elif event == 'end' and elem.tag == 'EVAL':
+                    shard = eval_count % n_shards
+                    outputs[shard].write(et.tostring(elem))
+                    shard_sizes[shard] += 1
+                    eval_count += 1
+                    root.clear()
+            for f in outputs:
+                f.write(b'</ROUGE-EVAL>\n')
+        finally:
+            for f in outputs:
+                f.close()
+        return [path for path, size in zip(shard_files, shard_sizes) if size]
+
     def __get_rouge_home_dir_from_settings(self):
         config = ConfigParser()
         with open(self._settings_file) as f:
@@ -509,6 +994,52 @@ class Rouge155(object):
         rouge_home_dir = config.get('pyrouge settings', 'home_dir')
         return rouge_home_dir
 
+    @staticmethod
+    def __iter_system_models_tuples(system_dir, system_filename_pattern,
+                                    model_dir, model_filename_pattern):
+        """
+        Lazily yield (system_filename, model_filenames) tuples for the
+        system summaries matching system_filename_pattern, in sorted
+        filename order.
+
+        """
+        model_index = ModelFilenameIndex(model_dir, model_filename_pattern)
+        system_filename_pattern = re.compile(system_filename_pattern)
+        for system_filename in sorted(os.listdir(system_dir)):
+            match = system_filename_pattern.match(system_filename)
+            if match:
+                id = match.groups(0)[0]
+                yield system_filename, model_index.filenames_for_id(id)
+
+    @staticmethod
+    def __write_config_entries(config_file_path, system_id,
+                               system_dir, model_dir, system_models_tuples,
+                               buffer_size=1 << 20):
+        """
+        Write one <EVAL> element per (system_filename, model_filenames)
+        tuple through a buffered writer, consuming the tuples as they are
+        produced. A partially written configuration file is removed if
+        finding the model summaries fails. The file is opened before that
+        guard, so that an error opening it is raised unchanged.
+
+        """
+        f = codecs.open(config_file_path, 'w', encoding='utf-8',
+                        buffering=buffer_size)
+        try:
+            with f:
+                f.write('<ROUGE-EVAL version="1.55">')
+                for task_id, (system_filename, model_filenames) in enumerate(
+                        system_models_tuples, start=1):
+                    f.write(Rouge155.__get_eval_string(
+                        task_id, system_id,
+                        system_dir, system_filename,
+                        model_dir, model_filenames))
+                f.write("</ROUGE-EVAL>")
+        except Exception:
+            if os.path.exists(config_file_path):
+                os.remove(config_file_path)
+            raise
+
     @staticmethod
     def __get_eval_string(
             task_id, system_id,
@@ -524,8 +1055,7 @@ class Rouge155(object):
         system and model summaries.
 
         """
-        peer_elems = "<P ID=\"{id}\">{name}</P>".format(
-            id=system_id, name=system_filename)
+        peer_elems = "<P ID=\"{}\">{}</P>".format(system_id, system_filename)
 ##        peer_elems = ''
 ##        if system_id[0] != 'None':
 ##            system_filename1 = system_filename.split('.')[:-1]
@@ -537,65 +1067,127 @@ class Rouge155(object):
 ##            peer_elems += "<P ID=\"{id}\">{name}.{id1}</P>\n".format(
 ##                id=eachid, id1=eachid,name=s1)
 
-        model_elems = ["<M ID=\"{id}\">{name}</M>".format(
-            id=chr(65 + i), name=name)
-            for i, name in enumerate(model_filenames)]
-
-        model_elems = "\n\t\t\t".join(model_elems)
-        eval_string = """
-    <EVAL ID="{task_id}">
-        <MODEL-ROOT>{model_root}</MODEL-ROOT>
-        <PEER-ROOT>{peer_root}</PEER-ROOT>
-        <INPUT-FORMAT TYPE="SEE">
-        </INPUT-FORMAT>
-        <PEERS>
-            {peer_elems}
-        </PEERS>
-        <MODELS>
-            {model_elems}
-        </MODELS>
-    </EVAL>
-""".format(
-            task_id=task_id,
-            model_root=model_dir, model_elems=model_elems,
-            peer_root=system_dir, peer_elems=peer_elems)
-        return eval_string
-
-    def __process_summaries(self, process_func):
-        """
-        Helper method that applies process_func to the files in the
-        system and model folders and saves the resulting files to new
-        system and model folders.
-
-        """
-        temp_dir = mkdtemp()
-        new_system_dir = os.path.join(temp_dir, "system")
-        os.mkdir(new_system_dir)
-        new_model_dir = os.path.join(temp_dir, "model")
-        os.mkdir(new_model_dir)
-        self.log.info(
-            "Processing summaries. Saving system files to {} and "
-            "model files to {}.".format(new_system_dir, new_model_dir))
-        process_func(self._system_dir, new_system_dir)
-        process_func(self._model_dir, new_model_dir)
+        model_elems = "\n\t\t\t".join([
+            "<M ID=\"{}\">{}</M>".format(chr(65 + i), name)
+            for i, name in enumerate(model_filenames)])
+        # Concatenating the pieces is considerably cheaper than
+        # formatting one large template with keyword arguments.
+        return "".join([
+            "\n    <EVAL ID=\"", "{}".format(task_id), "\">"
+            "\n        <MODEL-ROOT>", model_dir, "</MODEL-ROOT>"
+            "\n        <PEER-ROOT>", system_dir, "</PEER-ROOT>"
+            "\n        <INPUT-FORMAT TYPE=\"SEE\">"
+            "\n        </INPUT-FORMAT>"
+            "\n        <PEERS>"
+            "\n            ", peer_elems,
+            "\n        </PEERS>"
+            "\n        <MODELS>"
+            "\n            ", model_elems,
+            "\n        </MODELS>"
+            "\n    </EVAL>\n"])
+
+    def __process_summaries(self, function, name):
+        """
+        Helper method that applies function to the files in the system
+        and model folders and saves the resulting files to new system
+        and model folders.
+
+        If conversion_cache_dir is set, the new folders are kept there,
+        one per source folder and function name, and only the files
+        which changed since the last run are processed again (cf.
+        DirectoryProcessor.process_incremental).
+
+        Otherwise they are written to the workspace, which replaces the
+        folders of the previous call, and if the workspace is in RAM and
+        runs out of space, to a folder on disk instead.
+
+        """
+        if self._conversion_cache_dir is not None:
+            new_system_dir, new_model_dir = [
+                os.path.join(self._conversion_cache_dir, "{}_{}".format(
+                    name, hashlib.sha1(os.path.abspath(path).encode(
+                        "UTF-8")).hexdigest()))
+                for path in (self._system_dir, self._model_dir)]
+            self.__log_summary_dirs(new_system_dir, new_model_dir)
+            for input_dir, output_dir in [
+                    (self._system_dir, new_system_dir),
+                    (self._model_dir, new_model_dir)]:
+                DirectoryProcessor.process_incremental(
+                    input_dir, output_dir, function,
+                    self._conversion_workers,
+                    content_hash=self._conversion_cache_hash)
+            self._system_dir = new_system_dir
+            self._model_dir = new_model_dir
+            return
+        self._source_dirs = tuple(
+            source if self.workspace.contains(path) else path
+            for path, source in zip(
+                (self._system_dir, self._model_dir), self._source_dirs))
+        while True:
+            temp_dir = self.workspace.mkdtemp(
+                "summaries_", on_disk=self._summaries_on_disk)
+            new_system_dir = os.path.join(temp_dir, "system")
+            new_model_dir = os.path.join(temp_dir, "model")
+            self.__log_summary_dirs(new_system_dir, new_model_dir)
+            try:
+                for input_dir, output_dir in [
+                        (self._system_dir, new_system_dir),
+                        (self._model_dir, new_model_dir)]:
+                    os.mkdir(output_dir)
+                    DirectoryProcessor.process(
+                        input_dir, output_dir, function,
+                        self._conversion_workers)
+                break
+            except (IOError, OSError) as e:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+                if e.errno != errno.ENOSPC or self._summaries_on_disk \
+                        or not self.workspace.in_ram:
+                    raise
+                self.log.warning(
+                    "No space left in the workspace {}, processing "
+                    "summaries on disk instead.".format(self.workspace.path))
+                self._summaries_on_disk = True
+        if self._summaries_dir is not None:
+            shutil.rmtree(self._summaries_dir, ignore_errors=True)
+        self._summaries_dir = temp_dir
         self._system_dir = new_system_dir
         self._model_dir = new_model_dir
 
+    def __log_summary_dirs(self, system_dir, model_dir):
+        self.log.info(
+            "Processing summaries. Saving system files to {} and "
+            "model files to {}.".format(system_dir, model_dir))
+
     def __write_summaries(self):
         self.log.info("Writing summaries.")
-        self.__process_summaries(self.convert_summaries_to_rouge_format)
+        self.__process_summaries(
+            convert_text_to_rouge_format, "rouge_format")
 
     @staticmethod
-    def __get_model_filenames_for_id(id, model_dir, model_filenames_pattern):
-        pattern = re.compile(model_filenames_pattern.replace('#ID#', id))
-        model_filenames = [
-            f for f in os.listdir(model_dir) if pattern.match(f)]
-        if not model_filenames:
-            raise Exception(
-                "Could not find any model summaries for the system"
-                " summary with ID {}. Specified model filename pattern was: "
-                "{}".format(id, model_filenames_pattern))
-        return model_filenames
+    def __write_rouge_format(path, text):
+        with codecs.open(path, "w", encoding="UTF-8") as f:
+            f.write(convert_text_to_rouge_format(text))
+
+    @staticmethod
+    def __write_text(path, text):
+        with codecs.open(path, "w", encoding="UTF-8") as f:
+            f.write(text)
+
+    @staticmethod
+    def __read_text(path):
+        with codecs.open(path, "r", encoding="UTF-8") as f:
+            return f.read()
+
+    def __get_scorer(self, options):
+        """
+        Get the in-process scorer for a set of ROUGE arguments, creating
+        it on first use.
+
+        """
+        options = tuple(self.__get_options(options)[:-1])
+        if options not in self._scorers:
+            self._scorers[options] = RougeScorer.from_options(options)
+        return self._scorers[options]
 
     def __get_options(self, rouge_args=None):
         """
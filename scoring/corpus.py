@@ -0,0 +1,183 @@
+from __future__ import print_function, unicode_literals, division
+
+import codecs
+import os
+import re
+
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from pyrouge.scoring.tokenization import (
+    see_sentences, summary_sentences, text_sentences)
+
+
+class Vocabulary(object):
+    """
+    Interns tokens as consecutive integer IDs.
+
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.tokens = []
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def intern(self, token):
+        """
+        Return the ID of a token, adding it to the vocabulary if needed.
+
+        """
+        try:
+            return self.ids[token]
+        except KeyError:
+            self.ids[token] = len(self.tokens)
+            self.tokens.append(token)
+            return self.ids[token]
+
+    def intern_tokens(self, tokens):
+        """
+        Return the IDs of a list of tokens.
+
+        """
+        ids = self.ids
+        return [ids[t] if t in ids else self.intern(t) for t in tokens]
+
+
+class Corpus(object):
+    """
+    Tokenized summaries, e.g. all system and model summaries of an
+    evaluation, read once and stored compactly: the tokens are interned
+    in a Vocabulary and the token IDs of all summaries are appended to
+    one contiguous int32 buffer. A summary is a range of sentences, and a
+    sentence a range of the buffer. All ROUGE measures of
+    pyrouge.scoring work on token ID lists as well as on token strings,
+    so scoring from a corpus needs no file I/O or string processing.
+
+    corpus = rouge.read_corpus("models")
+    rouge.read_corpus("systems", corpus=corpus)
+    scores = rouge.score_corpus(corpus, "peer.html", ["model.A.html"])
+
+    """
+
+    def __init__(self, vocabulary=None):
+        self.vocabulary = vocabulary if vocabulary is not None \
+            else Vocabulary()
+        self.names = []
+        self.__index = {}
+        self.__tokens = array(str("i"))
+        self.__sentence_offsets = array(str("l"), [0])
+        self.__summary_offsets = array(str("l"), [0])
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.__index
+
+    @property
+    def n_tokens(self):
+        return len(self.__tokens)
+
+    def add_summary(self, name, sentences):
+        """
+        Add a tokenized summary.
+
+            name:       Unique name of the summary, e.g. its filename.
+            sentences:  List of token lists, one per sentence.
+
+        """
+        if name in self.__index:
+            raise Exception("The corpus already has a summary {}.".format(
+                name))
+        for tokens in sentences:
+            self.__tokens.extend(self.vocabulary.intern_tokens(tokens))
+            self.__sentence_offsets.append(len(self.__tokens))
+        self.__summary_offsets.append(len(self.__sentence_offsets) - 1)
+        self.__index[name] = len(self.names)
+        self.names.append(name)
+
+    def add_directory(self, directory, tokenize_summary,
+                      input_format="SEE", filename_pattern=None, prefix=""):
+        """
+        Read and add all summaries of a directory, in filename order.
+
+            tokenize_summary:   Function tokenizing a list of sentence
+                                strings into a list of token lists, e.g.
+                                RougeScorer.tokenize_summary.
+            input_format:       "SEE" or "SPL" like ROUGE, or "text" for
+                                plain text summaries as accepted by
+                                Rouge155.convert_summaries_to_rouge_format,
+                                which are read as ROUGE would read their
+                                converted versions.
+            filename_pattern:   Optional regex string the filenames have
+                                to match.
+            prefix:             Prefix of the summary names, which are
+                                prefix + filename.
+
+        Returns: List of the names of the added summaries.
+
+        """
+        split = {
+            "SEE": see_sentences, "SPL": text_sentences,
+            "TEXT": summary_sentences}[input_format.upper()]
+        pattern = re.compile(filename_pattern) if filename_pattern else None
+        names = []
+        for filename in sorted(os.listdir(directory)):
+            path = os.path.join(directory, filename)
+            if pattern and not pattern.match(filename) or \
+                    not os.path.isfile(path):
+                continue
+            with codecs.open(path, "r", encoding="UTF-8") as f:
+                sentences = split(f.read())
+            self.add_summary(prefix + filename, tokenize_summary(sentences))
+            names.append(prefix + filename)
+        return names
+
+    def sentences(self, name):
+        """
+        Token IDs of the sentences of a summary.
+
+        Returns: List of int32 arrays, one per sentence.
+
+        """
+        i = self.__index[name]
+        offsets = self.__sentence_offsets
+        return [
+            self.__tokens[offsets[s]:offsets[s + 1]]
+            for s in range(self.__summary_offsets[i],
+                           self.__summary_offsets[i + 1])]
+
+    def tokens(self, name):
+        """
+        Token IDs of a summary.
+
+        Returns: int32 array.
+
+        """
+        i = self.__index[name]
+        offsets = self.__sentence_offsets
+        return self.__tokens[
+            offsets[self.__summary_offsets[i]]:
+            offsets[self.__summary_offsets[i + 1]]]
+
+    def token_array(self):
+        """
+        The token ID buffer of all summaries as NumPy int32 array, without
+        copying it. No summaries can be added while the array is alive.
+
+        """
+        return np.frombuffer(self.__tokens, dtype=np.int32)
+
+    def decode(self, ids):
+        """
+        Map token IDs back to their tokens.
+
+        """
+        tokens = self.vocabulary.tokens
+        return [tokens[i] for i in ids]
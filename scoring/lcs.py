@@ -0,0 +1,142 @@
+from __future__ import print_function, unicode_literals, division
+
+from collections import Counter
+
+
+try:
+    popcount = int.bit_count
+except AttributeError:
+    def popcount(x):
+        return bin(x).count("1")
+
+
+def match_masks(sentence):
+    """
+    Map every token of a sentence to the bit mask of its positions,
+    bit i being set if sentence[i] is the token.
+
+    """
+    masks = {}
+    for i, token in enumerate(sentence):
+        masks[token] = masks.get(token, 0) | (1 << i)
+    return masks
+
+
+def lcs_columns(masks, m, other):
+    """
+    Bit-parallel LCS computation (Allison-Dix, Hyyro). Column j of the
+    LCS table of a sentence of length m with match masks masks and the
+    sequence other is encoded as a bit vector V_j whose bit i is unset
+    if and only if c[i + 1][j] = c[i][j] + 1, so that
+    c[i][j] = i - popcount(V_j & (2 ** i - 1)). Each column costs a few
+    big integer operations instead of m table cell updates.
+
+    Returns: List of the n + 1 column bit vectors V_0, ..., V_n.
+
+    """
+    full = (1 << m) - 1
+    v = full
+    columns = [v]
+    for token in other:
+        u = v & masks.get(token, 0)
+        v = ((v + u) | (v - u)) & full
+        columns.append(v)
+    return columns
+
+
+def lcs_length(a, b):
+    """
+    Length of the longest common subsequence of two token sequences.
+
+    """
+    columns = lcs_columns(match_masks(a), len(a), b)
+    return len(a) - popcount(columns[-1])
+
+
+def lcs_hit_mask(a, b, columns):
+    """
+    Mark the positions of a which belong to the longest common
+    subsequence of a and b, choosing the same subsequence as
+    ROUGE-1.5.5.pl's table backtrace: diagonal on a match, otherwise
+    up if c[i - 1][j] >= c[i][j - 1] and left otherwise.
+
+        columns:    Column bit vectors as returned by lcs_columns for a
+                    and b.
+
+    Returns: Bit mask of the marked positions of a.
+
+    """
+    hit_mask = 0
+    i, j = len(a), len(b)
+    while i > 0 and j > 0:
+        if a[i - 1] == b[j - 1]:
+            hit_mask |= 1 << (i - 1)
+            i -= 1
+            j -= 1
+            continue
+        below = (1 << (i - 1)) - 1
+        up = i - 1 - popcount(columns[j] & below)
+        left = i - popcount(columns[j - 1] & (below | (1 << (i - 1))))
+        if up >= left:
+            i -= 1
+        else:
+            j -= 1
+    return hit_mask
+
+
+def union_lcs_hits(model_sentence, peer_sentences):
+    """
+    Positions of the model sentence in the union of its longest common
+    subsequences with each of the peer sentences.
+
+    Returns: Sorted list of positions.
+
+    """
+    m = len(model_sentence)
+    masks = match_masks(model_sentence)
+    hit_mask = 0
+    for peer_sentence in peer_sentences:
+        if not m or not peer_sentence:
+            continue
+        columns = lcs_columns(masks, m, peer_sentence)
+        if columns[-1] == (1 << m) - 1:
+            # No common token at all.
+            continue
+        hit_mask |= lcs_hit_mask(model_sentence, peer_sentence, columns)
+    return [i for i in range(m) if hit_mask >> i & 1]
+
+
+def rouge_l(peer_sentences, models_sentences):
+    """
+    Summary-level ROUGE-L hit and total counts of a peer summary against
+    a list of model summaries, like ROUGE-1.5.5's default -f A scoring
+    mode. For every model sentence the union of its LCS with each peer
+    sentence is taken; a token of the union only counts as a hit while
+    it has not been used up in the peer and the model summary, so that
+    no token is counted more often than it occurs.
+
+        peer_sentences:     List of token lists, one per peer sentence.
+        models_sentences:   List of such lists, one per model summary.
+
+    Tokens may be strings or interned token IDs.
+
+    Returns: (hit, model_total, peer_total) tuple.
+
+    """
+    peer_unigrams = Counter(
+        token for sentence in peer_sentences for token in sentence)
+    peer_total = sum(peer_unigrams.values())
+    hit = model_total = 0
+    for model_sentences in models_sentences:
+        model_unigrams = Counter(
+            token for sentence in model_sentences for token in sentence)
+        model_total += sum(model_unigrams.values())
+        peer_counts = Counter(peer_unigrams)
+        for model_sentence in model_sentences:
+            for i in union_lcs_hits(model_sentence, peer_sentences):
+                token = model_sentence[i]
+                if peer_counts[token] > 0 and model_unigrams[token] > 0:
+                    hit += 1
+                    peer_counts[token] -= 1
+                    model_unigrams[token] -= 1
+    return hit, model_total, peer_total * len(models_sentences)
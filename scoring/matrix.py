@@ -0,0 +1,127 @@
+from __future__ import print_function, unicode_literals, division
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from pyrouge.scoring.ngram import ngram_counts, ngram_total
+
+
+# Upper bound on the number of cells of the dense blocks multiplied at
+# once.
+MAX_BLOCK_CELLS = 1 << 24
+
+
+class NgramCountMatrix(object):
+    """
+    Sparse matrix of the n-gram counts of several token sequences, one
+    row per sequence and one column per distinct n-gram, in coordinate
+    form. Matrices which are compared with each other must share the
+    n-gram vocabulary.
+
+    """
+
+    def __init__(self, token_lists, n, vocabulary):
+        """
+            token_lists:    List of token lists, one per row.
+            n:              N-gram size.
+            vocabulary:     Dictionary mapping n-grams to column indices,
+                            extended with new n-grams.
+
+        """
+        if np is None:
+            raise Exception("ROUGE matrices need NumPy.")
+        rows, columns, counts = [], [], []
+        for row, tokens in enumerate(token_lists):
+            for gram, count in ngram_counts(tokens, n).items():
+                rows.append(row)
+                columns.append(vocabulary.setdefault(gram, len(vocabulary)))
+                counts.append(count)
+        self.n_rows = len(token_lists)
+        self.rows = np.array(rows, dtype=np.int64)
+        self.columns = np.array(columns, dtype=np.int64)
+        self.counts = np.array(counts, dtype=np.int64)
+        self.totals = np.array(
+            [ngram_total(tokens, n) for tokens in token_lists],
+            dtype=np.float64)
+
+    def indicator(self, level, columns):
+        """
+        Dense 0/1 matrix of the cells with a count of at least level, for
+        the given sorted columns only.
+
+        """
+        selected = self.counts >= level
+        positions = np.searchsorted(columns, self.columns[selected])
+        positions = np.minimum(positions, len(columns) - 1)
+        found = columns[positions] == self.columns[selected]
+        matrix = np.zeros((self.n_rows, len(columns)))
+        matrix[self.rows[selected][found], positions[found]] = 1.0
+        return matrix
+
+
+def overlap_matrix(peers, models):
+    """
+    Clipped n-gram overlap of every row of peers with every row of
+    models, i.e. the sum over the n-grams of the smaller count. It is
+    computed as sum over t >= 1 of the number of n-grams which both rows
+    contain at least t times, each term a product of two 0/1 matrices
+    restricted to the n-grams both sides contain t times. Most n-grams
+    occur once, so the terms for t > 1 are small.
+
+        peers, models:  NgramCountMatrix objects sharing a vocabulary.
+
+    Returns: len(peers) x len(models) array.
+
+    """
+    overlap = np.zeros((peers.n_rows, models.n_rows))
+    level = 1
+    while True:
+        columns = np.intersect1d(
+            peers.columns[peers.counts >= level],
+            models.columns[models.counts >= level])
+        if not len(columns):
+            break
+        block = max(1, MAX_BLOCK_CELLS // max(peers.n_rows, models.n_rows))
+        for start in range(0, len(columns), block):
+            block_columns = columns[start:start + block]
+            overlap += peers.indicator(level, block_columns).dot(
+                models.indicator(level, block_columns).T)
+        level += 1
+    return overlap
+
+
+def rouge_n_matrix(candidates, references=None, n=1, alpha=0.5):
+    """
+    ROUGE-N of every candidate against every reference, or against every
+    other candidate if references is None, e.g. for reranking or
+    minimum Bayes risk decoding. Each summary is tokenized and counted
+    once, and all clipped overlaps are computed by overlap_matrix.
+    Unlike ROUGE's output, the scores are not rounded.
+
+        candidates:     List of token lists.
+        references:     Optional list of token lists.
+
+    Returns: K x M x 3 array of (recall, precision, f_score), where K is
+             the number of candidates and M the number of references
+             (or K). Row i, column j scores candidate i as peer against
+             reference j as model.
+
+    """
+    vocabulary = {}
+    peers = NgramCountMatrix(candidates, n, vocabulary)
+    if references is None:
+        models = peers
+    else:
+        models = NgramCountMatrix(references, n, vocabulary)
+    overlap = overlap_matrix(peers, models)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        recall = np.where(
+            models.totals[None, :] > 0, overlap / models.totals[None, :], 0.0)
+        precision = np.where(
+            peers.totals[:, None] > 0, overlap / peers.totals[:, None], 0.0)
+        denominator = (1 - alpha) * precision + alpha * recall
+        f = np.where(
+            denominator > 0, precision * recall / denominator, 0.0)
+    return np.stack([recall, precision, f], axis=-1)
@@ -0,0 +1,57 @@
+from __future__ import print_function, unicode_literals, division
+
+from collections import Counter
+
+
+def ngram_counts(tokens, n):
+    """
+    Count the n-grams of a token sequence.
+
+    Returns: Counter mapping n-gram tuples to their counts.
+
+    """
+    return Counter(zip(*[tokens[i:] for i in range(n)]))
+
+
+def ngram_total(tokens, n):
+    """
+    Number of n-grams in a token sequence, ROUGE's "_cn_" count.
+
+    """
+    return max(len(tokens) - n + 1, 0)
+
+
+def ngram_overlap(counts1, counts2):
+    """
+    Clipped number of matching n-grams, i.e. the sum over the n-grams
+    of the smaller of both counts (ROUGE-1.5.5's ngramMatch).
+
+    """
+    if len(counts1) > len(counts2):
+        counts1, counts2 = counts2, counts1
+    return sum(
+        min(count, counts2[gram])
+        for gram, count in counts1.items() if gram in counts2)
+
+
+def rouge_n(peer_tokens, models_tokens, n):
+    """
+    ROUGE-N hit and total counts of a peer summary against a list of
+    model summaries, averaging over the models like ROUGE-1.5.5's
+    default -f A scoring mode: the matches and n-gram totals are summed
+    over the models, and the peer n-gram total once per model.
+
+        peer_tokens:    Token list of the peer summary.
+        models_tokens:  List of token lists of the model summaries.
+        n:              N-gram size.
+
+    Returns: (hit, model_total, peer_total) tuple.
+
+    """
+    peer_counts = ngram_counts(peer_tokens, n)
+    peer_total = ngram_total(peer_tokens, n)
+    hit = model_total = 0
+    for model_tokens in models_tokens:
+        hit += ngram_overlap(peer_counts, ngram_counts(model_tokens, n))
+        model_total += ngram_total(model_tokens, n)
+    return hit, model_total, peer_total * len(models_tokens)
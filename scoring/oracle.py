@@ -0,0 +1,231 @@
+from __future__ import print_function, unicode_literals, division
+
+from bisect import bisect
+from collections import Counter
+
+from pyrouge.scoring.ngram import ngram_counts
+from pyrouge.scoring.rouge_scorer import RougeScorer
+from pyrouge.scoring.tokenization import TokenizedSummary
+from pyrouge.utils.rouge_output import f_score
+
+
+class ExtractiveOracle(object):
+    """
+    Selects the sentences of a document which maximize ROUGE-N against
+    model summaries, e.g. to label training data for extractive
+    summarization, without any ROUGE run per candidate subset.
+
+    The selected sentences form a summary in document order, and its
+    n-gram counts and matches with every model are kept up to date
+    incrementally: adding a sentence only changes the n-grams within it
+    and those across its boundaries with the neighbouring selected
+    sentences, so scoring a candidate costs time in the length of the
+    candidate sentence, not of the summary.
+
+    oracle = ExtractiveOracle(ngram_sizes=(1, 2))
+    indices, score = oracle.greedy(document_sentences, [model_sentences])
+
+    """
+
+    def __init__(self, scorer=None, ngram_sizes=(1, 2), measure="f_score"):
+        """
+            scorer:         RougeScorer whose tokenization (stemming,
+                            stopwords) and alpha are used. Its length
+                            limits only apply to the model summaries.
+            ngram_sizes:    The objective is the mean of ROUGE-N over
+                            these n.
+            measure:        "recall", "precision" or "f_score".
+
+        """
+        self.scorer = scorer if scorer is not None else RougeScorer()
+        self.ngram_sizes = tuple(ngram_sizes)
+        self.measure = measure
+
+    def greedy(self, sentences, models_sentences, max_sentences=None):
+        """
+        Greedily add the sentence which improves the objective most,
+        until none improves it or max_sentences are selected.
+
+            sentences:          List of the sentences of the document.
+            models_sentences:   List of the sentence lists of the model
+                                summaries.
+
+        Returns: (sorted list of sentence indices, objective) tuple.
+
+        """
+        return self.beam(
+            sentences, models_sentences, beam_size=1,
+            max_sentences=max_sentences)
+
+    def beam(self, sentences, models_sentences, beam_size=5,
+             max_sentences=3):
+        """
+        Beam search over sentence subsets: in every step, each of the
+        beam_size best subsets is extended by every other sentence, and
+        the beam_size best distinct extensions are kept. Search stops
+        when no extension improves on the best subset found so far or
+        max_sentences are selected.
+
+        Returns: (sorted list of sentence indices, objective) tuple.
+
+        """
+        state = _OracleState(
+            self.__tokenize_document(sentences),
+            [self.scorer.tokenize_summary(model)
+             for model in models_sentences],
+            self.ngram_sizes, self.measure, self.scorer.alpha)
+        if max_sentences is None:
+            max_sentences = len(sentences)
+        best = state
+        beam = [state]
+        for _ in range(max_sentences):
+            candidates = {}
+            for current in beam:
+                for i in range(len(sentences)):
+                    if i in current.selected_set:
+                        continue
+                    key = tuple(sorted(current.selected + [i]))
+                    if key in candidates:
+                        continue
+                    delta = current.delta(i)
+                    candidates[key] = (current.objective(delta), current, i,
+                                       delta)
+            if not candidates:
+                break
+            ranked = sorted(
+                candidates.items(), key=lambda item: (-item[1][0], item[0]))
+            if ranked[0][1][0] <= best.score:
+                break
+            beam = [current.add(i, delta)
+                    for _, (_, current, i, delta) in ranked[:beam_size]]
+            best = beam[0]
+        return list(best.selected), best.score
+
+    def __tokenize_document(self, sentences):
+        return self.scorer.truncate_summary(
+            TokenizedSummary(sentences), word_limit=0, byte_limit=0)
+
+
+class _OracleState(object):
+    """
+    A subset of the document sentences with the n-gram counts of the
+    summary they form and its matches with each model.
+
+    """
+
+    def __init__(self, sentences, models, ngram_sizes, measure, alpha):
+        self.sentences = sentences
+        self.ngram_sizes = ngram_sizes
+        self.max_n = max(ngram_sizes)
+        self.measure = measure
+        self.alpha = alpha
+        self.selected = []
+        self.selected_set = frozenset()
+        model_tokens = [
+            [token for sentence in model for token in sentence]
+            for model in models]
+        self.model_counts = dict(
+            (n, [ngram_counts(tokens, n) for tokens in model_tokens])
+            for n in ngram_sizes)
+        self.model_totals = dict(
+            (n, sum(max(len(tokens) - n + 1, 0) for tokens in model_tokens))
+            for n in ngram_sizes)
+        self.counts = dict((n, Counter()) for n in ngram_sizes)
+        self.hits = dict((n, [0] * len(models)) for n in ngram_sizes)
+        self.totals = dict((n, 0) for n in ngram_sizes)
+        self.score = 0.0
+
+    def delta(self, i):
+        """
+        Changes of the n-gram counts, matches and totals when sentence i
+        is added.
+
+        Returns: Dictionary mapping n to (n-gram count changes, match
+                 changes per model, total change) tuples.
+
+        """
+        tail, head = self.__neighbours(i)
+        changes = {}
+        for n in self.ngram_sizes:
+            context = n - 1
+            n_tail = tail[len(tail) - context:] if context else []
+            n_head = head[:context]
+            grams = ngram_counts(n_tail + self.sentences[i] + n_head, n)
+            grams.subtract(ngram_counts(n_tail + n_head, n))
+            counts = self.counts[n]
+            hits = []
+            for model in self.model_counts[n]:
+                hit = 0
+                for gram, change in grams.items():
+                    if change and gram in model:
+                        count = counts[gram]
+                        hit += min(count + change, model[gram]) - \
+                            min(count, model[gram])
+                hits.append(hit)
+            changes[n] = (grams, hits, sum(grams.values()))
+        return changes
+
+    def objective(self, delta=None):
+        """
+        Mean of the measure over the n-gram sizes, with a delta applied
+        if given.
+
+        """
+        values = []
+        for n in self.ngram_sizes:
+            hit = sum(self.hits[n])
+            total = self.totals[n]
+            if delta is not None:
+                hit += sum(delta[n][1])
+                total += delta[n][2]
+            n_models = len(self.hits[n])
+            recall = hit / self.model_totals[n] \
+                if self.model_totals[n] else 0.0
+            precision = hit / (total * n_models) \
+                if total and n_models else 0.0
+            values.append({
+                "recall": recall,
+                "precision": precision,
+                "f_score": f_score(recall, precision, self.alpha),
+                }[self.measure])
+        return sum(values) / len(values)
+
+    def add(self, i, delta):
+        """
+        Return a new state with sentence i added.
+
+        """
+        state = _OracleState.__new__(_OracleState)
+        state.__dict__.update(self.__dict__)
+        state.selected = sorted(self.selected + [i])
+        state.selected_set = frozenset(state.selected)
+        state.counts, state.hits, state.totals = {}, {}, {}
+        for n in self.ngram_sizes:
+            grams, hits, total = delta[n]
+            counts = Counter(self.counts[n])
+            counts.update(grams)
+            state.counts[n] = counts
+            state.hits[n] = [a + b for a, b in zip(self.hits[n], hits)]
+            state.totals[n] = self.totals[n] + total
+        state.score = state.objective()
+        return state
+
+    def __neighbours(self, i):
+        """
+        The last max_n - 1 tokens of the selected sentences before
+        sentence i and the first max_n - 1 tokens after it.
+
+        """
+        context = self.max_n - 1
+        position = bisect(self.selected, i)
+        tail = []
+        k = position - 1
+        while k >= 0 and len(tail) < context:
+            tail = list(self.sentences[self.selected[k]]) + tail
+            k -= 1
+        head = []
+        k = position
+        while k < len(self.selected) and len(head) < context:
+            head = head + list(self.sentences[self.selected[k]])
+            k += 1
+        return tail[len(tail) - context:] if context else [], head[:context]
@@ -0,0 +1,241 @@
+from __future__ import print_function, unicode_literals, division
+
+import codecs
+import hashlib
+import json
+import os
+import shutil
+
+from tempfile import mkdtemp
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from pyrouge.utils.file_utils import dir_fingerprint
+
+
+class ReferenceNgramIndex(object):
+    """
+    N-gram counts of a set of model (reference) summaries, built once and
+    shared by every peer summary scored against them. The index is saved
+    as a directory of .npy files which are memory-mapped when loaded, so
+    that all systems, runs and processes scoring against the same model
+    directory reuse it instead of counting the model n-grams again.
+
+    N-grams are stored as integer codes: unigrams are token IDs, and the
+    code of an n-gram is the position of (code of its first n - 1 tokens)
+    * vocabulary size + ID of its last token in the sorted array of all
+    such keys of the index. The n-gram counts of each model summary are
+    a slice of sorted codes and their counts.
+
+    Use get_reference_index() to build or load the index of a model
+    directory, or RougeScorer.evaluate_config(config, index_dir=...).
+
+    """
+
+    def __init__(self, n, filenames, vocabulary, arrays):
+        """
+        Use build(), load() or get_reference_index() to create an index.
+
+        """
+        self.n = n
+        self.filenames = filenames
+        self.vocabulary = vocabulary
+        self.arrays = arrays
+        self.__file_index = dict(
+            (filename, i) for i, filename in enumerate(filenames))
+
+    @staticmethod
+    def build(models_tokens, n=4):
+        """
+        Build the index of tokenized model summaries.
+
+            models_tokens:  OrderedDict mapping model filenames to their
+                            token lists.
+            n:              Count n-grams up to this size.
+
+        """
+        if np is None:
+            raise Exception("The reference n-gram index needs NumPy.")
+        filenames = list(models_tokens)
+        vocabulary = {}
+        ids = [
+            np.array(
+                [vocabulary.setdefault(t, len(vocabulary)) for t in tokens],
+                dtype=np.int64)
+            for tokens in models_tokens.values()]
+        size = max(len(vocabulary), 1)
+        arrays = {}
+        codes = ids
+        for k in range(1, n + 1):
+            if k > 1:
+                keys = [
+                    prefix[:-1] * size + tokens[k - 1:]
+                    for prefix, tokens in zip(codes, ids)]
+                arrays["keys_{}".format(k)] = np.unique(
+                    np.concatenate(keys))
+                codes = [
+                    np.searchsorted(arrays["keys_{}".format(k)], key)
+                    for key in keys]
+            file_codes, file_counts, offsets = [], [], [0]
+            for file_code in codes:
+                unique, counts = np.unique(file_code, return_counts=True)
+                file_codes.append(unique)
+                file_counts.append(counts)
+                offsets.append(offsets[-1] + len(unique))
+            arrays["codes_{}".format(k)] = np.concatenate(file_codes) \
+                .astype(np.int64)
+            arrays["counts_{}".format(k)] = np.concatenate(file_counts) \
+                .astype(np.int64)
+            arrays["offsets_{}".format(k)] = np.array(offsets, np.int64)
+        return ReferenceNgramIndex(n, filenames, vocabulary, arrays)
+
+    def save(self, path):
+        """
+        Save the index to the directory path. The directory is written
+        under a temporary name and renamed, so that concurrent readers
+        never see a partial index.
+
+        """
+        parent = os.path.dirname(os.path.abspath(path))
+        tmp_dir = mkdtemp(dir=parent)
+        try:
+            with codecs.open(os.path.join(tmp_dir, "index.json"), "w",
+                             encoding="utf-8") as f:
+                json.dump({
+                    "n": self.n,
+                    "filenames": self.filenames,
+                    "vocabulary": self.vocabulary,
+                    }, f)
+            for name, array in self.arrays.items():
+                np.save(os.path.join(tmp_dir, name + ".npy"), array)
+            os.rename(tmp_dir, path)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not os.path.isdir(path):
+                raise
+
+    @staticmethod
+    def load(path, mmap=True):
+        """
+        Load an index saved with save(). The arrays are memory-mapped
+        unless mmap is False.
+
+        """
+        if np is None:
+            raise Exception("The reference n-gram index needs NumPy.")
+        with codecs.open(os.path.join(path, "index.json"), "r",
+                         encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = {}
+        for filename in os.listdir(path):
+            if filename.endswith(".npy"):
+                arrays[filename[:-4]] = np.load(
+                    os.path.join(path, filename),
+                    mmap_mode="r" if mmap else None)
+        return ReferenceNgramIndex(
+            meta["n"], meta["filenames"], meta["vocabulary"], arrays)
+
+    def counts(self, filename, n):
+        """
+        N-gram counts of a model summary.
+
+        Returns: (sorted n-gram codes, counts) tuple of array views.
+
+        """
+        i = self.__file_index[filename]
+        offsets = self.arrays["offsets_{}".format(n)]
+        start, stop = offsets[i], offsets[i + 1]
+        return (self.arrays["codes_{}".format(n)][start:stop],
+                self.arrays["counts_{}".format(n)][start:stop])
+
+    def peer_counts(self, tokens, n):
+        """
+        Encode the n-grams of a peer summary with the codes of the index.
+        N-grams which occur in no model summary are left out, as they
+        cannot match.
+
+        Returns: (sorted n-gram codes, counts) tuple.
+
+        """
+        size = max(len(self.vocabulary), 1)
+        ids = np.array(
+            [self.vocabulary.get(t, -1) for t in tokens], dtype=np.int64)
+        codes = ids
+        for k in range(2, n + 1):
+            keys = self.arrays["keys_{}".format(k)]
+            prefix, last = codes[:-1], ids[k - 1:]
+            key = prefix * size + last
+            found = (prefix >= 0) & (last >= 0)
+            if len(keys):
+                positions = np.minimum(
+                    np.searchsorted(keys, key), len(keys) - 1)
+                found &= keys[positions] == key
+            else:
+                positions = np.zeros_like(key)
+                found[:] = False
+            codes = np.where(found, positions, -1)
+        codes = codes[codes >= 0]
+        return np.unique(codes, return_counts=True)
+
+    def rouge_n(self, peer_tokens, model_filenames, n):
+        """
+        ROUGE-N hit and total counts of a peer summary against model
+        summaries of the index, like pyrouge.scoring.ngram.rouge_n.
+
+        Returns: (hit, model_total, peer_total) tuple.
+
+        """
+        if n > self.n:
+            raise Exception(
+                "The reference index only counts n-grams up to n = "
+                "{}.".format(self.n))
+        peer_codes, peer_counts = self.peer_counts(peer_tokens, n)
+        peer_total = max(len(peer_tokens) - n + 1, 0)
+        hit = model_total = 0
+        for filename in model_filenames:
+            model_codes, model_counts = self.counts(filename, n)
+            model_total += int(model_counts.sum())
+            _, peer_index, model_index = np.intersect1d(
+                peer_codes, model_codes, assume_unique=True,
+                return_indices=True)
+            hit += int(np.minimum(
+                peer_counts[peer_index], model_counts[model_index]).sum())
+        return hit, model_total, peer_total * len(model_filenames)
+
+
+def get_reference_index(index_dir, model_root, model_filenames,
+                        tokenize_file, n=4, options=()):
+    """
+    Load the reference index of model summaries from index_dir, or build
+    and save it if there is none yet. The index is identified by the
+    model directory and its contents (cf. dir_fingerprint), the model
+    filenames, n and the tokenization options, so it is rebuilt whenever
+    any of them changes.
+
+        index_dir:          Directory holding the indexes.
+        model_root:         Directory of the model summaries.
+        model_filenames:    Filenames of the model summaries to index.
+        tokenize_file:      Function reading a model summary path into
+                            a token list.
+        n:                  Count n-grams up to this size.
+        options:            Tokenization options which change the tokens,
+                            e.g. stemming and length limits.
+
+    """
+    model_filenames = sorted(set(model_filenames))
+    key = hashlib.sha1()
+    for part in [os.path.abspath(model_root), dir_fingerprint(model_root),
+                 n] + list(options) + model_filenames:
+        key.update("{}\n".format(part).encode("utf-8"))
+    path = os.path.join(index_dir, "rouge_index_" + key.hexdigest())
+    if os.path.isdir(path):
+        return ReferenceNgramIndex.load(path)
+    models_tokens = dict(
+        (filename, tokenize_file(os.path.join(model_root, filename)))
+        for filename in model_filenames)
+    index = ReferenceNgramIndex.build(models_tokens, n)
+    index.save(path)
+    return ReferenceNgramIndex.load(path)
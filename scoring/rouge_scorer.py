@@ -0,0 +1,530 @@
+from __future__ import print_function, unicode_literals, division
+
+import os
+import xml.etree.ElementTree as et
+
+from collections import OrderedDict
+from itertools import islice
+
+from pyrouge.scoring.corpus import Corpus
+from pyrouge.scoring.lcs import rouge_l
+from pyrouge.scoring.matrix import rouge_n_matrix
+from pyrouge.scoring.ngram import rouge_n
+from pyrouge.scoring.reference_index import get_reference_index
+from pyrouge.scoring.skip_bigram import rouge_s
+from pyrouge.scoring.stemming import get_stemmer
+from pyrouge.scoring.stopwords import get_stopwords, remove_stopwords
+from pyrouge.scoring.tokenization import TokenizedSummary, read_sentences
+from pyrouge.scoring.wlcs import rouge_w
+from pyrouge.utils.rouge_output import (
+    MEASURE_NAMES, StreamingBootstrap, f_score, round_score, scores_to_dict)
+
+
+class RougeScorer(object):
+    """
+    In-process implementation of the ROUGE-1.5.5 scores which needs no
+    Perl, temporary files, XML configuration or subprocess. The scores
+    are computed like ROUGE-1.5.5.pl computes them and are meant to
+    match ROUGE's to the five decimals it prints. The parity tests and
+    tests/parity.py compare them with an installed ROUGE-1.5.5.pl; run
+    them before relying on the scores in place of ROUGE's.
+
+    This class can be used within Python like this:
+
+    rouge = RougeScorer(n=2)
+    scores = rouge.score_summaries(
+        ["The cat sat on the mat."], [["The cat was on the mat."]])
+    print(scores)
+    ->  OrderedDict([('ROUGE-1', (0.83333, 0.83333, 0.83333)),
+                     ('ROUGE-2', (0.6, 0.6, 0.6)),
+                     ('ROUGE-L', (0.83333, 0.83333, 0.83333))])
+
+    Scores are (recall, precision, f_score) tuples. A ROUGE
+    configuration file, e.g. one written by Rouge155.write_config(), can
+    be scored like this:
+
+    scores = rouge.evaluate_config('rouge_conf.xml')
+    print(rouge.scores_to_dict(scores))
+    ->  {'rouge_1_f_score': ...,
+         'rouge_1_f_score_cb': ...,
+         'rouge_1_f_score_ce': ...,
+         'rouge_1_precision': ...,
+        [...]
+
+    """
+
+    def __init__(self, n=4, lcs=True, weight=None, skip_distance=None,
+                 skip_types=("S",), stemming=False, stopwords=False,
+                 data_dir=None, word_limit=0, byte_limit=0, alpha=0.5,
+                 resampling=1000, confidence=95, seed=0):
+        """
+        Create a RougeScorer object. The arguments correspond to the
+        ROUGE-1.5.5.pl options of the same meaning.
+
+            n:          Compute ROUGE-1 up to ROUGE-n (-n).
+            lcs:        Compute summary-level ROUGE-L (disabled by -x).
+            weight:     Compute ROUGE-W with this weighting factor (-w),
+                        e.g. 1.2. None disables ROUGE-W.
+            skip_distance:
+                        Compute skip-bigram scores with at most this
+                        many skipped tokens, or any number if negative
+                        (-2). None disables them.
+            skip_types: Skip-bigram scores to compute: ("S",) for
+                        ROUGE-S (default), ("SU",) for ROUGE-SU (-u) or
+                        ("S", "SU") for both (-U).
+            stemming:   Stem the tokens with ROUGE's Porter stemmer and
+                        WordNet exceptions (-m).
+            stopwords:  Remove the stopwords of smart_common_words.txt
+                        before stemming (-s).
+            data_dir:   ROUGE data directory (-e), e.g.
+                        Rouge155().data_dir. Needed for stemming and
+                        stopword removal.
+            word_limit: Only use the first word_limit words of every
+                        summary (-l), 0 for no limit.
+            byte_limit: Only use the first byte_limit bytes of every
+                        summary (-b), 0 for no limit.
+            alpha:      Weight of recall in the F-measure (-p).
+            resampling: Number of bootstrap samples for the confidence
+                        intervals (-r).
+            confidence: Confidence level in percent (-c).
+            seed:       Seed of the random number generator used for
+                        resampling.
+
+        """
+        self.n = n
+        self.lcs = lcs
+        self.weight = weight
+        self.skip_distance = skip_distance
+        self.skip_types = skip_types
+        self.data_dir = data_dir
+        if (stemming or stopwords) and not data_dir:
+            raise Exception(
+                "Stemming and stopword removal need the ROUGE data "
+                "directory, e.g. Rouge155().data_dir.")
+        self.stemmer = get_stemmer(data_dir) if stemming else None
+        self.stopwords = get_stopwords(data_dir) if stopwords else None
+        self.word_limit = word_limit
+        self.byte_limit = byte_limit
+        self.alpha = alpha
+        self.resampling = resampling
+        self.confidence = confidence
+        self.seed = seed
+
+    @staticmethod
+    def from_options(options):
+        """
+        Create a RougeScorer from ROUGE-1.5.5.pl command line options,
+        e.g. "-e data -c 95 -2 4 -U -r 1000 -n 4 -w 1.2 -a -m", given as
+        string or list. Options which only concern ROUGE's input or
+        output (-a, -d, -v, -z) are ignored.
+
+        """
+        if not isinstance(options, (list, tuple)):
+            options = options.split()
+        options = [str(option) for option in options]
+        with_value = set([
+            "-e", "-n", "-l", "-b", "-p", "-r", "-c", "-t", "-f", "-w",
+            "-2", "-3", "-z"])
+        values = {}
+        i = 0
+        while i < len(options):
+            option = options[i]
+            if option in with_value:
+                if i + 1 == len(options):
+                    raise Exception(
+                        "Missing value of ROUGE option {}.".format(option))
+                values[option] = options[i + 1]
+                i += 2
+            else:
+                values[option] = True
+                i += 1
+        if values.get("-t", "0") != "0" or values.get("-f", "A") != "A" \
+                or "-3" in values or "-M" in values:
+            raise Exception(
+                "Only ROUGE's default counting (-t 0) and scoring (-f A) "
+                "modes are supported in-process, without BE scores (-3) "
+                "or -M.")
+        skip_types = ("S",)
+        if "-U" in values:
+            skip_types = ("S", "SU")
+        elif "-u" in values:
+            skip_types = ("SU",)
+        return RougeScorer(
+            n=int(values.get("-n", 0)),
+            lcs="-x" not in values,
+            weight=float(values["-w"]) if "-w" in values else None,
+            skip_distance=int(values["-2"]) if "-2" in values else None,
+            skip_types=skip_types,
+            stemming="-m" in values,
+            stopwords="-s" in values,
+            data_dir=values.get("-e"),
+            word_limit=int(values.get("-l", 0)),
+            byte_limit=int(values.get("-b", 0)),
+            alpha=float(values.get("-p", 0.5)),
+            resampling=int(values.get("-r", 1000)),
+            confidence=int(values.get("-c", 95)))
+
+    def tokenize_summary(self, sentences):
+        """
+        Tokenize the sentences of a summary, truncate it to the length
+        limit, then remove the stopwords and stem the tokens if enabled.
+
+        Returns: List of token lists, one per sentence.
+
+        """
+        return self.truncate_summary(TokenizedSummary(sentences))
+
+    def truncate_summary(self, summary, word_limit=None, byte_limit=None):
+        """
+        Take a length limited view of a TokenizedSummary, then remove the
+        stopwords and stem the tokens if enabled. Scoring a summary read
+        once for several length limits looks like this:
+
+        peer = TokenizedSummary(read_sentences(peer_path))
+        models = [TokenizedSummary(read_sentences(p)) for p in model_paths]
+        for limit in [50, 100, 200]:
+            scores = rouge.score_tokenized(
+                rouge.truncate_summary(peer, word_limit=limit),
+                [rouge.truncate_summary(m, word_limit=limit)
+                 for m in models])
+
+            word_limit: Word limit, the scorer's word_limit if None.
+            byte_limit: Byte limit, the scorer's byte_limit if None.
+
+        Returns: List of token lists, one per sentence.
+
+        """
+        tokenized = summary.truncate(
+            self.word_limit if word_limit is None else word_limit,
+            self.byte_limit if byte_limit is None else byte_limit)
+        if self.stopwords is not None:
+            tokenized = [
+                remove_stopwords(tokens, self.stopwords)
+                for tokens in tokenized]
+        if self.stemmer is not None:
+            tokenized = [
+                self.stemmer.stem_tokens(tokens) for tokens in tokenized]
+        return tokenized
+
+    def score_tokenized(self, peer, models, reference_index=None,
+                        model_filenames=None):
+        """
+        Score a tokenized peer summary against tokenized model summaries
+        as returned by tokenize_summary().
+
+            reference_index:    Optional ReferenceNgramIndex from which
+                                the model n-gram counts for ROUGE-N are
+                                taken instead of counting them in models.
+            model_filenames:    Filenames of the models in the index.
+
+        models is only used for the measures other than ROUGE-N when a
+        reference index is given, and can be None if there are none.
+
+        Returns: OrderedDict mapping the ROUGE type, e.g. "ROUGE-1", to
+                 a (recall, precision, f_score) tuple.
+
+        """
+        peer_tokens = [token for sentence in peer for token in sentence]
+        if models is not None:
+            models_tokens = [
+                [token for sentence in model for token in sentence]
+                for model in models]
+        scores = OrderedDict()
+        for n in range(1, self.n + 1):
+            if reference_index is not None:
+                counts = reference_index.rouge_n(
+                    peer_tokens, model_filenames, n)
+            else:
+                counts = rouge_n(peer_tokens, models_tokens, n)
+            scores["ROUGE-{}".format(n)] = self.__scores(*counts)
+        if self.lcs:
+            scores["ROUGE-L"] = self.__scores(*rouge_l(peer, models))
+        if self.weight is not None:
+            scores["ROUGE-W-{}".format(self.weight)] = self.__scores(
+                *rouge_w(peer, models, self.weight), weight=self.weight)
+        if self.skip_distance is not None:
+            distance = "*" if self.skip_distance < 0 else self.skip_distance
+            for skip_type in self.skip_types:
+                scores["ROUGE-{}{}".format(skip_type, distance)] = \
+                    self.__scores(*rouge_s(
+                        peer_tokens, models_tokens, self.skip_distance,
+                        unigrams=skip_type == "SU"))
+        return scores
+
+    def score_summaries(self, peer_sentences, models_sentences):
+        """
+        Score a peer summary against model summaries.
+
+            peer_sentences:     List of the sentences of the peer summary.
+            models_sentences:   List of the sentence lists of the model
+                                summaries.
+
+        Returns: OrderedDict mapping the ROUGE type, e.g. "ROUGE-1", to
+                 a (recall, precision, f_score) tuple.
+
+        """
+        return self.score_tokenized(
+            self.tokenize_summary(peer_sentences),
+            [self.tokenize_summary(model) for model in models_sentences])
+
+    def read_corpus(self, directory, input_format="SEE", corpus=None,
+                    filename_pattern=None, prefix=""):
+        """
+        Read the summaries of a directory into a Corpus, tokenized with
+        tokenize_summary(). Each file is read once; afterwards any number
+        of evaluations can be scored from the corpus with score_corpus().
+        cf. Corpus.add_directory for the arguments.
+
+            corpus:     Corpus to add the summaries to, a new one if None.
+
+        Returns: The corpus.
+
+        """
+        if corpus is None:
+            corpus = Corpus()
+        corpus.add_directory(
+            directory, self.tokenize_summary, input_format,
+            filename_pattern, prefix)
+        return corpus
+
+    def score_corpus(self, corpus, peer_name, model_names):
+        """
+        Score a peer summary of a Corpus against model summaries of the
+        same corpus.
+
+        Returns: OrderedDict mapping the ROUGE type, e.g. "ROUGE-1", to
+                 a (recall, precision, f_score) tuple.
+
+        """
+        return self.score_tokenized(
+            corpus.sentences(peer_name),
+            [corpus.sentences(name) for name in model_names])
+
+    def score_matrix(self, candidates, references=None):
+        """
+        ROUGE-1 up to ROUGE-n of every candidate summary against every
+        reference summary, or against every other candidate if references
+        is None (cf. pyrouge.scoring.matrix.rouge_n_matrix). The scores
+        are not rounded.
+
+            candidates: List of the sentence lists of the candidates.
+            references: Optional list of the sentence lists of the
+                        references.
+
+        Returns: OrderedDict mapping the ROUGE type, e.g. "ROUGE-1", to a
+                 K x M x 3 array of (recall, precision, f_score), with
+                 row i and column j scoring candidate i against
+                 reference j.
+
+        """
+        flatten = lambda summary: [
+            token for sentence in self.tokenize_summary(summary)
+            for token in sentence]
+        candidates_tokens = [flatten(summary) for summary in candidates]
+        references_tokens = None
+        if references is not None:
+            references_tokens = [flatten(summary) for summary in references]
+        scores = OrderedDict()
+        for n in range(1, self.n + 1):
+            scores["ROUGE-{}".format(n)] = rouge_n_matrix(
+                candidates_tokens, references_tokens, n, self.alpha)
+        return scores
+
+    def evaluate_config(self, config_file_path, index_dir=None):
+        """
+        Score all peer summaries of a ROUGE configuration file, e.g. one
+        written by Rouge155.write_config or, with several peers per
+        document, by MyRouge155.write_config_staticA.
+
+            index_dir:  Optional directory of reference n-gram indexes
+                        (cf. ReferenceNgramIndex). The model n-gram
+                        counts are then taken from the index of each
+                        model directory, which is built on first use and
+                        reused by later evaluations of any system against
+                        the same models.
+
+        Returns: OrderedDict mapping (system ID, ROUGE type) to a list of
+                 (eval ID, recall, precision, f_score) tuples, like
+                 pyrouge.utils.rouge_output.parse_per_document_scores
+                 returns for ROUGE's output with the -d option.
+
+        """
+        indexes = {}
+        if index_dir is not None:
+            indexes = self.__reference_indexes(config_file_path, index_dir)
+        needs_models = not indexes or self.lcs or self.weight is not None \
+            or self.skip_distance is not None
+        results = OrderedDict()
+        for (eval_id, input_format, peer_root, peers,
+                model_root, models) in iter_config_entries(config_file_path):
+            models_tokens = None
+            if needs_models:
+                models_tokens = [
+                    self.tokenize_summary(read_sentences(
+                        os.path.join(model_root, model), input_format))
+                    for model in models]
+            for peer_id, peer in peers:
+                peer_tokens = self.tokenize_summary(read_sentences(
+                    os.path.join(peer_root, peer), input_format))
+                scores = self.score_tokenized(
+                    peer_tokens, models_tokens,
+                    indexes.get((model_root, input_format)), models)
+                for rouge_type, (recall, precision, f) in scores.items():
+                    results.setdefault((peer_id, rouge_type), []).append(
+                        ("{}.{}".format(eval_id, peer_id),
+                         recall, precision, f))
+        return results
+
+    def evaluate_pairs(self, pairs, chunk_size=1000):
+        """
+        Score a stream of documents, e.g. read lazily from a dataset of
+        millions of summaries, without writing any files. The documents
+        are scored in chunks of chunk_size; after each chunk, the scores
+        are added to a StreamingBootstrap and the per-document results
+        are yielded. Memory is bounded by the chunk size and the number
+        of bootstrap samples, not by the number of documents.
+
+            pairs:  Iterable of (document ID, peer sentences, list of
+                    model sentence lists) tuples.
+
+        The confidence intervals are estimated with the Poisson bootstrap
+        (cf. StreamingBootstrap), so unlike the averages they can differ
+        slightly from those ROUGE prints for the same documents.
+
+        Yields: (document ID, scores) tuples, where scores is an
+                OrderedDict like score_tokenized() returns, and finally
+                a (None, averages) tuple, where averages is the
+                dictionary Rouge155.output_to_dict returns.
+
+        """
+        pairs = iter(pairs)
+        rouge_types = bootstrap = None
+        while True:
+            chunk = list(islice(pairs, chunk_size))
+            if not chunk:
+                break
+            results, rows = [], []
+            for doc_id, peer_sentences, models_sentences in chunk:
+                scores = self.score_summaries(
+                    peer_sentences, models_sentences)
+                if bootstrap is None:
+                    rouge_types = list(scores)
+                    bootstrap = StreamingBootstrap(
+                        3 * len(rouge_types), self.resampling,
+                        self.confidence, self.seed)
+                rows.append([v for values in scores.values() for v in values])
+                results.append((doc_id, scores))
+            bootstrap.add(rows)
+            for result in results:
+                yield result
+        averages = {}
+        if bootstrap is not None:
+            columns = iter(zip(bootstrap.means(), bootstrap.intervals()))
+            for rouge_type in rouge_types:
+                rouge_type = rouge_type.lower().replace("-", "_")
+                for measure in "RPF":
+                    average, (lower, upper) = next(columns)
+                    key = "{}_{}".format(rouge_type, MEASURE_NAMES[measure])
+                    averages[key] = round_score(average)
+                    averages[key + "_cb"] = round_score(lower)
+                    averages[key + "_ce"] = round_score(upper)
+        yield None, averages
+
+    def pair_to_dict(self, scores):
+        """
+        Convert the scores of a single peer summary as returned by
+        score_tokenized() into the dictionary Rouge155.output_to_dict
+        returns. With a single document, the confidence intervals are
+        the scores themselves, so no resampling is needed.
+
+        """
+        results = {}
+        for rouge_type, values in scores.items():
+            rouge_type = rouge_type.lower().replace("-", "_")
+            for measure, value in zip(
+                    ("recall", "precision", "f_score"), values):
+                key = "{}_{}".format(rouge_type, measure)
+                value = round_score(value)
+                results[key] = results[key + "_cb"] = \
+                    results[key + "_ce"] = value
+        return results
+
+    def scores_to_dict(self, scores):
+        """
+        Average per-document scores as returned by evaluate_config() into
+        the dictionary Rouge155.output_to_dict returns.
+
+        """
+        return scores_to_dict(
+            scores, self.resampling, self.confidence, self.seed)
+
+    def __reference_indexes(self, config_file_path, index_dir):
+        """
+        Get the reference n-gram indexes of all model directories of a
+        ROUGE configuration file.
+
+        Returns: Dictionary mapping (model root, input format) to a
+                 ReferenceNgramIndex.
+
+        """
+        model_files = OrderedDict()
+        for (_, input_format, _, _, model_root,
+                models) in iter_config_entries(config_file_path):
+            model_files.setdefault(
+                (model_root, input_format), set()).update(models)
+        options = [
+            self.stemmer is not None, self.stopwords is not None,
+            self.data_dir and os.path.abspath(self.data_dir),
+            self.word_limit, self.byte_limit]
+        indexes = {}
+        for (model_root, input_format), models in model_files.items():
+            tokenize_file = lambda path, input_format=input_format: [
+                token for sentence in self.tokenize_summary(
+                    read_sentences(path, input_format))
+                for token in sentence]
+            indexes[model_root, input_format] = get_reference_index(
+                index_dir, model_root, models, tokenize_file, self.n,
+                options + [input_format])
+        return indexes
+
+    def __scores(self, hit, model_total, peer_total, weight=1):
+        """
+        Recall, precision and F-measure from hit and total counts. Like
+        ROUGE-1.5.5.pl, recall and precision are rounded to five decimals
+        before the F-measure is computed from them. For ROUGE-W, the
+        ratios are mapped back with the inverse weighting function.
+
+        """
+        recall = precision = 0.0
+        if model_total:
+            recall = round_score((hit / model_total) ** (1 / weight))
+        if peer_total:
+            precision = round_score((hit / peer_total) ** (1 / weight))
+        return recall, precision, f_score(recall, precision, self.alpha)
+
+
+def iter_config_entries(config_file_path):
+    """
+    Parse a ROUGE configuration file incrementally.
+
+    Yields: (eval ID, input format, peer root, [(peer ID, peer filename)],
+             model root, [model filename]) tuples, one per <EVAL> element.
+
+    """
+    root = None
+    events = et.iterparse(config_file_path, events=('start', 'end'))
+    for event, elem in events:
+        if root is None:
+            root = elem
+        elif event == 'end' and elem.tag == 'EVAL':
+            input_format = elem.find('INPUT-FORMAT')
+            yield (
+                elem.get('ID'),
+                input_format.get('TYPE') if input_format is not None
+                else "SEE",
+                elem.findtext('PEER-ROOT').strip(),
+                [(p.get('ID'), p.text.strip())
+                 for p in elem.find('PEERS').findall('P')],
+                elem.findtext('MODEL-ROOT').strip(),
+                [m.text.strip() for m in elem.find('MODELS').findall('M')])
+            root.clear()
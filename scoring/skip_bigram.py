@@ -0,0 +1,122 @@
+from __future__ import print_function, unicode_literals, division
+
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def token_ids(summaries):
+    """
+    Map the tokens of a list of token lists to IDs of a vocabulary shared
+    by all of them.
+
+    Returns: (list of ID lists, vocabulary size) tuple.
+
+    """
+    vocabulary = {}
+    ids = [
+        [vocabulary.setdefault(token, len(vocabulary)) for token in tokens]
+        for tokens in summaries]
+    return ids, len(vocabulary)
+
+
+def skip_bigram_counts(ids, vocabulary_size, skip_distance=4,
+                       unigrams=False):
+    """
+    Count the skip-bigrams of a token ID sequence like ROUGE-1.5.5's
+    createSkipBigram: every ordered pair of tokens with at most
+    skip_distance tokens between them, or any number if skip_distance is
+    negative. Instead of enumerating the pairs, the sequence is compared
+    with itself shifted by 1 up to skip_distance + 1 positions, and each
+    pair is encoded as the integer first * vocabulary_size + second.
+
+        ids:                List of token IDs.
+        vocabulary_size:    Number of distinct token IDs.
+        skip_distance:      Maximum number of skipped tokens (-2).
+        unigrams:           Also count the single tokens, as for
+                            ROUGE-SU (-u). They are encoded as
+                            vocabulary_size ** 2 + ID.
+
+    Returns: (sorted array of distinct codes, array of their counts)
+             tuple with NumPy, otherwise a Counter mapping codes to
+             counts.
+
+    """
+    n = len(ids)
+    max_shift = n - 1 if skip_distance < 0 else min(skip_distance + 1, n - 1)
+    if np is None:
+        counts = Counter()
+        for shift in range(1, max_shift + 1):
+            counts.update(
+                first * vocabulary_size + second
+                for first, second in zip(ids, ids[shift:]))
+        if unigrams:
+            counts.update(vocabulary_size ** 2 + i for i in ids)
+        return counts
+    ids = np.asarray(ids, dtype=np.int64)
+    codes = [
+        ids[:-shift] * vocabulary_size + ids[shift:]
+        for shift in range(1, max_shift + 1)]
+    if unigrams:
+        codes.append(vocabulary_size ** 2 + ids)
+    if not codes:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.unique(np.concatenate(codes), return_counts=True)
+
+
+def count_total(counts):
+    """
+    Number of skip-bigrams counted by skip_bigram_counts, ROUGE's "_cn_"
+    count.
+
+    """
+    if np is None:
+        return sum(counts.values())
+    return int(counts[1].sum())
+
+
+def count_overlap(counts1, counts2):
+    """
+    Clipped number of matching skip-bigrams of two results of
+    skip_bigram_counts.
+
+    """
+    if np is None:
+        if len(counts1) > len(counts2):
+            counts1, counts2 = counts2, counts1
+        return sum(
+            min(count, counts2[code])
+            for code, count in counts1.items() if code in counts2)
+    _, index1, index2 = np.intersect1d(
+        counts1[0], counts2[0], assume_unique=True, return_indices=True)
+    return int(np.minimum(counts1[1][index1], counts2[1][index2]).sum())
+
+
+def rouge_s(peer_tokens, models_tokens, skip_distance=4, unigrams=False):
+    """
+    ROUGE-S (or with unigrams ROUGE-SU) hit and total counts of a peer
+    summary against a list of model summaries, averaging over the models
+    like ROUGE-1.5.5's default -f A scoring mode.
+
+        peer_tokens:    Token list of the peer summary.
+        models_tokens:  List of token lists of the model summaries.
+        skip_distance:  Maximum number of skipped tokens, negative for
+                        no limit (-2).
+        unigrams:       Count unigrams as well (-u).
+
+    Returns: (hit, model_total, peer_total) tuple.
+
+    """
+    ids, vocabulary_size = token_ids([peer_tokens] + list(models_tokens))
+    peer_counts = skip_bigram_counts(
+        ids[0], vocabulary_size, skip_distance, unigrams)
+    hit = model_total = 0
+    for model_ids in ids[1:]:
+        model_counts = skip_bigram_counts(
+            model_ids, vocabulary_size, skip_distance, unigrams)
+        hit += count_overlap(peer_counts, model_counts)
+        model_total += count_total(model_counts)
+    return hit, model_total, count_total(peer_counts) * len(models_tokens)
@@ -0,0 +1,209 @@
+from __future__ import print_function, unicode_literals, division
+
+import codecs
+import os
+import re
+
+
+# Regular expressions of Martin Porter's Perl implementation of his
+# stemmer, which ROUGE-1.5.5.pl uses.
+_c = "[^aeiou]"
+_v = "[aeiouy]"
+_C = _c + "[^aeiouy]*"
+_V = _v + "[aeiou]*"
+MGR0 = re.compile("^(" + _C + ")?" + _V + _C)
+MEQ1 = re.compile("^(" + _C + ")?" + _V + _C + "(" + _V + ")?$")
+MGR1 = re.compile("^(" + _C + ")?" + _V + _C + _V + _C)
+VOWEL_IN_STEM = re.compile("^(" + _C + ")?" + _v)
+CVC = re.compile("^" + _C + _v + "[^aeiouwxy]$")
+
+STEP2_SUFFIXES = {
+    "ational": "ate", "tional": "tion", "enci": "ence", "anci": "ance",
+    "izer": "ize", "bli": "ble", "alli": "al", "entli": "ent", "eli": "e",
+    "ousli": "ous", "ization": "ize", "ation": "ate", "ator": "ate",
+    "alism": "al", "iveness": "ive", "fulness": "ful", "ousness": "ous",
+    "aliti": "al", "iviti": "ive", "biliti": "ble", "logi": "log",
+    }
+STEP3_SUFFIXES = {
+    "icate": "ic", "ative": "", "alize": "al", "iciti": "ic", "ical": "ic",
+    "ful": "", "ness": "",
+    }
+STEP2 = re.compile(
+    "(ational|tional|enci|anci|izer|bli|alli|entli|eli|ousli|ization|"
+    "ation|ator|alism|iveness|fulness|ousness|aliti|iviti|biliti|logi)$")
+STEP3 = re.compile("(icate|ative|alize|iciti|ical|ful|ness)$")
+STEP4 = re.compile(
+    "(al|ance|ence|er|ic|able|ible|ant|ement|ment|ent|ou|ism|ate|iti|ous|"
+    "ive|ize)$")
+
+WORDNET_EXCEPTIONS_DIR = "WordNet-2.0-Exceptions"
+
+
+def porter_stem(w):
+    """
+    Stem a lowercase word with the Porter stemmer, exactly like the Perl
+    implementation ROUGE-1.5.5.pl uses.
+
+    """
+    if len(w) < 3:
+        return w
+    first_y = w[0] == "y"
+    if first_y:
+        w = "Y" + w[1:]
+
+    # Step 1a
+    match = re.search("(ss|i)es$", w)
+    if match:
+        w = w[:match.start()] + match.group(1)
+    else:
+        match = re.search("([^s])s$", w)
+        if match:
+            w = w[:match.start()] + match.group(1)
+    # Step 1b
+    if w.endswith("eed"):
+        if MGR0.search(w[:-3]):
+            w = w[:-1]
+    else:
+        match = re.search("(ed|ing)$", w)
+        if match:
+            stem = w[:match.start()]
+            if VOWEL_IN_STEM.search(stem):
+                w = stem
+                if re.search("(at|bl|iz)$", w):
+                    w += "e"
+                elif re.search(r"([^aeiouylsz])\1$", w):
+                    w = w[:-1]
+                elif CVC.search(w):
+                    w += "e"
+    # Step 1c
+    if w.endswith("y"):
+        stem = w[:-1]
+        if VOWEL_IN_STEM.search(stem):
+            w = stem + "i"
+    # Step 2
+    match = STEP2.search(w)
+    if match:
+        stem = w[:match.start()]
+        if MGR0.search(stem):
+            w = stem + STEP2_SUFFIXES[match.group(1)]
+    # Step 3
+    match = STEP3.search(w)
+    if match:
+        stem = w[:match.start()]
+        if MGR0.search(stem):
+            w = stem + STEP3_SUFFIXES[match.group(1)]
+    # Step 4
+    match = STEP4.search(w)
+    if match:
+        stem = w[:match.start()]
+        if MGR1.search(stem):
+            w = stem
+    else:
+        match = re.search("(s|t)(ion)$", w)
+        if match:
+            stem = w[:match.start()] + match.group(1)
+            if MGR1.search(stem):
+                w = stem
+    # Step 5
+    if w.endswith("e"):
+        stem = w[:-1]
+        if MGR1.search(stem) or (MEQ1.search(stem) and not CVC.search(stem)):
+            w = stem
+    if w.endswith("ll") and MGR1.search(w):
+        w = w[:-1]
+
+    if first_y:
+        w = "y" + w[1:]
+    return w
+
+
+def read_wordnet_exceptions(data_dir):
+    """
+    Read the WordNet exception lists (adj.exc, adv.exc, noun.exc and
+    verb.exc) of the ROUGE data directory, from which ROUGE builds its
+    WordNet-2.0.exc.db. A later entry for the same word replaces an
+    earlier one, as when the database is built.
+
+    Returns: Dictionary mapping inflected forms to their base forms.
+
+    """
+    exceptions_dir = os.path.join(data_dir, WORDNET_EXCEPTIONS_DIR)
+    if not os.path.isdir(exceptions_dir):
+        raise Exception(
+            "Cannot find the WordNet exceptions directory {}.".format(
+                exceptions_dir))
+    exceptions = {}
+    for filename in sorted(os.listdir(exceptions_dir)):
+        if not filename.endswith(".exc"):
+            continue
+        path = os.path.join(exceptions_dir, filename)
+        with codecs.open(path, "r", encoding="latin-1") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) > 1:
+                    exceptions[fields[0]] = fields[1]
+    return exceptions
+
+
+class MorphStemmer(object):
+    """
+    ROUGE-1.5.5's stemmer (-m): a token is looked up in the WordNet
+    exceptions, and stemmed with the Porter stemmer if it is none.
+    Stems are memoized, so every distinct token is only stemmed once.
+    Use get_stemmer() to share one stemmer, and its cache, within the
+    process.
+
+    """
+
+    def __init__(self, data_dir=None):
+        """
+            data_dir:   ROUGE data directory with the WordNet exceptions,
+                        e.g. Rouge155().data_dir. Without it, only the
+                        Porter stemmer is used.
+
+        """
+        self.exceptions = read_wordnet_exceptions(data_dir) \
+            if data_dir else {}
+        self.cache = {}
+
+    def stem(self, token):
+        """
+        Stem a lowercase token. Like ROUGE, tokens of up to three
+        characters are left alone.
+
+        """
+        try:
+            return self.cache[token]
+        except KeyError:
+            pass
+        stem = token
+        if len(token) > 3:
+            stem = self.exceptions.get(token)
+            if stem is None:
+                stem = porter_stem(token)
+        self.cache[token] = stem
+        return stem
+
+    def stem_tokens(self, tokens):
+        """
+        Stem a list of tokens.
+
+        """
+        cache = self.cache
+        return [
+            cache[token] if token in cache else self.stem(token)
+            for token in tokens]
+
+
+_stemmers = {}
+
+
+def get_stemmer(data_dir=None):
+    """
+    Return the process-wide MorphStemmer for a ROUGE data directory.
+
+    """
+    key = os.path.abspath(data_dir) if data_dir else None
+    if key not in _stemmers:
+        _stemmers[key] = MorphStemmer(data_dir)
+    return _stemmers[key]
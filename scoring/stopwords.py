@@ -0,0 +1,48 @@
+from __future__ import print_function, unicode_literals, division
+
+import codecs
+import os
+
+
+STOPWORDS_FILENAME = "smart_common_words.txt"
+
+
+def read_stopwords(path):
+    """
+    Read a stopword list with one word per line, like ROUGE-1.5.5 reads
+    smart_common_words.txt for its -s option.
+
+    Returns: frozenset of the stopwords.
+
+    """
+    with codecs.open(path, "r", encoding="latin-1") as f:
+        return frozenset(
+            word for word in (line.strip().lower() for line in f) if word)
+
+
+_stopwords = {}
+
+
+def get_stopwords(data_dir):
+    """
+    Return the stopwords of a ROUGE data directory. The list is read only
+    once per process and shared by all callers; worker processes forked
+    afterwards inherit it.
+
+    """
+    key = os.path.abspath(data_dir)
+    if key not in _stopwords:
+        path = os.path.join(data_dir, STOPWORDS_FILENAME)
+        if not os.path.isfile(path):
+            raise Exception(
+                "Cannot find the stopword list {}.".format(path))
+        _stopwords[key] = read_stopwords(path)
+    return _stopwords[key]
+
+
+def remove_stopwords(tokens, stopwords):
+    """
+    Remove the stopwords from a token list.
+
+    """
+    return [token for token in tokens if token not in stopwords]
@@ -0,0 +1,196 @@
+from __future__ import print_function, unicode_literals, division
+
+import codecs
+import re
+
+
+# <a name="1">[1]</a> <a href="#1" id=1>This is a sentence.</a>
+SEE_SENTENCE_PATTERNS = [
+    re.compile(
+        r"^<a size=\"[0-9]+\" name=\"[0-9]+\">\[([0-9]+)\]</a>\s+"
+        r"<a href=\"#[0-9]+\" id=[0-9]+>([^<]+)"),
+    re.compile(
+        r"^<a name=\"[0-9]+\">\[([0-9]+)\]</a>\s+"
+        r"<a href=\"#[0-9]+\" id=[0-9]+>([^<]+)"),
+    ]
+NON_ALPHANUMERIC_PATTERN = re.compile(r"[^A-Za-z0-9]+")
+TOKEN_BYTES_PATTERN = re.compile(b"[A-Za-z0-9]+")
+WORD_BYTES_PATTERN = re.compile(br"\S+")
+
+
+def read_sentences(path, input_format="SEE"):
+    """
+    Read the sentences of a summary file the way ROUGE-1.5.5 does.
+
+        path:           Path of the summary file.
+        input_format:   "SEE" for the HTML format written by
+                        Rouge155.convert_text_to_rouge_format, "SPL" for
+                        plain text with one sentence per line.
+
+    Returns: List of sentence strings.
+
+    """
+    with codecs.open(path, "r", encoding="UTF-8") as f:
+        text = f.read()
+    if input_format.upper() == "SEE":
+        return see_sentences(text)
+    return text_sentences(text)
+
+
+def see_sentences(html):
+    """
+    Extract the sentences from a summary in ROUGE's SEE format. Like
+    ROUGE, only the text up to the first "<" of every sentence element
+    is used.
+
+    """
+    sentences = []
+    for line in html.split("\n"):
+        for pattern in SEE_SENTENCE_PATTERNS:
+            match = pattern.match(line)
+            if match:
+                sentences.append(match.group(2))
+                break
+    return sentences
+
+
+def text_sentences(text):
+    """
+    Split a plain text summary with one sentence per line into its
+    sentences, skipping empty lines like ROUGE does for the SPL format.
+
+    """
+    sentences = []
+    for line in text.split("\n"):
+        line = line.strip()
+        if line:
+            sentences.append(line)
+    return sentences
+
+
+def summary_sentences(text):
+    """
+    Return the sentences ROUGE would read from the file written by
+    Rouge155.convert_text_to_rouge_format(text), without writing it.
+
+    """
+    sentences = []
+    for line in text.split("\n"):
+        sentence = line.split("<", 1)[0]
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+
+def tokenize(sentence):
+    """
+    Tokenize a sentence like ROUGE-1.5.5: ASCII letters are lowercased,
+    everything but ASCII letters and digits separates tokens.
+
+    Returns: List of token strings.
+
+    """
+    return NON_ALPHANUMERIC_PATTERN.sub(" ", sentence).lower().split()
+
+
+class TokenizedSummary(object):
+    """
+    A summary which is tokenized once and from which ROUGE-1.5.5's word
+    (-l) and byte (-b) length limits are taken as views, so that several
+    limits can be scored without reading or tokenizing it again.
+
+    Like ROUGE, the limits count the whitespace separated words and the
+    bytes of the UTF-8 encoded sentences before tokenization: sentences
+    are taken whole while they fit, and the first one which does not is
+    cut to the remaining words or bytes. A token cut by a byte limit is
+    kept truncated.
+
+    """
+
+    def __init__(self, sentences):
+        """
+            sentences:  List of sentence strings, e.g. as returned by
+                        read_sentences.
+
+        """
+        self.sentences = []
+        self.__texts = []
+        self.__token_spans = []
+        self.__word_token_ends = []
+        for sentence in sentences:
+            text = sentence.encode("UTF-8")
+            spans = [m.span() for m in TOKEN_BYTES_PATTERN.finditer(text)]
+            self.sentences.append([
+                text[start:end].decode("ascii").lower()
+                for start, end in spans])
+            self.__texts.append(text)
+            self.__token_spans.append(spans)
+            self.__word_token_ends.append(self.__count_word_tokens(
+                text, [end for _, end in spans]))
+
+    def truncate(self, word_limit=0, byte_limit=0):
+        """
+        Tokens of the summary within a length limit. The token lists of
+        the sentences within the limit are shared with the summary, not
+        copied.
+
+            word_limit: Maximum number of words (-l), 0 for none.
+            byte_limit: Maximum number of bytes (-b), 0 for none. Only
+                        used without a word limit.
+
+        Returns: List of token lists, one per sentence.
+
+        """
+        if word_limit:
+            byte_limit = 0
+        elif not byte_limit:
+            return list(self.sentences)
+        truncated = []
+        n_words = n_bytes = 0
+        for i, tokens in enumerate(self.sentences):
+            word_token_ends = self.__word_token_ends[i]
+            text = self.__texts[i]
+            if (word_limit and n_words + len(word_token_ends) <= word_limit
+                    or byte_limit and n_bytes + len(text) <= byte_limit):
+                truncated.append(tokens)
+                n_words += len(word_token_ends)
+                n_bytes += len(text)
+                continue
+            if word_limit:
+                remaining = word_limit - n_words
+                truncated.append(
+                    tokens[:word_token_ends[remaining - 1]]
+                    if remaining > 0 else [])
+            else:
+                cut = byte_limit - n_bytes
+                kept = []
+                for token, (start, end) in zip(
+                        tokens, self.__token_spans[i]):
+                    if end <= cut:
+                        kept.append(token)
+                    else:
+                        if start < cut:
+                            kept.append(token[:cut - start])
+                        break
+                truncated.append(kept)
+            break
+        return truncated
+
+    @staticmethod
+    def __count_word_tokens(text, token_ends):
+        """
+        Number of tokens up to the end of each of the words Perl's
+        split(/\\s+/) yields for a sentence: a sentence starting with
+        whitespace has an empty first word, trailing empty words are
+        dropped.
+
+        """
+        word_ends = [m.end() for m in WORD_BYTES_PATTERN.finditer(text)]
+        counts = [0] if word_ends and text[:1].isspace() else []
+        n_tokens = 0
+        for word_end in word_ends:
+            while n_tokens < len(token_ends) and \
+                    token_ends[n_tokens] <= word_end:
+                n_tokens += 1
+            counts.append(n_tokens)
+        return counts
@@ -0,0 +1,251 @@
+from __future__ import print_function, unicode_literals, division
+
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+DIAGONAL, UP, LEFT = 0, 1, 2
+# Upper bound on the number of table cells computed at once.
+MAX_TABLE_CELLS = 1 << 22
+
+
+def weight_table(length, weight):
+    """
+    Values of ROUGE's weighting function f(k) = k ** weight for
+    k = 0, ..., length.
+
+    """
+    return [k ** weight for k in range(length + 1)]
+
+
+def wlcs_directions(a, b, weight):
+    """
+    Backtrace directions of the weighted LCS table of two token
+    sequences, computed cell by cell like ROUGE-1.5.5.pl's wlcs: on a
+    match c[i][j] = c[i - 1][j - 1] + f(k + 1) - f(k), where k is the
+    length of the run of consecutive matches ending in cell (i - 1,
+    j - 1), otherwise the larger of c[i - 1][j] and c[i][j - 1], the
+    former winning ties.
+
+    Returns: (len(a) + 1) x (len(b) + 1) nested list of DIAGONAL, UP
+             and LEFT.
+
+    """
+    f = weight_table(min(len(a), len(b)) + 1, weight)
+    m, n = len(a), len(b)
+    c = [[0.0] * (n + 1) for _ in range(m + 1)]
+    lengths = [[0] * (n + 1) for _ in range(m + 1)]
+    directions = [[UP] * (n + 1) for _ in range(m + 1)]
+    for i in range(1, m + 1):
+        for j in range(1, n + 1):
+            if a[i - 1] == b[j - 1]:
+                k = lengths[i - 1][j - 1]
+                c[i][j] = c[i - 1][j - 1] + f[k + 1] - f[k]
+                lengths[i][j] = k + 1
+                directions[i][j] = DIAGONAL
+            elif c[i - 1][j] >= c[i][j - 1]:
+                c[i][j] = c[i - 1][j]
+            else:
+                c[i][j] = c[i][j - 1]
+                directions[i][j] = LEFT
+    return directions
+
+
+def mark_lcs(directions, m, n):
+    """
+    Follow the backtrace directions from cell (m, n).
+
+    Returns: Set of the positions of the first sequence on the LCS.
+
+    """
+    hits = set()
+    i, j = m, n
+    while i > 0 and j > 0:
+        direction = directions[i][j]
+        if direction == DIAGONAL:
+            hits.add(i - 1)
+            i -= 1
+            j -= 1
+        elif direction == UP:
+            i -= 1
+        else:
+            j -= 1
+    return hits
+
+
+def union_wlcs_hits(model_sentences, peer_sentences, weight):
+    """
+    For every model sentence, the positions in the union of its weighted
+    LCS with each of the peer sentences.
+
+    Returns: List of sorted position lists, one per model sentence.
+
+    """
+    if np is not None and model_sentences and peer_sentences:
+        return _union_wlcs_hits_numpy(model_sentences, peer_sentences, weight)
+    union = []
+    for model_sentence in model_sentences:
+        hits = set()
+        for peer_sentence in peer_sentences:
+            hits.update(mark_lcs(
+                wlcs_directions(model_sentence, peer_sentence, weight),
+                len(model_sentence), len(peer_sentence)))
+        union.append(sorted(hits))
+    return union
+
+
+def _union_wlcs_hits_numpy(model_sentences, peer_sentences, weight):
+    """
+    Vectorized version of union_wlcs_hits. The tables of all pairs of
+    model and peer sentences are stacked into one array, padded to the
+    longest sentences, and filled one anti-diagonal at a time: every cell
+    of an anti-diagonal only depends on the two previous ones. The
+    floating point operations are the same as in wlcs_directions, so are
+    the tie-breaks. The backtraces of all pairs are then followed in
+    lockstep.
+
+    """
+    vocabulary = {}
+    peer_ids = _padded_ids(peer_sentences, vocabulary, -2)
+    n_peers, n = peer_ids.shape
+    row_cells = n_peers * (n + 1)
+    union = []
+    start = 0
+    while start < len(model_sentences):
+        # Bound the memory by splitting long summaries into chunks of
+        # model sentences.
+        stop = start + 1
+        m = len(model_sentences[start])
+        while stop < len(model_sentences):
+            m_next = max(m, len(model_sentences[stop]))
+            if (stop + 1 - start) * (m_next + 1) * row_cells > \
+                    MAX_TABLE_CELLS:
+                break
+            m = m_next
+            stop += 1
+        chunk = model_sentences[start:stop]
+        model_ids = _padded_ids(chunk, vocabulary, -1)
+        hits = _wlcs_hits(model_ids, peer_ids, weight)
+        for r, sentence in enumerate(chunk):
+            union.append(np.flatnonzero(hits[r, :len(sentence)]).tolist())
+        start = stop
+    return union
+
+
+def _padded_ids(sentences, vocabulary, padding):
+    """
+    Token ID matrix of a list of sentences, padded with a value which
+    matches no token.
+
+    """
+    ids = np.full(
+        (len(sentences), max(len(s) for s in sentences)), padding,
+        dtype=np.int64)
+    for row, sentence in enumerate(sentences):
+        ids[row, :len(sentence)] = [
+            vocabulary.setdefault(token, len(vocabulary))
+            for token in sentence]
+    return ids
+
+
+def _wlcs_hits(model_ids, peer_ids, weight):
+    """
+    Union of the weighted LCS hit positions of every model sentence (row
+    of model_ids) with all peer sentences (rows of peer_ids).
+
+    Returns: Boolean array of the shape of model_ids.
+
+    """
+    n_models, m = model_ids.shape
+    n_peers, n = peer_ids.shape
+    f = np.array(weight_table(min(m, n) + 1, weight))
+    equal = model_ids[:, None, :, None] == peer_ids[None, :, None, :]
+    shape = (n_models, n_peers, m + 1, n + 1)
+    c = np.zeros(shape)
+    lengths = np.zeros(shape, dtype=np.int64)
+    directions = np.full(shape, UP, dtype=np.int8)
+    for d in range(2, m + n + 1):
+        i = np.arange(max(1, d - n), min(m, d - 1) + 1)
+        j = d - i
+        match = equal[:, :, i - 1, j - 1]
+        k = lengths[:, :, i - 1, j - 1]
+        up = c[:, :, i - 1, j]
+        left = c[:, :, i, j - 1]
+        take_up = up >= left
+        c[:, :, i, j] = np.where(
+            match, c[:, :, i - 1, j - 1] + f[k + 1] - f[k],
+            np.where(take_up, up, left))
+        lengths[:, :, i, j] = np.where(match, k + 1, 0)
+        directions[:, :, i, j] = np.where(
+            match, DIAGONAL, np.where(take_up, UP, LEFT))
+
+    # Backtrace from cell (length of model sentence, length of peer
+    # sentence) of every pair.
+    rows, peers = np.meshgrid(
+        np.arange(n_models), np.arange(n_peers), indexing="ij")
+    i = np.broadcast_to(
+        (model_ids >= 0).sum(axis=1)[:, None], rows.shape).copy()
+    j = np.broadcast_to(
+        (peer_ids >= 0).sum(axis=1)[None, :], rows.shape).copy()
+    hits = np.zeros((n_models, m), dtype=bool)
+    active = (i > 0) & (j > 0)
+    while active.any():
+        r, p = rows[active], peers[active]
+        ia, ja = i[active], j[active]
+        direction = directions[r, p, ia, ja]
+        diagonal = direction == DIAGONAL
+        hits[r[diagonal], ia[diagonal] - 1] = True
+        i[active] = ia - (direction != LEFT)
+        j[active] = ja - (direction != UP)
+        active = (i > 0) & (j > 0)
+    return hits
+
+
+def rouge_w(peer_sentences, models_sentences, weight=1.2):
+    """
+    Summary-level ROUGE-W hit and total counts of a peer summary against
+    a list of model summaries, like ROUGE-1.5.5's default -f A scoring
+    mode. The hits are the union weighted LCS hits, clipped by the token
+    counts like for ROUGE-L, with every run of consecutive hits in a
+    model sentence weighted by f(k) = k ** weight. Like ROUGE-1.5.5.pl,
+    the model total of a model summary is f(sum of f(sentence length)),
+    the peer total f(peer length).
+
+        peer_sentences:     List of token lists, one per peer sentence.
+        models_sentences:   List of such lists, one per model summary.
+        weight:             Weighting factor (-w).
+
+    Returns: (hit, model_total, peer_total) tuple. Recall and precision
+             are (hit / total) ** (1 / weight).
+
+    """
+    peer_unigrams = Counter(
+        token for sentence in peer_sentences for token in sentence)
+    peer_total = sum(peer_unigrams.values())
+    hit = model_total = 0.0
+    for model_sentences in models_sentences:
+        model_unigrams = Counter(
+            token for sentence in model_sentences for token in sentence)
+        base = 0.0
+        for sentence in model_sentences:
+            base += len(sentence) ** weight
+        model_total += base ** weight
+        peer_counts = Counter(peer_unigrams)
+        union = union_wlcs_hits(model_sentences, peer_sentences, weight)
+        for model_sentence, positions in zip(model_sentences, union):
+            marked = set(positions)
+            run = 0
+            for i in positions:
+                token = model_sentence[i]
+                if peer_counts[token] > 0 and model_unigrams[token] > 0:
+                    peer_counts[token] -= 1
+                    model_unigrams[token] -= 1
+                    run += 1
+                    if i + 1 not in marked:
+                        hit += run ** weight
+                        run = 0
+    return hit, model_total, peer_total ** weight * len(models_sentences)
@@ -1,8 +1,10 @@
 import unittest
 
 from pyrouge.tests.Rouge155_test import PyrougeTest
+from pyrouge.tests.RougeScorer_test import RougeScorerTest
 
 loader = unittest.TestLoader()
 suite = unittest.TestSuite()
 suite.addTest(loader.loadTestsFromTestCase(PyrougeTest))
+suite.addTest(loader.loadTestsFromTestCase(RougeScorerTest))
 unittest.TextTestRunner().run(suite)
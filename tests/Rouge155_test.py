@@ -1,20 +1,76 @@
 from __future__ import print_function, unicode_literals, division
 
 import unittest
+import errno
+import gzip
+import json
 import os
+import pickle
 import re
+import shutil
+import tarfile
+import zipfile
 
-from subprocess import check_output
+from functools import partial
+from subprocess import CalledProcessError, check_output
 from tempfile import mkdtemp
 
 from pyrouge import Rouge155
+from pyrouge.Rouge155 import convert_text_to_rouge_format
+from pyrouge.utils import file_utils
 from pyrouge.utils.file_utils import str_from_file, xml_equal
+from pyrouge.utils.file_utils import DirectoryProcessor, ModelFilenameIndex
+from pyrouge.utils.file_utils import model_filename_filter
+from pyrouge.utils.rouge_worker import RougeWorkerPool
+from pyrouge.utils.sentence_splitter import split_to_string
+from pyrouge.utils.rouge_output import (
+    DocumentScore, averages_to_dict, parse_per_document_scores)
+from pyrouge.utils.summary_sources import JsonlSource, open_summary_source
+from pyrouge.utils.workspace import Workspace
 
 
 module_path = os.path.dirname(__file__)
 os.chdir(module_path)
 add_data_path = lambda p: os.path.join('data', p)
 check_output_clean = lambda c: check_output(c).decode("UTF-8").strip()
+# The perl executable Rouge155 runs ROUGE-1.5.5.pl with by default.
+PERL_PATH = r'D:\Perl\bin\perl'
+
+# Stand-in for ROUGE-1.5.5.pl which keeps state in package variables and
+# reads the stopword list and the exception database like ROUGE does.
+FAKE_ROUGE = r"""
+use DB_File;
+use Fcntl;
+use Getopt::Std;
+getopts('ce:msx:');
+$ROUGE_EVAL_HOME = $opt_e;
+$wordnetDB = "$ROUGE_EVAL_HOME/WordNet-2.0.exc.db";
+if (defined($opt_c)) {
+    tie %exceptiondb, 'DB_File', $wordnetDB, O_CREAT|O_RDWR, 0644, $DB_HASH
+        or die "Cannot create $wordnetDB\n";
+    $exceptiondb{"went"} = "go";
+    untie %exceptiondb;
+}
+if (defined($opt_s)) {
+    open(STOPWORDS, "$ROUGE_EVAL_HOME/smart_common_words.txt")
+        || die "Cannot open stopwords\n";
+    while (defined($line = <STOPWORDS>)) {
+        chomp($line);
+        $stopwords{$line} = 1;
+    }
+    close(STOPWORDS);
+}
+if (defined($opt_m)) {
+    tie %exceptiondb, 'DB_File', $wordnetDB, O_RDONLY, 0440, $DB_HASH
+        or die "Cannot open $wordnetDB\n";
+}
+$runs++;
+print "runs $runs\n";
+print "stopwords ", join(" ", sort keys %stopwords), "\n";
+print "went ", defined($exceptiondb{"went"}) ? $exceptiondb{"went"} : "-",
+    "\n";
+exit($opt_x) if defined($opt_x);
+"""
 
 
 class PyrougeTest(unittest.TestCase):
@@ -134,6 +190,195 @@ class PyrougeTest(unittest.TestCase):
             target = target.replace(filename, "dummy title")
             self.assertEqual(output, target, filename)
 
+    def test_parallel_conversion(self):
+        input_dir = add_data_path("SL2003_models_plain_text")
+        output_dir = mkdtemp()
+        parallel_output_dir = mkdtemp()
+        Rouge155.convert_summaries_to_rouge_format(input_dir, output_dir)
+        DirectoryProcessor.process(
+            input_dir, parallel_output_dir, convert_text_to_rouge_format,
+            workers=3, chunk_size=4)
+        filenames = sorted(os.listdir(input_dir))
+        self.assertEqual(sorted(os.listdir(parallel_output_dir)), filenames)
+        for filename in filenames:
+            self.assertEqual(
+                str_from_file(os.path.join(output_dir, filename)),
+                str_from_file(os.path.join(parallel_output_dir, filename)))
+        shutil.rmtree(output_dir)
+        shutil.rmtree(parallel_output_dir)
+
+    def test_spawned_conversion(self):
+        # Where pool workers are spawned instead of forked, e.g. on
+        # Windows, the conversion functions are pickled.
+        self.assertTrue(pickle.loads(pickle.dumps(
+            convert_text_to_rouge_format)) is convert_text_to_rouge_format)
+        self.assertTrue(pickle.loads(pickle.dumps(
+            split_to_string)) is split_to_string)
+        pickle.dumps(partial(split_to_string, language="de"))
+        try:
+            from multiprocessing import get_context
+        except ImportError:
+            # Python 2 cannot spawn workers on POSIX.
+            return
+        input_dir = add_data_path("SL2003_models_plain_text")
+        output_dir = mkdtemp()
+        spawned_output_dir = mkdtemp()
+        Rouge155.convert_summaries_to_rouge_format(input_dir, output_dir)
+        pool = file_utils.Pool
+        file_utils.Pool = get_context("spawn").Pool
+        try:
+            DirectoryProcessor.process(
+                input_dir, spawned_output_dir, convert_text_to_rouge_format,
+                workers=2, chunk_size=4)
+        finally:
+            file_utils.Pool = pool
+        for filename in os.listdir(input_dir):
+            self.assertEqual(
+                str_from_file(os.path.join(output_dir, filename)),
+                str_from_file(os.path.join(spawned_output_dir, filename)))
+        shutil.rmtree(output_dir)
+        shutil.rmtree(spawned_output_dir)
+
+    def test_incremental_conversion(self):
+        temp_dir = mkdtemp()
+        input_dir = os.path.join(temp_dir, "plain")
+        output_dir = os.path.join(temp_dir, "rouge")
+        shutil.copytree(add_data_path("SL2003_models_plain_text"), input_dir)
+        filenames = sorted(os.listdir(input_dir))
+        process = lambda: DirectoryProcessor.process_incremental(
+            input_dir, output_dir, Rouge155.convert_text_to_rouge_format,
+            content_hash=True)
+        self.assertEqual(process(), len(filenames))
+        self.assertEqual(process(), 0)
+        changed = os.path.join(input_dir, filenames[0])
+        with open(changed, "a") as f:
+            f.write("One more sentence.\n")
+        self.assertEqual(process(), 1)
+        self.assertEqual(
+            str_from_file(os.path.join(output_dir, filenames[0])),
+            Rouge155.convert_text_to_rouge_format(
+                str_from_file(changed) + "\n").strip())
+        # Same contents, new modification time.
+        stat = os.stat(changed)
+        os.utime(changed, (stat.st_atime, stat.st_mtime + 10))
+        self.assertEqual(process(), 0)
+        os.remove(os.path.join(input_dir, filenames[1]))
+        self.assertEqual(process(), 0)
+        self.assertEqual(sorted(os.listdir(output_dir)),
+                         filenames[:1] + filenames[2:])
+        shutil.rmtree(temp_dir)
+
+    def test_summary_sources(self):
+        temp_dir = mkdtemp()
+        system_dir = add_data_path("systems_plain")
+        model_dir = add_data_path("models_plain")
+        texts = {}
+        for directory in [system_dir, model_dir]:
+            for filename in os.listdir(directory):
+                texts[filename] = str_from_file(
+                    os.path.join(directory, filename))
+        # One JSON record per document with its system summary and the
+        # list of its model summaries.
+        jsonl = os.path.join(temp_dir, "summaries.jsonl")
+        with open(jsonl, "w") as f:
+            for filename in sorted(os.listdir(system_dir)):
+                doc_id = filename.split(".")[0]
+                f.write(json.dumps({
+                    "id": doc_id, "summary": texts[filename],
+                    "references": [
+                        texts[m] for m in sorted(texts)
+                        if m.startswith(doc_id + ".") and m != filename]}))
+                f.write("\n")
+        jsonl_gz = jsonl + ".gz"
+        with open(jsonl, "rb") as f, gzip.open(jsonl_gz, "wb") as gz:
+            shutil.copyfileobj(f, gz)
+        tar = os.path.join(temp_dir, "summaries.tar.gz")
+        with tarfile.open(tar, "w:gz") as archive:
+            archive.add(system_dir, "systems")
+            archive.add(model_dir, "models")
+        zip_path = os.path.join(temp_dir, "summaries.zip")
+        with zipfile.ZipFile(zip_path, "w") as archive:
+            for filename in sorted(texts):
+                archive.writestr("summaries/" + filename, texts[filename])
+
+        source = open_summary_source(tar)
+        self.assertEqual(
+            sorted(source.names()),
+            sorted(["systems/" + f for f in os.listdir(system_dir)] +
+                   ["models/" + f for f in os.listdir(model_dir)]))
+        self.assertEqual(
+            list(source.read(["models/D30001.M.100.T.B"])),
+            ["models/D30001.M.100.T.B"])
+        self.assertEqual(
+            source.read(["models/D30001.M.100.T.B"])[
+                "models/D30001.M.100.T.B"].strip(),
+            texts["D30001.M.100.T.B"])
+        self.assertEqual(
+            dict(open_summary_source(jsonl, text_field="references").items(
+                ["D30002.1"])),
+            {"D30002.1": texts["D30002.M.100.T.B"]})
+        self.assertEqual(
+            list(open_summary_source(jsonl_gz, text_field="summary").items()),
+            list(open_summary_source(jsonl, text_field="summary").items()))
+
+        # Zip members are read in stored order, skipping directories.
+        unsorted_zip = os.path.join(temp_dir, "unsorted.zip")
+        with zipfile.ZipFile(unsorted_zip, "w") as archive:
+            archive.writestr("b/", "")
+            archive.writestr("b/2", "two")
+            archive.writestr("a", "one")
+        source = open_summary_source(unsorted_zip)
+        self.assertEqual(source.names(), ["b/2", "a"])
+        self.assertEqual(list(source.items()), [("b/2", "two"), ("a", "one")])
+        self.assertEqual(list(source.items(["a", "b/"])), [("a", "one")])
+
+        rouge = Rouge155()
+        rouge.system_filename_pattern = "D(\d+).M.100.T.A"
+        rouge.model_filename_pattern = "D#ID#.M.100.T.[A-Z]"
+        target = rouge.evaluate_sources(system_dir, model_dir)
+        for system_source, model_source, system_pattern, model_pattern in [
+                (system_dir, model_dir, "D(\d+).M.100.T.A",
+                 "D#ID#.M.100.T.[A-Z]"),
+                (tar, tar, "systems/D(\d+).M.100.T.A",
+                 "models/D#ID#.M.100.T.[A-Z]"),
+                (zip_path, zip_path, "summaries/D(\d+).M.100.T.A",
+                 "summaries/D#ID#.M.100.T.[B-Z]"),
+                (JsonlSource(jsonl, text_field="summary"),
+                 JsonlSource(jsonl, text_field="references"),
+                 "(D\d+)", "#ID#[.][0-9]+"),
+                (JsonlSource(jsonl_gz, text_field="summary"),
+                 JsonlSource(jsonl_gz, text_field="references"),
+                 "(D\d+)", "#ID#[.][0-9]+")]:
+            rouge.system_filename_pattern = system_pattern
+            rouge.model_filename_pattern = model_pattern
+            for in_process in [False, True]:
+                output = rouge.evaluate_sources(
+                    system_source, model_source, in_process=in_process)
+                self.assertEqual(sorted(output), sorted(target))
+                for key, value in target.items():
+                    if not key.endswith(("_cb", "_ce")):
+                        self.assertAlmostEqual(value, output[key], places=5)
+
+        # Each source is read in a single pass.
+        passes = []
+
+        class SinglePassSource(JsonlSource):
+            def names(self):
+                raise AssertionError("names() reads the source again.")
+
+            def items(self, names=None):
+                passes.append(self.text_field)
+                return JsonlSource.items(self, names)
+
+        for in_process in [False, True]:
+            del passes[:]
+            rouge.evaluate_sources(
+                SinglePassSource(jsonl_gz, text_field="summary"),
+                SinglePassSource(jsonl_gz, text_field="references"),
+                in_process=in_process)
+            self.assertEqual(passes, ["summary", "references"])
+        shutil.rmtree(temp_dir)
+
     def test_config_file(self):
         rouge = Rouge155()
         rouge.system_dir = add_data_path("systems")
@@ -147,6 +392,155 @@ class PyrougeTest(unittest.TestCase):
             add_data_path("ROUGE-test_11.xml")))
         os.remove(rouge.config_file)
 
+    def test_config_cache(self):
+        rouge = Rouge155()
+        temp_dir = mkdtemp()
+        system_dir = os.path.join(temp_dir, "systems")
+        model_dir = os.path.join(temp_dir, "models")
+        shutil.copytree(add_data_path("systems"), system_dir)
+        shutil.copytree(add_data_path("models"), model_dir)
+        rouge.system_dir = system_dir
+        rouge.model_dir = model_dir
+        rouge.system_filename_pattern = "SL.P.10.R.11.SL062003-(\d+).html"
+        rouge.model_filename_pattern = "SL.P.10.R.[A-D].SL062003-#ID#.html"
+        rouge.write_config(system_id=11)
+        config_file = rouge.config_file
+        rouge.write_config(system_id=11)
+        self.assertEqual(rouge.config_file, config_file)
+        os.remove(os.path.join(
+            rouge.system_dir, "SL.P.10.R.11.SL062003-01.html"))
+        rouge.write_config(system_id=11)
+        self.assertNotEqual(rouge.config_file, config_file)
+        shutil.rmtree(temp_dir)
+
+    def test_config_file_errors(self):
+        system_dir = add_data_path("systems")
+        model_dir = add_data_path("models")
+        system_filename_pattern = "SL.P.10.R.11.SL062003-(\d+).html"
+        model_filename_pattern = "SL.P.10.R.[A-D].SL062003-#ID#.html"
+        temp_dir = mkdtemp()
+        config_file = os.path.join(temp_dir, "missing", "config.xml")
+        try:
+            Rouge155.write_config_static(
+                system_dir, system_filename_pattern,
+                model_dir, model_filename_pattern, config_file)
+        except EnvironmentError as e:
+            self.assertEqual(e.errno, errno.ENOENT)
+            self.assertEqual(e.filename, config_file)
+        else:
+            self.fail("Expected the config file to be unwritable.")
+
+        config_file = os.path.join(temp_dir, "config.xml")
+        self.assertRaises(
+            Exception, Rouge155.write_config_static,
+            system_dir, system_filename_pattern,
+            model_dir, "SL.P.10.R.[A-D.SL062003-#ID#.html", config_file)
+        self.assertFalse(os.path.exists(config_file))
+        shutil.rmtree(temp_dir)
+
+    def test_workspace(self):
+        with Workspace(use_ram=False) as workspace:
+            path = workspace.path
+            self.assertTrue(os.path.isdir(workspace.mkdtemp()))
+        self.assertFalse(os.path.exists(path))
+        self.assertRaises(Exception, workspace.mkdtemp)
+
+        with Rouge155() as rouge:
+            rouge.system_dir = add_data_path("systems")
+            rouge.model_dir = add_data_path("models")
+            rouge.system_filename_pattern = \
+                "SL.P.10.R.11.SL062003-(\d+).html"
+            rouge.model_filename_pattern = \
+                "SL.P.10.R.[A-D].SL062003-#ID#.html"
+            rouge.write_config(system_id=11)
+            config_file = rouge.config_file
+            rouge.write_config(system_id=11)
+            self.assertEqual(rouge.config_file, config_file)
+            path = rouge.workspace.path
+            self.assertEqual(os.path.dirname(config_file), path)
+        self.assertFalse(os.path.exists(path))
+
+    def test_workspace_reuse(self):
+        rouge = Rouge155()
+        system_dir = add_data_path("systems_plain")
+        model_dir = add_data_path("models_plain")
+        rouge.system_dir = system_dir
+        rouge.model_dir = model_dir
+        rouge.system_filename_pattern = "D(\d+).M.100.T.A"
+        rouge.model_filename_pattern = "D#ID#.M.100.T.[A-Z]"
+        outputs = []
+        for _ in range(2):
+            with rouge:
+                outputs.append(rouge.convert_and_evaluate())
+                path = rouge.workspace.path
+                self.assertTrue(rouge.system_dir.startswith(path))
+            self.assertFalse(os.path.exists(path))
+            self.assertEqual(rouge.system_dir, system_dir)
+            self.assertEqual(rouge.model_dir, model_dir)
+            self.assertIsNone(rouge.config_file)
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_workspace_conversion(self):
+        rouge = Rouge155()
+        rouge.workspace = Workspace(use_ram=False)
+        # Pretend the workspace is in RAM, which is full.
+        rouge.workspace.in_ram = True
+        process = DirectoryProcessor.process
+
+        def process_or_fail(input_dir, output_dir, *args):
+            if output_dir.startswith(rouge.workspace.path):
+                raise OSError(errno.ENOSPC, "No space left on device")
+            process(input_dir, output_dir, *args)
+
+        DirectoryProcessor.process = staticmethod(process_or_fail)
+        try:
+            outputs = []
+            for _ in range(2):
+                rouge.system_dir = add_data_path("systems_plain")
+                rouge.model_dir = add_data_path("models_plain")
+                rouge.system_filename_pattern = "D(\d+).M.100.T.A"
+                rouge.model_filename_pattern = "D#ID#.M.100.T.[A-Z]"
+                outputs.append(rouge.convert_and_evaluate())
+                self.assertFalse(
+                    rouge.system_dir.startswith(rouge.workspace.path))
+            self.assertEqual(outputs[0], outputs[1])
+            # The summaries of the first run were removed.
+            summaries_dir = os.path.dirname(rouge.system_dir)
+            self.assertEqual(
+                os.listdir(os.path.dirname(summaries_dir)),
+                [os.path.basename(summaries_dir)])
+        finally:
+            DirectoryProcessor.process = staticmethod(process)
+            rouge.close()
+        self.assertFalse(os.path.exists(summaries_dir))
+
+    def test_model_filename_index(self):
+        model_dir = add_data_path("models")
+        pattern = "SL.P.10.R.[A-D].SL062003-#ID#.html"
+        index = ModelFilenameIndex(model_dir, pattern)
+        for id in ["01", "13", "25"]:
+            id_pattern = re.compile(pattern.replace("#ID#", id))
+            target = sorted(
+                f for f in os.listdir(model_dir) if id_pattern.match(f))
+            self.assertEqual(index.filenames_for_id(id), target)
+        with self.assertRaises(Exception):
+            index.filenames_for_id("99")
+        # An ID which is a prefix of another one matches like the per-ID
+        # regex, which matches "foo10" for the ID "1".
+        filenames = ["foo1", "foo10", "foo2"]
+        index = ModelFilenameIndex(None, "foo#ID#", filenames)
+        for id in ["1", "10", "2"]:
+            target = [f for f in filenames if re.match("foo" + id, f)]
+            self.assertEqual(index.filenames_for_id(id), target)
+        self.assertEqual(index.filenames_for_id("1"), ["foo1", "foo10"])
+        index.filenames_for_id("10").append("foo3")
+        self.assertEqual(index.filenames_for_id("10"), ["foo10"])
+        # The filter keeps the files which can belong to one of the IDs.
+        is_model = model_filename_filter("foo#ID#", ["1"])
+        self.assertEqual(
+            [f for f in filenames + ["bar1"] if is_model(f)],
+            ["foo1", "foo10"])
+
     def test_evaluation(self):
         rouge = Rouge155()
         rouge.system_dir = add_data_path("systems")
@@ -163,6 +557,140 @@ class PyrougeTest(unittest.TestCase):
         orig_rouge_output = check_output_clean(rouge_command.split())
         self.assertEqual(pyrouge_output, orig_rouge_output)
 
+    def test_parallel_evaluation(self):
+        rouge = Rouge155()
+        rouge.system_dir = add_data_path("systems")
+        rouge.model_dir = add_data_path("models")
+        rouge.system_filename_pattern = "SL.P.10.R.11.SL062003-(\d+).html"
+        rouge.model_filename_pattern = "SL.P.10.R.[A-D].SL062003-#ID#.html"
+        args = "-e {} -c 95 -r 1000 -n 2 -a -d".format(rouge.data_dir)
+        output = rouge.evaluate(system_id=11, rouge_args=args)
+        parallel_output = rouge.evaluate(
+            system_id=11, rouge_args=args, parallel=4)
+
+        # The shards score every document like the serial run.
+        documents = parse_per_document_scores(output)
+        parallel_documents = parse_per_document_scores(parallel_output)
+        self.assertEqual(list(documents), list(parallel_documents))
+        for key, scores in documents.items():
+            self.assertEqual(sorted(scores), sorted(parallel_documents[key]))
+
+        # Only the last printed decimal may differ from the serial run,
+        # including for the F-measure, and the resampled confidence
+        # intervals contain the averages.
+        averages = rouge.output_to_dict(output)
+        parallel_averages = rouge.output_to_dict(parallel_output)
+        self.assertEqual(sorted(averages), sorted(parallel_averages))
+        for key, value in averages.items():
+            if key.endswith(("_cb", "_ce")):
+                continue
+            self.assertAlmostEqual(
+                value, parallel_averages[key], delta=1.01e-5)
+            self.assertLessEqual(parallel_averages[key + "_cb"],
+                                 parallel_averages[key])
+            self.assertLessEqual(parallel_averages[key],
+                                 parallel_averages[key + "_ce"])
+        for (_, rouge_type), scores in documents.items():
+            key = "{}_f_score".format(rouge_type.lower().replace("-", "_"))
+            self.assertAlmostEqual(
+                parallel_averages[key],
+                sum(f for _, _, _, f in scores) / len(scores), delta=5.01e-6)
+
+    def test_evaluate_stream(self):
+        rouge = Rouge155()
+        rouge.system_dir = add_data_path("systems")
+        rouge.model_dir = add_data_path("models")
+        rouge.system_filename_pattern = "SL.P.10.R.11.SL062003-(\d+).html"
+        rouge.model_filename_pattern = "SL.P.10.R.[A-D].SL062003-#ID#.html"
+        args = "-e {} -c 95 -r 1 -n 2 -a -d".format(rouge.data_dir)
+        output = rouge.evaluate(system_id=11, rouge_args=args)
+        records = list(rouge.evaluate_stream(system_id=11, rouge_args=args))
+        self.assertEqual(
+            averages_to_dict(records), rouge.output_to_dict(output))
+        per_document = parse_per_document_scores(output)
+        self.assertEqual(
+            [(record.sys_id, record.rouge_type) + record[2:]
+             for record in records if isinstance(record, DocumentScore)],
+            [key + scores for key, documents in per_document.items()
+             for scores in documents])
+
+        # Stopping early kills ROUGE.
+        stream = rouge.evaluate_stream(system_id=11, rouge_args=args)
+        self.assertEqual(next(stream), records[0])
+        stream.close()
+
+    def test_worker_pool(self):
+        rouge = Rouge155()
+        rouge.system_dir = add_data_path("systems")
+        rouge.model_dir = add_data_path("models")
+        rouge.system_filename_pattern = "SL.P.10.R.11.SL062003-(\d+).html"
+        rouge.model_filename_pattern = "SL.P.10.R.[A-D].SL062003-#ID#.html"
+        output = rouge.evaluate(system_id=11)
+        rouge.start_workers(2)
+        try:
+            for _ in range(3):
+                self.assertEqual(rouge.evaluate(system_id=11), output)
+        finally:
+            rouge.stop_workers()
+
+    def test_worker_state(self):
+        rouge_dir = mkdtemp()
+        data_dir = os.path.join(rouge_dir, "data")
+        os.mkdir(data_dir)
+        rouge_path = os.path.join(rouge_dir, "ROUGE-1.5.5.pl")
+        with open(rouge_path, "w") as f:
+            f.write(FAKE_ROUGE)
+        stopwords_path = os.path.join(data_dir, "smart_common_words.txt")
+        with open(stopwords_path, "w") as f:
+            f.write("of\nthe\n")
+        run = lambda args: check_output(
+            [PERL_PATH, rouge_path, "-e", data_dir] + args)
+        run(["-c"])
+        jobs = [["-s", "-m"], [], ["-m"], ["-s"]]
+        expected = [run(args) for args in jobs]
+        self.assertTrue(b"runs 1\nstopwords of the\nwent go" in expected[0])
+        pool = RougeWorkerPool(1, PERL_PATH, rouge_path, data_dir)
+        try:
+            # Jobs run in-process, so every job must start out fresh.
+            for args, output in zip(jobs * 2, expected * 2):
+                self.assertEqual(
+                    pool.run(["-e", data_dir] + args), output)
+            # The stopword list was read once, before the first job.
+            os.remove(stopwords_path)
+            self.assertEqual(pool.run(["-e", data_dir] + jobs[0]),
+                             expected[0])
+            # exit() ends the job with its status, not the worker.
+            with self.assertRaises(CalledProcessError) as context:
+                pool.run(["-e", data_dir, "-x", "3"])
+            self.assertEqual(context.exception.returncode, 3)
+            self.assertEqual(pool.run(["-e", data_dir] + jobs[1]),
+                             expected[1])
+        finally:
+            pool.close()
+            shutil.rmtree(rouge_dir)
+        self.assertFalse(pool._workers)
+
+    def test_score_pair(self):
+        rouge = Rouge155()
+        rouge.system_dir = add_data_path("systems_plain")
+        rouge.model_dir = add_data_path("models_plain")
+        rouge.system_filename_pattern = "D(30001).M.100.T.A"
+        rouge.model_filename_pattern = "D#ID#.M.100.T.[A-Z]"
+        # Read the plain texts before convert_and_evaluate() points the
+        # directories at the converted HTML copies.
+        system_text = str_from_file(
+            os.path.join(rouge.system_dir, "D30001.M.100.T.A"))
+        model_texts = [
+            str_from_file(os.path.join(rouge.model_dir, f))
+            for f in sorted(os.listdir(rouge.model_dir))
+            if re.match("D30001.M.100.T.[A-Z]", f)]
+        output = rouge.output_to_dict(rouge.convert_and_evaluate())
+        pair_output = rouge.score_pair(system_text, model_texts)
+        self.assertEqual(sorted(output), sorted(pair_output))
+        for key, value in output.items():
+            if not key.endswith(("_cb", "_ce")):
+                self.assertAlmostEqual(value, pair_output[key], places=5)
+
     def test_rouge_for_plain_text(self):
         model_dir = add_data_path("models_plain")
         system_dir = add_data_path("systems_plain")
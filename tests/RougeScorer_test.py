@@ -0,0 +1,482 @@
+from __future__ import print_function, unicode_literals, division
+
+import unittest
+import os
+import shutil
+
+from subprocess import check_output
+from tempfile import mkdtemp
+
+from pyrouge import Rouge155
+from pyrouge.scoring.lcs import lcs_length, rouge_l, union_lcs_hits
+from pyrouge.scoring import matrix, reference_index, wlcs
+from pyrouge.scoring.oracle import ExtractiveOracle
+from pyrouge.scoring.rouge_scorer import RougeScorer
+from pyrouge.scoring.skip_bigram import rouge_s
+from pyrouge.scoring.stemming import (
+    WORDNET_EXCEPTIONS_DIR, get_stemmer, porter_stem)
+from pyrouge.scoring.stopwords import STOPWORDS_FILENAME, get_stopwords
+from pyrouge.scoring.tokenization import (
+    TokenizedSummary, summary_sentences)
+from pyrouge.tests import parity
+from pyrouge.utils import rouge_output
+
+
+module_path = os.path.dirname(__file__)
+os.chdir(module_path)
+add_data_path = lambda p: os.path.join('data', p)
+# The perl executable Rouge155 runs ROUGE-1.5.5.pl with by default.
+PERL_PATH = r'D:\Perl\bin\perl'
+
+
+class RougeScorerTest(unittest.TestCase):
+
+    def assert_same_averages(self, rouge_output, scores, prefixes):
+        """
+        Compare the averages ROUGE printed with the averages of the
+        in-process scores for the ROUGE types with the given prefixes.
+
+        """
+        expected = Rouge155().output_to_dict(rouge_output)
+        expected = dict(
+            (key, value) for key, value in expected.items()
+            if key.startswith(prefixes) and not key.endswith(("_cb", "_ce")))
+        self.assertTrue(expected)
+        for key, value in expected.items():
+            self.assertAlmostEqual(scores[key], value, places=5, msg=key)
+
+    def test_score_summaries(self):
+        rouge = RougeScorer(n=2)
+        scores = rouge.score_summaries(
+            ["The cat sat on the mat."], [["The cat was on the mat."]])
+        self.assertEqual(list(scores), ["ROUGE-1", "ROUGE-2", "ROUGE-L"])
+        self.assertEqual(scores["ROUGE-1"], (0.83333, 0.83333, 0.83333))
+        self.assertEqual(scores["ROUGE-2"], (0.6, 0.6, 0.6))
+        self.assertEqual(scores["ROUGE-L"], (0.83333, 0.83333, 0.83333))
+
+    def test_union_lcs(self):
+        # The example of section 3.2 of the ROUGE paper: the union LCS of
+        # "w1 w2 w3 w4 w5" with "w1 w2 w6 w7 w8" and "w1 w3 w8 w9 w5" is
+        # "w1 w2 w3 w5".
+        model = [["w1", "w2", "w3", "w4", "w5"]]
+        peer = [["w1", "w2", "w6", "w7", "w8"], ["w1", "w3", "w8", "w9", "w5"]]
+        self.assertEqual(union_lcs_hits(model[0], peer), [0, 1, 2, 4])
+        self.assertEqual(rouge_l(peer, [model]), (4, 5, 10))
+        self.assertEqual(lcs_length("ABCBDAB", "BDCABA"), 4)
+
+    def test_rouge_l_parity(self):
+        rouge = Rouge155()
+        scorer = RougeScorer(n=1)
+        for config_file in ["ROUGE-test_11.xml", "config_test2.xml"]:
+            config_file = add_data_path(config_file)
+            rouge_output = check_output([
+                PERL_PATH, rouge.bin_path,
+                "-e", rouge.data_dir, "-n", "1", "-a",
+                config_file]).decode("UTF-8")
+            scores = scorer.scores_to_dict(scorer.evaluate_config(config_file))
+            self.assert_same_averages(rouge_output, scores, ("rouge_l_",))
+
+    def test_rouge_n_parity(self):
+        rouge = Rouge155()
+        scorer = RougeScorer(n=4)
+        for config_file in ["ROUGE-test_11.xml", "config_test2.xml"]:
+            config_file = add_data_path(config_file)
+            rouge_output = check_output([
+                PERL_PATH, rouge.bin_path,
+                "-e", rouge.data_dir, "-n", "4", "-a",
+                config_file]).decode("UTF-8")
+            scores = scorer.scores_to_dict(scorer.evaluate_config(config_file))
+            self.assert_same_averages(
+                rouge_output, scores,
+                ("rouge_1_", "rouge_2_", "rouge_3_", "rouge_4_"))
+
+    def test_parity_harness(self):
+        results = parity.run(synthetic_sizes=(20,), verbose=False)
+        self.assertEqual(
+            len(results),
+            (len(parity.FIXTURES) + 1) * len(parity.OPTION_SETS))
+        for result in results:
+            self.assertEqual(
+                result.mismatches, [],
+                "{} {}".format(result.name, result.options))
+
+    @unittest.skipIf(wlcs.np is None, "NumPy is not installed")
+    def test_wlcs_vectorized(self):
+        # The anti-diagonal NumPy tables must pick the same LCS as the
+        # cell by cell ones.
+        model = [["a", "b", "c", "d", "b"], ["c", "a"], []]
+        peer = [["b", "a", "c", "b", "d", "b"], ["a", "c"], ["c", "c", "a"]]
+        vectorized = wlcs.union_wlcs_hits(model, peer, 1.2)
+        np = wlcs.np
+        try:
+            wlcs.np = None
+            self.assertEqual(
+                vectorized, wlcs.union_wlcs_hits(model, peer, 1.2))
+        finally:
+            wlcs.np = np
+
+    def test_rouge_w_parity(self):
+        rouge = Rouge155()
+        scorer = RougeScorer(n=1, lcs=False, weight=1.2)
+        for config_file in ["ROUGE-test_11.xml", "config_test2.xml"]:
+            config_file = add_data_path(config_file)
+            rouge_output = check_output([
+                PERL_PATH, rouge.bin_path,
+                "-e", rouge.data_dir, "-n", "1", "-x",
+                "-w", "1.2", "-a", config_file]).decode("UTF-8")
+            scores = scorer.scores_to_dict(scorer.evaluate_config(config_file))
+            self.assert_same_averages(rouge_output, scores, ("rouge_w_",))
+
+    def test_skip_bigrams(self):
+        # "police killed the gunman": 6 skip-bigrams, 4 of them with at
+        # most one skipped token.
+        tokens = ["police", "killed", "the", "gunman"]
+        self.assertEqual(rouge_s(tokens, [tokens], -1), (6, 6, 6))
+        self.assertEqual(rouge_s(tokens, [tokens], 1), (5, 5, 5))
+        self.assertEqual(rouge_s(tokens, [tokens], 0), (3, 3, 3))
+        self.assertEqual(
+            rouge_s(tokens, [tokens], -1, unigrams=True), (10, 10, 10))
+        # The example of section 5 of the ROUGE paper.
+        peer = ["police", "kill", "the", "gunman"]
+        models = [["the", "gunman", "kill", "police"]]
+        self.assertEqual(rouge_s(peer, models, -1), (1, 6, 6))
+        self.assertEqual(rouge_s(peer, models, -1, unigrams=True), (5, 10, 10))
+        self.assertEqual(rouge_s([], models, 4), (0, 6, 0))
+
+    def test_rouge_s_parity(self):
+        rouge = Rouge155()
+        for distance in [4, -1]:
+            scorer = RougeScorer(
+                n=1, lcs=False, skip_distance=distance,
+                skip_types=("S", "SU"))
+            for config_file in ["ROUGE-test_11.xml", "config_test2.xml"]:
+                config_file = add_data_path(config_file)
+                rouge_output = check_output([
+                    PERL_PATH, rouge.bin_path,
+                    "-e", rouge.data_dir, "-n", "1", "-x",
+                    "-2", str(distance), "-U", "-a",
+                    config_file]).decode("UTF-8")
+                scores = scorer.scores_to_dict(
+                    scorer.evaluate_config(config_file))
+                self.assert_same_averages(
+                    rouge_output, scores, ("rouge_s", "rouge_su"))
+
+    @unittest.skipIf(rouge_output.np is None, "NumPy is not installed")
+    def test_bootstrap_score_matrix(self):
+        np = rouge_output.np
+        matrix = np.random.RandomState(1).rand(200, 4, 3)
+        matrix[:, 0, :] = 0.5
+        lower, upper = rouge_output.bootstrap_score_matrix(
+            matrix, rng=np.random.RandomState(0))
+        self.assertEqual(lower.shape, (4, 3))
+        self.assertTrue((lower[0] == 0.5).all() and (upper[0] == 0.5).all())
+        means = matrix.mean(axis=0)
+        self.assertTrue((lower <= means).all() and (means <= upper).all())
+        again = rouge_output.bootstrap_score_matrix(
+            matrix, rng=np.random.RandomState(0))
+        self.assertTrue((again[0] == lower).all())
+        self.assertTrue((again[1] == upper).all())
+
+    def test_output_records(self):
+        lines = [
+            "11 ROUGE-1 Eval 01.11 R:0.44156 P:0.41463 F:0.42767\n",
+            "---------------------------------------------\n",
+            "11 ROUGE-1 Average_R: 0.44156 "
+            "(95%-conf.int. 0.44156 - 0.44156)\n",
+            "11 ROUGE-1 Average_F: 0.42767 "
+            "(95%-conf.int. 0.42767 - 0.42767)\n".encode("UTF-8"),
+            ]
+        records = list(rouge_output.iter_output_records(iter(lines)))
+        self.assertEqual(records, [
+            rouge_output.DocumentScore(
+                "11", "ROUGE-1", "01.11", 0.44156, 0.41463, 0.42767),
+            rouge_output.AverageScore(
+                "11", "ROUGE-1", "R", 0.44156, 0.44156, 0.44156),
+            rouge_output.AverageScore(
+                "11", "ROUGE-1", "F", 0.42767, 0.42767, 0.42767),
+            ])
+        self.assertEqual(
+            rouge_output.averages_to_dict(records),
+            Rouge155().output_to_dict("".join(
+                line if not isinstance(line, bytes) else line.decode()
+                for line in lines)))
+        self.assertEqual(
+            rouge_output.averages_to_dict(records)["rouge_1_f_score_cb"],
+            0.42767)
+
+    def test_streaming_bootstrap(self):
+        rows = [[0.5, i / 200, (i % 7) / 7] for i in range(200)]
+        bootstrap = rouge_output.StreamingBootstrap(3, seed=1)
+        for start in range(0, 200, 30):
+            bootstrap.add(rows[start:start + 30])
+        self.assertEqual(bootstrap.n, 200)
+        means = bootstrap.means()
+        for column, mean in enumerate(means):
+            self.assertAlmostEqual(
+                mean, sum(row[column] for row in rows) / 200)
+        intervals = bootstrap.intervals()
+        self.assertEqual(intervals[0], (0.5, 0.5))
+        for mean, (lower, upper) in zip(means, intervals):
+            self.assertTrue(lower <= mean <= upper)
+        self.assertTrue(intervals[1][1] - intervals[1][0] < 0.1)
+
+    def test_evaluate_pairs(self):
+        rouge = RougeScorer(n=2, skip_distance=4)
+        system_dir = add_data_path("systems_plain")
+        model_dir = add_data_path("models_plain")
+        read = lambda path: summary_sentences(
+            open(path, "rb").read().decode("utf-8"))
+        pairs = []
+        for filename in sorted(os.listdir(system_dir)):
+            doc_id = filename.split(".")[0]
+            pairs.append((
+                doc_id, read(os.path.join(system_dir, filename)),
+                [read(os.path.join(model_dir, model))
+                 for model in sorted(os.listdir(model_dir))
+                 if model.startswith(doc_id)]))
+        results = list(rouge.evaluate_pairs(iter(pairs), chunk_size=3))
+        self.assertEqual(len(results), len(pairs) + 1)
+        for (doc_id, scores), (pair_id, peer, models) in zip(results, pairs):
+            self.assertEqual(doc_id, pair_id)
+            self.assertEqual(scores, rouge.score_summaries(peer, models))
+        final_id, averages = results[-1]
+        self.assertEqual(final_id, None)
+        for rouge_type in ["ROUGE-1", "ROUGE-2", "ROUGE-L", "ROUGE-S4"]:
+            key = rouge_type.lower().replace("-", "_") + "_recall"
+            mean = sum(
+                scores[rouge_type][0] for _, scores in results[:-1]) / 4
+            self.assertAlmostEqual(averages[key], mean, places=5)
+            self.assertTrue(
+                averages[key + "_cb"] <= averages[key] <=
+                averages[key + "_ce"])
+        self.assertEqual(
+            list(rouge.evaluate_pairs([])), [(None, {})])
+
+    def test_porter_stem(self):
+        for word, stem in [
+                ("caresses", "caress"), ("ponies", "poni"), ("cats", "cat"),
+                ("agreed", "agre"), ("hopping", "hop"), ("filing", "file"),
+                ("happy", "happi"), ("relational", "relat"),
+                ("generalizations", "gener"), ("analogousli", "analog"),
+                ("controlling", "control"), ("youth", "youth")]:
+            self.assertEqual(porter_stem(word), stem)
+
+    def test_stemmer(self):
+        data_dir = mkdtemp()
+        try:
+            os.mkdir(os.path.join(data_dir, WORDNET_EXCEPTIONS_DIR))
+            with open(os.path.join(
+                    data_dir, WORDNET_EXCEPTIONS_DIR, "verb.exc"), "w") as f:
+                f.write("fed feed\nwent go\nmice mouse\n")
+            stemmer = get_stemmer(data_dir)
+            self.assertIs(stemmer, get_stemmer(data_dir))
+            # Tokens of up to three characters are neither looked up nor
+            # stemmed.
+            tokens = ["went", "mice", "cats", "ponies", "fed"]
+            self.assertEqual(
+                stemmer.stem_tokens(tokens),
+                ["go", "mouse", "cat", "poni", "fed"])
+            self.assertEqual(stemmer.cache["ponies"], "poni")
+        finally:
+            shutil.rmtree(data_dir)
+
+    def test_stemming_parity(self):
+        rouge = Rouge155()
+        scorer = RougeScorer(n=2, stemming=True, data_dir=rouge.data_dir)
+        for config_file in ["ROUGE-test_11.xml", "config_test2.xml"]:
+            config_file = add_data_path(config_file)
+            rouge_output = check_output([
+                PERL_PATH, rouge.bin_path,
+                "-e", rouge.data_dir, "-n", "2", "-m", "-a",
+                config_file]).decode("UTF-8")
+            scores = scorer.scores_to_dict(scorer.evaluate_config(config_file))
+            self.assert_same_averages(
+                rouge_output, scores, ("rouge_1_", "rouge_2_", "rouge_l_"))
+
+    def test_stopwords(self):
+        data_dir = mkdtemp()
+        try:
+            with open(os.path.join(data_dir, STOPWORDS_FILENAME), "w") as f:
+                f.write("the\non\n")
+            self.assertIs(get_stopwords(data_dir), get_stopwords(data_dir))
+            scorer = RougeScorer(n=1, stopwords=True, data_dir=data_dir)
+            self.assertEqual(
+                scorer.tokenize_summary(["The cat sat on the mat."]),
+                [["cat", "sat", "mat"]])
+        finally:
+            shutil.rmtree(data_dir)
+
+    def test_stopwords_parity(self):
+        rouge = Rouge155()
+        scorer = RougeScorer(
+            n=2, stemming=True, stopwords=True, data_dir=rouge.data_dir)
+        for config_file in ["ROUGE-test_11.xml", "config_test2.xml"]:
+            config_file = add_data_path(config_file)
+            rouge_output = check_output([
+                PERL_PATH, rouge.bin_path,
+                "-e", rouge.data_dir, "-n", "2", "-m", "-s",
+                "-a", config_file]).decode("UTF-8")
+            scores = scorer.scores_to_dict(scorer.evaluate_config(config_file))
+            self.assert_same_averages(
+                rouge_output, scores, ("rouge_1_", "rouge_2_", "rouge_l_"))
+
+    def test_truncation(self):
+        summary = TokenizedSummary(
+            ["The U.S.-led force", "left on Monday.", "It rained."])
+        sentences = summary.truncate()
+        self.assertEqual(sentences, [
+            ["the", "u", "s", "led", "force"], ["left", "on", "monday"],
+            ["it", "rained"]])
+        # Words are counted before tokenization: "U.S.-led" is one word.
+        self.assertEqual(
+            summary.truncate(word_limit=2), [["the", "u", "s", "led"]])
+        self.assertEqual(
+            summary.truncate(word_limit=4),
+            [["the", "u", "s", "led", "force"], ["left"]])
+        self.assertIs(summary.truncate(word_limit=4)[0], sentences[0])
+        self.assertEqual(
+            summary.truncate(word_limit=3),
+            [["the", "u", "s", "led", "force"], []])
+        # Bytes are counted without sentence separators; a cut token is
+        # kept truncated.
+        self.assertEqual(
+            summary.truncate(byte_limit=23),
+            [["the", "u", "s", "led", "force"], ["left"]])
+        self.assertEqual(
+            summary.truncate(byte_limit=21),
+            [["the", "u", "s", "led", "force"], ["lef"]])
+        # Like ROUGE, the byte limit is ignored if there is a word limit.
+        self.assertEqual(
+            summary.truncate(word_limit=2, byte_limit=100),
+            [["the", "u", "s", "led"]])
+        self.assertEqual(
+            summary.truncate(word_limit=4, byte_limit=10),
+            summary.truncate(word_limit=4))
+        scorer = RougeScorer.from_options(["-l", "2", "-b", "100"])
+        self.assertEqual(
+            scorer.tokenize_summary(["The cat sat on the mat."]),
+            [["the", "cat"]])
+        scorer = RougeScorer(n=1, word_limit=2)
+        self.assertEqual(
+            scorer.tokenize_summary(["The cat sat on the mat."]),
+            [["the", "cat"]])
+        self.assertEqual(
+            scorer.truncate_summary(summary, word_limit=0), sentences)
+
+    def test_truncation_parity(self):
+        rouge = Rouge155()
+        for limit_option, limit in [("-l", 10), ("-b", 75)]:
+            scorer = RougeScorer(n=2, **{
+                "-l": {"word_limit": limit},
+                "-b": {"byte_limit": limit}}[limit_option])
+            for config_file in ["ROUGE-test_11.xml", "config_test2.xml"]:
+                config_file = add_data_path(config_file)
+                rouge_output = check_output([
+                    PERL_PATH, rouge.bin_path,
+                    "-e", rouge.data_dir, "-n", "2",
+                    limit_option, str(limit), "-a",
+                    config_file]).decode("UTF-8")
+                scores = scorer.scores_to_dict(
+                    scorer.evaluate_config(config_file))
+                self.assert_same_averages(
+                    rouge_output, scores,
+                    ("rouge_1_", "rouge_2_", "rouge_l_"))
+
+    @unittest.skipIf(reference_index.np is None, "NumPy is not installed")
+    def test_reference_index(self):
+        index_dir = mkdtemp()
+        try:
+            for config_file in ["ROUGE-test_11.xml", "config_test2.xml"]:
+                config_file = add_data_path(config_file)
+                for scorer in [RougeScorer(n=4), RougeScorer(n=2, lcs=False)]:
+                    expected = scorer.evaluate_config(config_file)
+                    for _ in range(2):
+                        self.assertEqual(
+                            scorer.evaluate_config(
+                                config_file, index_dir=index_dir),
+                            expected)
+            # One index per model directory and tokenization.
+            self.assertEqual(len(os.listdir(index_dir)), 4)
+        finally:
+            shutil.rmtree(index_dir)
+
+    def test_corpus(self):
+        scorer = RougeScorer(n=2, weight=1.2, skip_distance=4)
+        corpus = scorer.read_corpus(
+            add_data_path("models_plain"), input_format="text",
+            prefix="models/")
+        scorer.read_corpus(
+            add_data_path("systems_plain"), input_format="text",
+            corpus=corpus, prefix="systems/")
+        self.assertEqual(len(corpus), len(
+            os.listdir(add_data_path("models_plain"))) + len(
+            os.listdir(add_data_path("systems_plain"))))
+        self.assertEqual(
+            sum(len(corpus.tokens(name)) for name in corpus.names),
+            corpus.n_tokens)
+        models = [name for name in corpus.names if name.startswith("models")]
+        peer = [name for name in corpus.names if name.startswith("systems")][0]
+        with open(os.path.join(
+                add_data_path("systems_plain"), peer.split("/")[1])) as f:
+            peer_sentences = summary_sentences(f.read())
+        models_sentences = []
+        for model in models:
+            with open(os.path.join(
+                    add_data_path("models_plain"), model.split("/")[1])) as f:
+                models_sentences.append(summary_sentences(f.read()))
+        self.assertEqual(
+            corpus.decode(corpus.sentences(peer)[0]),
+            scorer.tokenize_summary(peer_sentences)[0])
+        self.assertEqual(
+            scorer.score_corpus(corpus, peer, models),
+            scorer.score_summaries(peer_sentences, models_sentences))
+
+    def test_oracle(self):
+        document = [
+            "The cat sat on the mat.", "Dogs bark loudly.",
+            "It was a sunny day.", "The mat was red."]
+        models = [["The cat sat on the red mat."]]
+        oracle = ExtractiveOracle(ngram_sizes=(1, 2))
+        indices, score = oracle.greedy(document, models)
+        self.assertEqual(indices, [0])
+        # The objective is the mean ROUGE-1 and ROUGE-2 F-measure of the
+        # selected sentences, which the incremental counts must match.
+        scores = RougeScorer(n=2, lcs=False).score_summaries(
+            [document[i] for i in indices], models)
+        self.assertAlmostEqual(
+            score, (scores["ROUGE-1"][2] + scores["ROUGE-2"][2]) / 2,
+            places=4)
+        beam_indices, beam_score = oracle.beam(
+            document, models, beam_size=3, max_sentences=2)
+        self.assertGreaterEqual(beam_score, score)
+        indices, _ = ExtractiveOracle(measure="recall").greedy(
+            document, models)
+        self.assertEqual(indices, [0, 3])
+
+    @unittest.skipIf(matrix.np is None, "NumPy is not installed")
+    def test_score_matrix(self):
+        candidates = [
+            ["The cat sat on the mat."], ["The cat was on the mat."],
+            ["A dog sat on the mat.", "The the the."]]
+        references = [["The cat sat on the red mat."], ["A cat."]]
+        scorer = RougeScorer(n=2)
+        for others in [None, references]:
+            scores = scorer.score_matrix(candidates, others)
+            self.assertEqual(list(scores), ["ROUGE-1", "ROUGE-2"])
+            models = candidates if others is None else others
+            for rouge_type, values in scores.items():
+                self.assertEqual(values.shape, (3, len(models), 3))
+                for i, candidate in enumerate(candidates):
+                    for j, model in enumerate(models):
+                        expected = scorer.score_summaries(candidate, [model])
+                        for value, expected_value in zip(
+                                values[i, j], expected[rouge_type]):
+                            self.assertAlmostEqual(
+                                value, expected_value, places=4)
+
+
+def main():
+    unittest.main()
+
+if __name__ == "__main__":
+    main()
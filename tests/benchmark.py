@@ -0,0 +1,125 @@
+from __future__ import print_function, unicode_literals, division
+
+import os
+import random
+import shutil
+import timeit
+
+from multiprocessing import cpu_count
+from tempfile import mkdtemp
+
+from pyrouge import Rouge155
+from pyrouge.utils import rouge_output
+
+
+def make_summary_dirs(n_docs, n_models=4, id_format="{:07d}"):
+    """
+    Create a temporary directory with n_docs empty system summaries and
+    n_models empty model summaries per document, named like the SL2003
+    test data with document IDs formatted by id_format.
+
+    """
+    root = mkdtemp()
+    system_dir = os.path.join(root, "systems")
+    model_dir = os.path.join(root, "models")
+    os.mkdir(system_dir)
+    os.mkdir(model_dir)
+    for doc in range(n_docs):
+        open(os.path.join(
+            system_dir, "SL.P.10.R.11.SL062003-{}.html".format(
+                id_format.format(doc))), "w").close()
+        for model in range(n_models):
+            open(os.path.join(
+                model_dir, "SL.P.10.R.{}.SL062003-{}.html".format(
+                    chr(65 + model), id_format.format(doc))), "w").close()
+    return root, system_dir, model_dir
+
+
+def benchmark_write_config(sizes=(1000, 2000, 4000, 8000),
+                           id_formats=("{:07d}", "{:d}"), repeat=3):
+    """
+    Time write_config_static for growing numbers of documents, with
+    zero-padded and with unpadded document IDs, of which some are
+    prefixes of others. With the model filename index the time per
+    document should stay constant.
+
+    """
+    for id_format in id_formats:
+        print("write_config_static, IDs like {}".format(
+            id_format.format(1)))
+        for n_docs in sizes:
+            root, system_dir, model_dir = make_summary_dirs(
+                n_docs, id_format=id_format)
+            config_file = os.path.join(root, "rouge_conf.xml")
+            write = lambda: Rouge155.write_config_static(
+                system_dir, "SL.P.10.R.11.SL062003-(\d+).html",
+                model_dir, "SL.P.10.R.[A-D].SL062003-#ID#.html",
+                config_file, system_id=11)
+            seconds = min(timeit.repeat(write, number=1, repeat=repeat))
+            print("{:>10d} docs {:>9.3f}s {:>9.2f}us/doc".format(
+                n_docs, seconds, 1e6 * seconds / n_docs))
+            shutil.rmtree(root)
+
+
+def benchmark_bootstrap(sizes=(100, 1000, 10000), n_types=7, repeat=3):
+    """
+    Time the bootstrap confidence intervals of n_types ROUGE types for
+    growing numbers of documents, per ROUGE type in pure Python and for
+    all types at once with NumPy.
+
+    """
+    print("bootstrap confidence intervals")
+    rng = random.Random(0)
+    for n_docs in sizes:
+        columns = [
+            [[rng.random() for _ in range(n_docs)] for _ in "RPF"]
+            for _ in range(n_types)]
+        python = lambda: [
+            rouge_output.bootstrap_confidence_intervals(type_columns)
+            for type_columns in columns]
+        numpy = lambda: rouge_output.bootstrap_score_matrix(
+            rouge_output.np.array(columns).transpose(2, 0, 1))
+        python_seconds = min(timeit.repeat(python, number=1, repeat=repeat))
+        numpy_seconds = min(timeit.repeat(numpy, number=1, repeat=repeat))
+        print("{:>10d} docs {:>9.3f}s python {:>9.3f}s numpy {:>7.1f}x".format(
+            n_docs, python_seconds, numpy_seconds,
+            python_seconds / numpy_seconds))
+
+
+def benchmark_conversion(n_files=20000, workers=(1, 2, 4, None), repeat=1):
+    """
+    Time the conversion of n_files plain text summaries to ROUGE's format
+    with growing numbers of worker processes (None for one per CPU).
+
+    """
+    print("convert_summaries_to_rouge_format")
+    rng = random.Random(0)
+    root = mkdtemp()
+    input_dir = os.path.join(root, "plain")
+    os.mkdir(input_dir)
+    words = ["word{}".format(i) for i in range(5000)]
+    for i in range(n_files):
+        with open(os.path.join(input_dir, "D{:07d}".format(i)), "w") as f:
+            f.write("\n".join(
+                " ".join(rng.choice(words) for _ in range(20)) + " ."
+                for _ in range(5)))
+    for n_workers in workers:
+        if n_workers is None:
+            n_workers = cpu_count()
+        output_dir = os.path.join(root, "rouge_{}".format(n_workers))
+        convert = lambda: Rouge155.convert_summaries_to_rouge_format(
+            input_dir, output_dir, workers=n_workers)
+        seconds = min(timeit.repeat(convert, number=1, repeat=repeat))
+        print("{:>4d} workers {:>9.3f}s {:>9.0f} files/s".format(
+            n_workers, seconds, n_files / seconds))
+    shutil.rmtree(root)
+
+
+def main():
+    benchmark_write_config()
+    benchmark_conversion()
+    if rouge_output.np is not None:
+        benchmark_bootstrap()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+from __future__ import print_function, unicode_literals, division
+
+import os
+import random
+import shutil
+import sys
+
+from collections import OrderedDict
+from subprocess import check_output
+from tempfile import mkdtemp
+from timeit import default_timer
+
+from pyrouge import Rouge155
+from pyrouge.scoring.rouge_scorer import RougeScorer
+from pyrouge.utils.rouge_output import (
+    parse_per_document_scores, round_score, scores_to_dict)
+
+
+module_path = os.path.dirname(os.path.abspath(__file__))
+add_data_path = lambda p: os.path.join(module_path, "data", p)
+
+# The perl executable Rouge155 runs ROUGE-1.5.5.pl with by default.
+PERL_PATH = r'D:\Perl\bin\perl'
+
+# ROUGE-1.5.5.pl options compared by default, each isolating a measure
+# or a preprocessing step as far as ROUGE allows. The data directory
+# (-e), -a, -d and the configuration file are added by compare().
+OPTION_SETS = OrderedDict([
+    ("ROUGE-N", "-n 4"),
+    ("ROUGE-N stemmed", "-n 4 -m"),
+    ("ROUGE-N stopwords", "-n 2 -m -s"),
+    ("ROUGE-N 10 words", "-n 2 -l 10"),
+    ("ROUGE-N 75 bytes", "-n 2 -b 75"),
+    ("ROUGE-L", "-n 1"),
+    ("ROUGE-W", "-n 1 -x -w 1.2"),
+    ("ROUGE-S4/SU4", "-n 1 -x -2 4 -U"),
+    ("ROUGE-S*/SU*", "-n 1 -x -2 -1 -U"),
+    ("pyrouge defaults", "-c 95 -2 -1 -U -r 1000 -n 4 -w 1.2 -m"),
+    ])
+
+# (name, system directory, system filename pattern, model directory,
+#  model filename pattern, plain text) tuples of the test data. Plain
+# text summaries are converted like Rouge155.convert_and_evaluate does.
+FIXTURES = [
+    ("systems", "systems", r"SL.P.10.R.11.SL062003-(\d+).html",
+     "models", "SL.P.10.R.[A-D].SL062003-#ID#.html", False),
+    ("systems_plain", "systems_plain", r"D(\d+).M.100.T.A",
+     "models_plain", "D#ID#.M.100.T.[A-Z]", True),
+    ("SL2003_models_rouge_format", "SL2003_models_rouge_format",
+     r"SL.P.10.R.A.SL062003-(\d+).html",
+     "models", "SL.P.10.R.[B-D].SL062003-#ID#.html", False),
+    ("SL2003_models_plain_text", "SL2003_models_plain_text",
+     r"SL.P.10.R.A.SL062003-(\d+).html",
+     "models", "SL.P.10.R.[B-D].SL062003-#ID#.html", True),
+    ]
+
+
+class ParityResult(object):
+    """
+    Outcome of scoring one configuration file with one option set by
+    ROUGE-1.5.5.pl and by an in-process scorer.
+
+    """
+
+    def __init__(self, name, options, mismatches, perl_seconds,
+                 python_seconds):
+        self.name = name
+        self.options = options
+        self.mismatches = mismatches
+        self.perl_seconds = perl_seconds
+        self.python_seconds = python_seconds
+
+    @property
+    def speedup(self):
+        return self.perl_seconds / max(self.python_seconds, 1e-9)
+
+    def __str__(self):
+        return "{:<28} {:<40} {:>8.3f}s {:>8.3f}s {:>8.1f}x {}".format(
+            self.name, self.options, self.perl_seconds,
+            self.python_seconds, self.speedup,
+            "ok" if not self.mismatches else
+            "{} mismatches".format(len(self.mismatches)))
+
+
+def compare(config_file, options, rouge=None, evaluate=None, name="",
+            perl_path=PERL_PATH):
+    """
+    Score a ROUGE configuration file with ROUGE-1.5.5.pl and with an
+    in-process scorer, and compare every per-document score and every
+    average at the five decimals ROUGE prints. The confidence intervals
+    are not compared, since they depend on the random resampling.
+
+        options:    ROUGE options string without -e, -a, -d and the
+                    configuration file, e.g. "-n 2 -m".
+        rouge:      Rouge155 object locating ROUGE-1.5.5.pl.
+        evaluate:   Function scoring a configuration file in-process,
+                    returning per-document scores like
+                    RougeScorer.evaluate_config, by default the
+                    evaluate_config of RougeScorer.from_options(options).
+        perl_path:  Path of the perl executable running ROUGE.
+
+    Returns: ParityResult. Its mismatches are (system ID, ROUGE type,
+             eval ID or "average", measure, ROUGE's value, in-process
+             value) tuples.
+
+    """
+    if rouge is None:
+        rouge = Rouge155()
+    options = ["-e", rouge.data_dir] + options.split()
+    scorer = RougeScorer.from_options(options)
+    if evaluate is None:
+        evaluate = scorer.evaluate_config
+
+    start = default_timer()
+    output = check_output(
+        [perl_path, rouge.bin_path] + options + ["-a", "-d", config_file])
+    perl_seconds = default_timer() - start
+    output = output.decode("UTF-8")
+
+    start = default_timer()
+    scores = evaluate(config_file)
+    averages = scores_to_dict(scores, samples=1)
+    python_seconds = default_timer() - start
+
+    mismatches = []
+    expected = parse_per_document_scores(output)
+    for key in set(expected) | set(scores):
+        sys_id, rouge_type = key
+        expected_documents = dict(
+            (eval_id, values)
+            for eval_id, values in _documents(expected.get(key, [])))
+        for eval_id, values in _documents(scores.get(key, [])):
+            target = expected_documents.pop(eval_id, (None,) * 3)
+            for measure, a, b in zip("RPF", target, values):
+                if a != b:
+                    mismatches.append(
+                        (sys_id, rouge_type, eval_id, measure, a, b))
+        for eval_id, target in expected_documents.items():
+            mismatches.append((sys_id, rouge_type, eval_id, None, target,
+                               None))
+    for key, value in rouge.output_to_dict(output).items():
+        if not key.endswith(("_cb", "_ce")) and \
+                averages.get(key) != value:
+            mismatches.append(
+                (None, key, "average", None, value, averages.get(key)))
+    return ParityResult(
+        name, " ".join(options[2:]), mismatches, perl_seconds,
+        python_seconds)
+
+
+def _documents(documents):
+    """
+    Per-document scores rounded to five decimals, with the F-measure
+    printed by ROUGE.
+
+    """
+    for eval_id, recall, precision, f in documents:
+        yield eval_id, tuple(
+            round_score(value) for value in (recall, precision, f))
+
+
+def write_fixture_config(root, fixture):
+    """
+    Write the ROUGE configuration file of a test data fixture to root,
+    converting plain text summaries to ROUGE's format first.
+
+    Returns: Path of the configuration file.
+
+    """
+    name, system_dir, system_pattern, model_dir, model_pattern, plain = \
+        fixture
+    system_dir = add_data_path(system_dir)
+    model_dir = add_data_path(model_dir)
+    if plain:
+        converted = os.path.join(root, name)
+        os.mkdir(converted)
+        Rouge155.convert_summaries_to_rouge_format(system_dir, converted)
+        system_dir = converted
+        if model_dir.endswith("_plain"):
+            converted = os.path.join(root, name + "_models")
+            os.mkdir(converted)
+            Rouge155.convert_summaries_to_rouge_format(model_dir, converted)
+            model_dir = converted
+    config_file = os.path.join(root, name + ".xml")
+    Rouge155.write_config_static(
+        system_dir, system_pattern, model_dir, model_pattern, config_file,
+        system_id=1)
+    return config_file
+
+
+def write_synthetic_corpus(root, n_docs=100, n_models=4, words=100,
+                           vocabulary_size=2000, seed=0):
+    """
+    Write a random corpus of system and model summaries in ROUGE's
+    format and its configuration file. Words are drawn from a Zipf-like
+    distribution over a made-up vocabulary, which includes words the
+    stemmer changes, stopwords, punctuation and mixed case, so that
+    tokenization, stemming and all measures are exercised.
+
+    Returns: Path of the configuration file.
+
+    """
+    rng = random.Random(seed)
+    stems = ["walk", "report", "nation", "agree", "happy", "city", "run"]
+    suffixes = ["", "s", "ed", "ing", "ly", "ational", "ies", "ness"]
+    function_words = ["the", "of", "and", "a", "on", "in", "is", "was"]
+    vocabulary = function_words + [
+        "{}{}{}".format(rng.choice(stems), i, rng.choice(suffixes))
+        for i in range(vocabulary_size)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    cumulative = []
+    for weight in weights:
+        cumulative.append((cumulative[-1] if cumulative else 0) + weight)
+
+    def sentence(length):
+        tokens = []
+        for _ in range(length):
+            x = rng.random() * cumulative[-1]
+            low, high = 0, len(cumulative) - 1
+            while low < high:
+                middle = (low + high) // 2
+                if cumulative[middle] < x:
+                    low = middle + 1
+                else:
+                    high = middle
+            tokens.append(vocabulary[low])
+        tokens[0] = tokens[0].capitalize()
+        return " ".join(tokens) + rng.choice([".", "!", " , too."])
+
+    def summary(path):
+        sentences, total = [], 0
+        while total < words:
+            length = rng.randint(3, 25)
+            sentences.append(sentence(length))
+            total += length
+        with open(path, "wb") as f:
+            f.write(Rouge155.convert_text_to_rouge_format(
+                "\n".join(sentences)).encode("UTF-8"))
+
+    system_dir = os.path.join(root, "systems")
+    model_dir = os.path.join(root, "models")
+    os.mkdir(system_dir)
+    os.mkdir(model_dir)
+    for doc in range(n_docs):
+        summary(os.path.join(system_dir, "S.{:06d}.html".format(doc)))
+        for model in range(n_models):
+            summary(os.path.join(model_dir, "M.{}.{:06d}.html".format(
+                chr(65 + model), doc)))
+    config_file = os.path.join(root, "synthetic.xml")
+    Rouge155.write_config_static(
+        system_dir, r"S.(\d+).html", model_dir, "M.[A-Z].#ID#.html",
+        config_file, system_id=1)
+    return config_file
+
+
+def run(option_sets=OPTION_SETS, synthetic_sizes=(100,), rouge=None,
+        evaluate_factory=None, verbose=True, perl_path=PERL_PATH):
+    """
+    Compare ROUGE-1.5.5.pl and an in-process scorer on all fixtures and
+    on synthetic corpora of the given numbers of documents, for all
+    option sets.
+
+        evaluate_factory:   Optional function mapping an options string
+                            to an evaluate function (cf. compare).
+
+    Returns: List of ParityResult.
+
+    """
+    if rouge is None:
+        rouge = Rouge155()
+    root = mkdtemp()
+    try:
+        configs = [
+            (fixture[0], write_fixture_config(root, fixture))
+            for fixture in FIXTURES]
+        for n_docs in synthetic_sizes:
+            corpus_root = os.path.join(root, "synthetic_{}".format(n_docs))
+            os.mkdir(corpus_root)
+            configs.append((
+                "synthetic {} docs".format(n_docs),
+                write_synthetic_corpus(corpus_root, n_docs, seed=n_docs)))
+        results = []
+        if verbose:
+            print("{:<28} {:<40} {:>9} {:>9} {:>9}".format(
+                "corpus", "options", "perl", "python", "speedup"))
+        for name, config_file in configs:
+            for options in option_sets.values():
+                evaluate = evaluate_factory(options) \
+                    if evaluate_factory is not None else None
+                result = compare(
+                    config_file, options, rouge, evaluate, name, perl_path)
+                results.append(result)
+                if verbose:
+                    print(result)
+        return results
+    finally:
+        shutil.rmtree(root)
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or [100, 1000]
+    results = run(synthetic_sizes=sizes)
+    failed = [result for result in results if result.mismatches]
+    for result in failed:
+        print(result.name, result.options)
+        for mismatch in result.mismatches[:10]:
+            print("    ", mismatch)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
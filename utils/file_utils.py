@@ -3,35 +3,283 @@ from __future__ import print_function, unicode_literals, division
 import os
 import re
 import codecs
+import hashlib
+import json
 import xml.etree.ElementTree as et
 
+from bisect import bisect_left
+from multiprocessing import Pool
+
+try:
+    from os import scandir
+except ImportError:
+    scandir = None
+
 from pyrouge.utils import log
 
 
 class DirectoryProcessor:
 
     @staticmethod
-    def process(input_dir, output_dir, function):
+    def process(input_dir, output_dir, function, workers=1, chunk_size=256):
         """
         Apply function to all files in input_dir and save the resulting ouput
         files in output_dir.
 
+            workers:    Number of processes to spread the files over. With
+                        more than one, the files are dispatched in chunks
+                        of chunk_size filenames to a multiprocessing pool.
+                        Where processes are not forked (e.g. Windows),
+                        function has to be picklable, i.e. a module-level
+                        function or a functools.partial of one. Under
+                        Python 2, static and bound methods are not.
+
+        Each output file only depends on its input file, so the output is
+        the same for any number of workers.
+
         """
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
         logger = log.get_global_console_logger()
         logger.info("Processing files in {}.".format(input_dir))
-        input_file_names = os.listdir(input_dir)
-        for input_file_name in input_file_names:
-            logger.info("Processing {}.".format(input_file_name))
-            input_file = os.path.join(input_dir, input_file_name)
-            with codecs.open(input_file, "r", encoding="UTF-8") as f:
-                input_string = f.read()
-            output_string = function(input_string)
-            output_file = os.path.join(output_dir, input_file_name)
-            with codecs.open(output_file, "w", encoding="UTF-8") as f:
-                f.write(output_string)
-        logger.info("Saved processed files to {}.".format(output_dir))
+        input_file_names = sorted(os.listdir(input_dir))
+        DirectoryProcessor.__process_files(
+            input_dir, output_dir, input_file_names, function, workers,
+            chunk_size)
+        logger.info("Saved {} processed files to {}.".format(
+            len(input_file_names), output_dir))
+
+    @staticmethod
+    def process_incremental(input_dir, output_dir, function, workers=1,
+                            chunk_size=256, content_hash=False):
+        """
+        Like process(), but only for the files of input_dir which changed
+        since the last call with the same output_dir. A manifest next to
+        output_dir, output_dir + ".manifest.json", records the size and
+        modification time of every input file that has been processed.
+        Files whose size and modification time are unchanged are skipped,
+        and the output files of input files which no longer exist are
+        removed, so output_dir always mirrors input_dir.
+
+            content_hash:   Also record the SHA-1 of every input file and
+                            skip files whose contents are unchanged even
+                            if their modification time changed, e.g.
+                            because they were copied or extracted again.
+                            Costs reading changed files once more.
+
+        Returns: Number of processed files.
+
+        """
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        logger = log.get_global_console_logger()
+        manifest_path = output_dir.rstrip(os.sep) + ".manifest.json"
+        manifest = {}
+        if os.path.isfile(manifest_path):
+            with codecs.open(manifest_path, "r", encoding="UTF-8") as f:
+                manifest = json.load(f)
+        existing = set(os.listdir(output_dir))
+        new_manifest = {}
+        changed = []
+        for name, stat in sorted(_dir_stats(input_dir)):
+            entry = [stat.st_size, stat.st_mtime, None]
+            old_entry = manifest.get(name)
+            if old_entry is not None and name in existing and \
+                    old_entry[:2] == entry[:2]:
+                new_manifest[name] = old_entry
+                continue
+            if content_hash:
+                entry[2] = file_digest(os.path.join(input_dir, name))
+                if old_entry is not None and name in existing and \
+                        old_entry[2] == entry[2]:
+                    new_manifest[name] = entry
+                    continue
+            new_manifest[name] = entry
+            changed.append(name)
+        for name in existing - set(new_manifest):
+            os.remove(os.path.join(output_dir, name))
+        logger.info("Processing {} of {} files in {}.".format(
+            len(changed), len(new_manifest), input_dir))
+        # The manifest is only replaced once all changed files have been
+        # processed, so an interrupted run processes them again.
+        DirectoryProcessor.__process_files(
+            input_dir, output_dir, changed, function, workers, chunk_size)
+        tmp_path = manifest_path + ".{}.tmp".format(os.getpid())
+        with codecs.open(tmp_path, "w", encoding="UTF-8") as f:
+            json.dump(new_manifest, f)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        os.rename(tmp_path, manifest_path)
+        return len(changed)
+
+    @staticmethod
+    def __process_files(input_dir, output_dir, input_file_names, function,
+                        workers, chunk_size):
+        chunks = [
+            (input_dir, output_dir, input_file_names[i:i + chunk_size])
+            for i in range(0, len(input_file_names), chunk_size)]
+        if workers > 1 and len(chunks) > 1:
+            pool = Pool(
+                min(workers, len(chunks)), _init_process_worker, (function,))
+            try:
+                for _ in pool.imap(_process_chunk, chunks):
+                    pass
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for chunk in chunks:
+                _process_files(function, *chunk)
+
+
+_process_function = None
+
+
+def _init_process_worker(function):
+    global _process_function
+    _process_function = function
+
+
+def _process_chunk(chunk):
+    _process_files(_process_function, *chunk)
+
+
+def _process_files(function, input_dir, output_dir, input_file_names):
+    logger = log.get_global_console_logger()
+    for input_file_name in input_file_names:
+        logger.debug("Processing {}.".format(input_file_name))
+        input_file = os.path.join(input_dir, input_file_name)
+        with codecs.open(input_file, "r", encoding="UTF-8") as f:
+            input_string = f.read()
+        output_string = function(input_string)
+        output_file = os.path.join(output_dir, input_file_name)
+        with codecs.open(output_file, "w", encoding="UTF-8") as f:
+            f.write(output_string)
+
+
+def _model_id_pattern(model_filename_pattern):
+    """
+    Compile a model filename pattern with "#ID#" replaced by a greedy
+    capturing group named "id".
+
+    """
+    head, tail = model_filename_pattern.split("#ID#", 1)
+    return re.compile(head + "(?P<id>.+)" + tail.replace("#ID#", "(?P=id)"))
+
+
+class ModelFilenameIndex:
+    """
+    Index of the model summaries in a directory, keyed on the document
+    ID matched by the "#ID#" placeholder of the model filename pattern.
+
+    The model directory is listed once and every filename is matched
+    against a single regex in which "#ID#" has been replaced by a
+    capturing group, so looking up the model summaries of a system
+    summary is a dict lookup instead of a directory listing and a
+    regex compilation per system summary.
+
+    """
+
+    def __init__(self, model_dir, model_filename_pattern, filenames=None):
+        """
+            filenames:  Optional filenames to index instead of those in
+                        model_dir, e.g. the names of a SummarySource.
+
+        """
+        self.model_dir = model_dir
+        self.model_filename_pattern = model_filename_pattern
+        if filenames is None:
+            filenames = os.listdir(model_dir)
+        self._filenames = sorted(filenames)
+        self._index = {}
+        if "#ID#" not in model_filename_pattern:
+            # Without a placeholder every matching file belongs to every ID.
+            pattern = re.compile(model_filename_pattern)
+            self._shared = [f for f in self._filenames if pattern.match(f)]
+            return
+        self._shared = None
+        id_pattern = _model_id_pattern(model_filename_pattern)
+        for filename in self._filenames:
+            match = id_pattern.match(filename)
+            if match:
+                self._index.setdefault(match.group("id"), []).append(filename)
+        # The greedy ID group indexes "foo10" under "10" only, although
+        # the pattern "foo#ID#" matches it for the ID "1" as well, so the
+        # indexed IDs are kept sorted to find those starting with an ID.
+        self._ids = sorted(self._index)
+        self._results = {}
+
+    def filenames_for_id(self, id):
+        """
+        Return the sorted model summary filenames for the document ID.
+
+        The files of the indexed IDs which start with the ID are checked
+        with the original per-ID regex, and IDs without such files with
+        the per-ID regex over the cached directory listing. The result is
+        cached, and is the same as the per-ID regex's, provided that the
+        part of the pattern before "#ID#" always matches text of the same
+        length and the ID is literal text.
+
+        """
+        if self._shared is not None:
+            model_filenames = self._shared
+        else:
+            model_filenames = self._results.get(id)
+            if model_filenames is None:
+                model_filenames = self.__lookup(id)
+                self._results[id] = model_filenames
+        if not model_filenames:
+            raise Exception(
+                "Could not find any model summaries for the system"
+                " summary with ID {}. Specified model filename pattern was: "
+                "{}".format(id, self.model_filename_pattern))
+        return list(model_filenames)
+
+    def __lookup(self, id):
+        """
+        Look up the model summary filenames for the document ID without
+        the cache.
+
+        """
+        start = end = bisect_left(self._ids, id)
+        while end < len(self._ids) and self._ids[end].startswith(id):
+            end += 1
+        if end - start == 1 and self._ids[start] == id:
+            return self._index[id]
+        if start == end:
+            candidates = self._filenames
+        else:
+            candidates = sorted(
+                f for other in self._ids[start:end]
+                for f in self._index[other])
+        pattern = re.compile(self.model_filename_pattern.replace('#ID#', id))
+        return [f for f in candidates if pattern.match(f)]
+
+
+def model_filename_filter(model_filename_pattern, ids):
+    """
+    Return a predicate which is true for the filenames that
+    ModelFilenameIndex.filenames_for_id() can return for one of the
+    document IDs, so that a stream of model summaries can be filtered
+    before all of their filenames are known. Under the conditions given
+    there, the pattern matches a filename for an ID if and only if the
+    ID is a prefix of the ID the greedy index group captures.
+
+    """
+    if "#ID#" not in model_filename_pattern:
+        pattern = re.compile(model_filename_pattern)
+        return lambda filename: pattern.match(filename) is not None
+    ids = set(ids)
+    id_pattern = _model_id_pattern(model_filename_pattern)
+
+    def is_model_filename(filename):
+        match = id_pattern.match(filename)
+        if match is None:
+            return False
+        id = match.group("id")
+        return any(id[:i] in ids for i in range(1, len(id) + 1))
+
+    return is_model_filename
 
 
 def str_from_file(path):
@@ -77,6 +325,44 @@ def list_files(dir_path, recursive=True):
         return file_list
 
 
+def _dir_stats(path):
+    """
+    Return (name, os.stat result) tuples of the entries of a directory.
+
+    """
+    if scandir is not None:
+        return [(entry.name, entry.stat()) for entry in scandir(path)]
+    return [(name, os.stat(os.path.join(path, name)))
+            for name in os.listdir(path)]
+
+
+def dir_fingerprint(path):
+    """
+    Return a hex digest of the names, sizes and modification times of
+    the entries in the directory at path. The digest changes whenever a
+    file is added, removed, renamed or rewritten, without reading any
+    file contents.
+
+    """
+    digest = hashlib.sha1()
+    for name, stat in sorted(_dir_stats(path)):
+        digest.update("{}\t{}\t{!r}\n".format(
+            name, stat.st_size, stat.st_mtime).encode("UTF-8"))
+    return digest.hexdigest()
+
+
+def file_digest(path):
+    """
+    Return the SHA-1 hex digest of the contents of a file.
+
+    """
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
 def verify_dir(path, name=None):
     if name:
         name_str = "Cannot set {} directory because t".format(name)
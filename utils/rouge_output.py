@@ -0,0 +1,471 @@
+from __future__ import print_function, unicode_literals, division
+
+import random
+import re
+
+from collections import OrderedDict, namedtuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# 11 ROUGE-1 Eval 1.11 R:0.44156 P:0.41463 F:0.42767
+PER_DOCUMENT_PATTERN = re.compile(
+    r"(\S+) (ROUGE-\S+) Eval (\S+) R:(\d.\d+) P:(\d.\d+) F:(\d.\d+)")
+# 1 ROUGE-1 Average_R: 0.02632 (95%-conf.int. 0.02632 - 0.02632)
+AVERAGE_PATTERN = re.compile(
+    r"(\S+) (ROUGE-\S+) Average_(\w): (\d.\d+) "
+    r"\(\d+%-conf.int. (\d.\d+) - (\d.\d+)\)")
+GROUP_SEPARATOR = "-" * 45
+DETAIL_SEPARATOR = "." * 45
+MEASURE_NAMES = {"R": "recall", "P": "precision", "F": "f_score"}
+# Upper bound on the number of resampling weights held in memory at once.
+MAX_BOOTSTRAP_CELLS = 1 << 24
+
+# A line of ROUGE's output with the per-document scores of one system
+# summary, printed with the -d option.
+DocumentScore = namedtuple(
+    "DocumentScore",
+    ["sys_id", "rouge_type", "eval_id", "recall", "precision", "f_score"])
+# A line of ROUGE's output with an average over all documents, where
+# measure is "R", "P" or "F".
+AverageScore = namedtuple(
+    "AverageScore",
+    ["sys_id", "rouge_type", "measure", "value", "conf_begin", "conf_end"])
+
+
+def parse_output_line(line):
+    """
+    Parse a line of ROUGE output.
+
+    Returns: DocumentScore or AverageScore, or None for all other lines.
+
+    """
+    match = PER_DOCUMENT_PATTERN.match(line)
+    if match:
+        sys_id, rouge_type, eval_id, recall, precision, f_score = \
+            match.groups()
+        return DocumentScore(
+            sys_id, rouge_type, eval_id, float(recall), float(precision),
+            float(f_score))
+    match = AVERAGE_PATTERN.match(line)
+    if match:
+        sys_id, rouge_type, measure, value, conf_begin, conf_end = \
+            match.groups()
+        return AverageScore(
+            sys_id, rouge_type, measure, float(value), float(conf_begin),
+            float(conf_end))
+    return None
+
+
+def iter_output_records(lines):
+    """
+    Parse ROUGE output line by line, e.g. while it is read from the
+    standard output of a ROUGE process, without holding more than one
+    line in memory.
+
+        lines:  Iterable of lines of ROUGE output, as strings or as
+                UTF-8 encoded bytes.
+
+    Yields: DocumentScore and AverageScore records in the order in which
+            ROUGE printed them.
+
+    """
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("UTF-8")
+        record = parse_output_line(line)
+        if record is not None:
+            yield record
+
+
+def averages_to_dict(records, results=None):
+    """
+    Collect the AverageScore records of ROUGE output into the dictionary
+    Rouge155.output_to_dict returns. Other records are ignored.
+
+    """
+    if results is None:
+        results = {}
+    for record in records:
+        if not isinstance(record, AverageScore):
+            continue
+        key = "{}_{}".format(
+            record.rouge_type.lower().replace("-", "_"),
+            MEASURE_NAMES[record.measure])
+        results[key] = record.value
+        results["{}_cb".format(key)] = record.conf_begin
+        results["{}_ce".format(key)] = record.conf_end
+    return results
+
+
+def parse_per_document_scores(output, scores=None):
+    """
+    Collect the per-document scores which ROUGE prints when it is run
+    with the -d option.
+
+        output: ROUGE output as string.
+        scores: Optional dictionary to add the scores to, which makes
+                it possible to merge the output of several ROUGE runs.
+
+    Returns: OrderedDict mapping (system ID, ROUGE type) to a list of
+             (eval ID, recall, precision, f_score) tuples, in the order
+             in which ROUGE printed them.
+
+    """
+    if scores is None:
+        scores = OrderedDict()
+    for record in iter_output_records(output.split("\n")):
+        if isinstance(record, DocumentScore):
+            scores.setdefault((record.sys_id, record.rouge_type), []).append(
+                record[2:])
+    return scores
+
+
+def eval_id_sort_key(eval_id):
+    """
+    Sort key which orders eval IDs such as "9.11" before "10.11".
+
+    """
+    return [int(part) if part.isdigit() else part
+            for part in re.split(r"(\d+)", eval_id)]
+
+
+def round_score(score):
+    """
+    Round a score to the five decimals ROUGE-1.5.5 prints ("%7.5f").
+
+    """
+    return float("{:7.5f}".format(score))
+
+
+def f_score(recall, precision, alpha=0.5):
+    """
+    ROUGE's F-measure, computed like ROUGE-1.5.5.pl does from the
+    per-document recall and precision after they have been rounded to
+    five decimals.
+
+    """
+    denominator = (1 - alpha) * precision + alpha * recall
+    if denominator > 0:
+        return precision * recall / denominator
+    return 0.0
+
+
+def bootstrap_confidence_intervals(columns, samples=1000, confidence=95,
+                                   rng=None):
+    """
+    Estimate the confidence intervals of the means of several equally
+    long lists of per-document scores by bootstrap resampling, the way
+    ROUGE does for its -c and -r options. All columns are resampled with
+    the same document indices.
+
+    Returns: List of (lower, upper) tuples, one per column.
+
+    """
+    if rng is None:
+        rng = random.Random(0)
+    n = len(columns[0])
+    means = [[] for _ in columns]
+    for _ in range(samples):
+        indices = [int(rng.random() * n) for _ in range(n)]
+        for column, column_means in zip(columns, means):
+            column_means.append(sum(column[i] for i in indices) / n)
+    alpha = (100 - confidence) / 100
+    lower = int(samples * alpha / 2)
+    upper = min(int(samples * (1 - alpha / 2)), samples - 1)
+    intervals = []
+    for column_means in means:
+        column_means.sort()
+        intervals.append((column_means[lower], column_means[upper]))
+    return intervals
+
+
+def bootstrap_score_matrix(matrix, samples=1000, confidence=95, rng=None):
+    """
+    Vectorized bootstrap estimate of the confidence intervals of the
+    means of a per-document score matrix, e.g. of the shape documents x
+    metrics x (recall, precision, f_score). All metrics are resampled
+    with the same document indices in one pass: each bootstrap sample is
+    a row of document multiplicities, and the means of all samples are a
+    single matrix product. The samples are processed in chunks so that
+    memory stays bounded for large corpora.
+
+        matrix:     Array-like of per-document scores, documents first.
+        samples:    Number of bootstrap samples (ROUGE's -r).
+        confidence: Confidence level in percent (ROUGE's -c).
+        rng:        numpy.random.RandomState used for resampling,
+                    RandomState(0) by default.
+
+    Returns: (lower, upper) tuple of arrays of the shape of matrix
+             without the first axis.
+
+    """
+    if rng is None:
+        rng = np.random.RandomState(0)
+    matrix = np.asarray(matrix, dtype=np.float64)
+    n = matrix.shape[0]
+    columns = matrix.reshape(n, -1)
+    means = np.empty((samples, columns.shape[1]))
+    chunk_size = max(1, MAX_BOOTSTRAP_CELLS // n)
+    for start in range(0, samples, chunk_size):
+        stop = min(start + chunk_size, samples)
+        indices = rng.randint(0, n, size=(stop - start, n))
+        indices += n * np.arange(stop - start)[:, None]
+        multiplicities = np.bincount(
+            indices.ravel(), minlength=(stop - start) * n).reshape(-1, n)
+        means[start:stop] = multiplicities.dot(columns) / n
+    means.sort(axis=0)
+    alpha = (100 - confidence) / 100
+    lower = int(samples * alpha / 2)
+    upper = min(int(samples * (1 - alpha / 2)), samples - 1)
+    shape = matrix.shape[1:]
+    return means[lower].reshape(shape), means[upper].reshape(shape)
+
+
+class StreamingBootstrap(object):
+    """
+    Bootstrap estimate of the confidence intervals of the means of
+    per-document score columns which arrive in chunks, with memory
+    independent of the number of documents. Instead of drawing document
+    indices, which needs all documents at once, each document is added
+    to each bootstrap sample with a Poisson(1) distributed multiplicity
+    (the "Poisson bootstrap"), which approximates resampling with
+    replacement for more than a few documents. Only the weighted column
+    sums of every sample are kept.
+
+    bootstrap = StreamingBootstrap(n_columns=3)
+    for rows in chunks:
+        bootstrap.add(rows)
+    means, intervals = bootstrap.means(), bootstrap.intervals()
+
+    """
+
+    def __init__(self, n_columns, samples=1000, confidence=95, seed=0):
+        """
+            n_columns:  Number of scores per document.
+            samples:    Number of bootstrap samples (ROUGE's -r).
+            confidence: Confidence level in percent (ROUGE's -c).
+            seed:       Seed of the random number generator.
+
+        """
+        self.n_columns = n_columns
+        self.samples = samples
+        self.confidence = confidence
+        self.n = 0
+        self.__totals = [0.0] * n_columns
+        if np is not None:
+            self.__rng = np.random.RandomState(seed)
+            self.__sums = np.zeros((samples, n_columns))
+            self.__weights = np.zeros(samples)
+        else:
+            self.__rng = random.Random(seed)
+            self.__sums = [[0.0] * n_columns for _ in range(samples)]
+            self.__weights = [0] * samples
+
+    def add(self, rows):
+        """
+        Add the scores of a chunk of documents, one row of n_columns
+        scores per document.
+
+        """
+        if not len(rows):
+            return
+        self.n += len(rows)
+        if np is not None:
+            matrix = np.asarray(rows, dtype=np.float64)
+            self.__totals = (self.__totals + matrix.sum(axis=0)).tolist()
+            chunk_size = max(1, MAX_BOOTSTRAP_CELLS // len(rows))
+            for start in range(0, self.samples, chunk_size):
+                stop = min(start + chunk_size, self.samples)
+                weights = self.__rng.poisson(1.0, (stop - start, len(rows)))
+                self.__sums[start:stop] += weights.dot(matrix)
+                self.__weights[start:stop] += weights.sum(axis=1)
+            return
+        for row in rows:
+            self.__totals = [a + b for a, b in zip(self.__totals, row)]
+        for sums, sample in zip(self.__sums, range(self.samples)):
+            for row in rows:
+                weight = _poisson_one(self.__rng)
+                if weight:
+                    self.__weights[sample] += weight
+                    for column, score in enumerate(row):
+                        sums[column] += weight * score
+
+    def means(self):
+        """
+        Means of the columns over all documents added so far.
+
+        """
+        return [total / max(self.n, 1) for total in self.__totals]
+
+    def intervals(self):
+        """
+        Confidence intervals of the column means, with the lower and
+        upper sample indices ROUGE uses.
+
+        Returns: List of (lower, upper) tuples, one per column.
+
+        """
+        means = self.means()
+        # A sample which happens to contain no document gets the overall
+        # means.
+        sample_means = [
+            [total / weight for total in sums] if weight else means
+            for sums, weight in zip(
+                [list(sums) for sums in self.__sums], self.__weights)]
+        alpha = (100 - self.confidence) / 100
+        lower = int(self.samples * alpha / 2)
+        upper = min(int(self.samples * (1 - alpha / 2)), self.samples - 1)
+        intervals = []
+        for column in range(self.n_columns):
+            column_means = sorted(sample[column] for sample in sample_means)
+            intervals.append((column_means[lower], column_means[upper]))
+        return intervals
+
+
+def _poisson_one(rng):
+    """
+    Draw from the Poisson distribution with mean 1 (Knuth's method).
+
+    """
+    limit = 0.36787944117144233
+    k, product = 0, rng.random()
+    while product > limit:
+        k += 1
+        product *= rng.random()
+    return k
+
+
+def score_columns(documents):
+    """
+    Recall, precision and F-measure columns of a list of per-document
+    (eval ID, recall, precision, f_score) tuples. The F-measure is taken
+    from the documents, as ROUGE averages its per-document F-measures,
+    rather than recomputed from the rounded recall and precision.
+
+    Returns: [recalls, precisions, f_scores] list.
+
+    """
+    return [[document[i] for document in documents] for i in (1, 2, 3)]
+
+
+def _matrix_intervals(scores, samples, confidence, seed):
+    """
+    Confidence intervals of all score groups with bootstrap_score_matrix,
+    stacking the ROUGE types of a system which were scored on the same
+    documents into one matrix.
+
+    Returns: Dictionary mapping (system ID, ROUGE type) to a list of
+             (lower, upper) tuples for recall, precision and F-measure.
+
+    """
+    rng = np.random.RandomState(seed)
+    groups = OrderedDict()
+    for (sys_id, rouge_type), documents in scores.items():
+        eval_ids = tuple(eval_id for eval_id, _, _, _ in documents)
+        groups.setdefault((sys_id, eval_ids), []).append(rouge_type)
+    intervals = {}
+    for (sys_id, _), rouge_types in groups.items():
+        matrix = np.array([
+            score_columns(scores[sys_id, rouge_type])
+            for rouge_type in rouge_types]).transpose(2, 0, 1)
+        lower, upper = bootstrap_score_matrix(
+            matrix, samples, confidence, rng)
+        for rouge_type, type_lower, type_upper in zip(
+                rouge_types, lower.tolist(), upper.tolist()):
+            intervals[sys_id, rouge_type] = list(zip(type_lower, type_upper))
+    return intervals
+
+
+def average_scores(scores, samples=1000, confidence=95, seed=0):
+    """
+    Average per-document scores as returned by parse_per_document_scores
+    over the documents and estimate the confidence intervals of the
+    averages by bootstrap resampling.
+
+        samples:    Number of bootstrap samples (ROUGE's -r).
+        confidence: Confidence level in percent (ROUGE's -c).
+        seed:       Seed of the random number generator used for
+                    resampling.
+
+    With NumPy, the confidence intervals of all ROUGE types are estimated
+    at once by bootstrap_score_matrix, otherwise one ROUGE type at a time
+    by bootstrap_confidence_intervals.
+
+    Yields: (system ID, ROUGE type, documents, averages) tuples, where
+            averages is a list of (measure, average, lower, upper)
+            tuples for the measures "R", "P" and "F".
+
+    """
+    if np is not None:
+        all_intervals = _matrix_intervals(
+            scores, samples, confidence, seed)
+    else:
+        rng = random.Random(seed)
+    for (sys_id, rouge_type), documents in scores.items():
+        columns = score_columns(documents)
+        if np is not None:
+            intervals = all_intervals[sys_id, rouge_type]
+        else:
+            intervals = bootstrap_confidence_intervals(
+                columns, samples, confidence, rng)
+        averages = [
+            (measure, sum(values) / len(values), lower, upper)
+            for measure, values, (lower, upper)
+            in zip("RPF", columns, intervals)]
+        yield sys_id, rouge_type, documents, averages
+
+
+def format_average_scores(scores, samples=1000, confidence=95,
+                          detailed=False, seed=0):
+    """
+    Format per-document scores as returned by parse_per_document_scores
+    like ROUGE's own output, with averages over the documents and their
+    bootstrap confidence intervals (cf. average_scores).
+
+        detailed:   Also print the per-document scores (ROUGE's -d).
+
+    Returns: ROUGE output as string.
+
+    """
+    lines = []
+    for sys_id, rouge_type, documents, averages in average_scores(
+            scores, samples, confidence, seed):
+        lines.append(GROUP_SEPARATOR)
+        for measure, average, lower, upper in averages:
+            lines.append(
+                "{} {} Average_{}: {:7.5f} ({}%-conf.int. {:7.5f} - "
+                "{:7.5f})".format(
+                    sys_id, rouge_type, measure, average,
+                    confidence, lower, upper))
+        if detailed:
+            lines.append(DETAIL_SEPARATOR)
+            for eval_id, recall, precision, f in documents:
+                lines.append(
+                    "{} {} Eval {} R:{:7.5f} P:{:7.5f} F:{:7.5f}".format(
+                        sys_id, rouge_type, eval_id, recall, precision, f))
+    lines.append(GROUP_SEPARATOR)
+    return "\n".join(lines) + "\n"
+
+
+def scores_to_dict(scores, samples=1000, confidence=95, seed=0):
+    """
+    Convert per-document scores as returned by parse_per_document_scores
+    into the dictionary Rouge155.output_to_dict would return for the
+    corresponding ROUGE output, with values rounded to the five decimals
+    ROUGE prints (cf. average_scores).
+
+    """
+    results = {}
+    for _, rouge_type, _, averages in average_scores(
+            scores, samples, confidence, seed):
+        rouge_type = rouge_type.lower().replace("-", "_")
+        for measure, average, lower, upper in averages:
+            key = "{}_{}".format(rouge_type, MEASURE_NAMES[measure])
+            results[key] = round_score(average)
+            results["{}_cb".format(key)] = round_score(lower)
+            results["{}_ce".format(key)] = round_score(upper)
+    return results
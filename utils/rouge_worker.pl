@@ -0,0 +1,232 @@
+#!/usr/bin/perl -w
+#
+# Persistent driver for ROUGE-1.5.5.pl, used by pyrouge's RougeWorkerPool.
+#
+# Usage: perl rouge_worker.pl /path/to/ROUGE-1.5.5.pl [/path/to/data]
+#
+# ROUGE-1.5.5.pl and the modules it uses (XML::DOM, DB_File, ...) are
+# compiled once when the driver starts, and the WordNet exception
+# database and the stopword list of the data directory are opened once,
+# before the first job. Afterwards the driver reads one job per line from
+# STDIN, each line holding the ROUGE command line arguments separated by
+# tabs. For every job the driver writes a header line "<exit status>
+# <number of bytes>" to STDOUT, followed by ROUGE's output.
+#
+# Jobs run one after another inside the driver process itself. They are
+# not forked, because fork is only emulated with threads on Windows,
+# where it would clone the whole interpreter for every job. Instead, all
+# package variables of ROUGE are reset to their state after compilation
+# when a job has finished, so that every job starts out like a fresh
+# ROUGE process, except that:
+#
+# - open() of a preloaded stopword list reads it from memory,
+# - tie() of a preloaded exception database read-only returns the
+#   database which is already open,
+# - exit() ends the job, not the driver.
+
+# Compile the ROUGE source in a scope without any of the driver's lexical
+# variables, so that the script cannot accidentally share them.
+sub compile_rouge {
+    eval $_[0] or die "Cannot compile ROUGE: $@";
+}
+
+use strict;
+
+use Cwd qw(abs_path);
+use Fcntl qw(O_CREAT O_RDWR O_WRONLY);
+use File::Basename qw(basename dirname);
+use File::Spec;
+use Symbol qw(gensym qualify_to_ref);
+
+# Files of ROUGE's data directory which are loaded once per driver.
+my @STOPWORD_FILES = ('smart_common_words.txt');
+my @EXCEPTION_DBS = ('WordNet-2.0.exc.db');
+
+# Absolute path => contents of the preloaded stopword lists.
+my %files;
+# Absolute path => DB_File object of the open exception databases.
+my %databases;
+
+my $rouge_path = shift @ARGV
+    or die "Usage: $0 /path/to/ROUGE-1.5.5.pl [/path/to/data]\n";
+my $data_dir = shift @ARGV;
+
+# The absolute path of a file with one of the names, by which it is
+# cached, or undef for other files.
+sub cached_path {
+    my ($path, @names) = @_;
+    return undef unless defined $path;
+    my $name = basename($path);
+    return undef unless grep { $_ eq $name } @names;
+    my $dir = abs_path(dirname($path));
+    return defined $dir ? File::Spec->catfile($dir, $name) : undef;
+}
+
+sub load_file {
+    my ($path) = @_;
+    open(my $fh, '<', $path) or return undef;
+    binmode($fh);
+    local $/;
+    $files{$path} = <$fh>;
+    close($fh);
+    return $files{$path};
+}
+
+# Replaces open() in ROUGE's code. Reads of a stopword list are served
+# from memory, everything else is passed on to the builtin.
+sub rouge_open (*;$@) {
+    $_[0] = gensym() unless defined $_[0];
+    my $fh = qualify_to_ref($_[0], 'ROUGE');
+    my (undef, $mode, @rest) = @_;
+    my $path;
+    if (@_ == 2 && defined $mode
+            && $mode !~ /^\s*[>+|]/ && $mode !~ /\|\s*\z/) {
+        ($path = $mode) =~ s/^\s*<?\s*|\s+\z//g;
+    } elsif (@_ == 3 && defined $mode && $mode =~ /^\s*<\s*\z/) {
+        $path = $rest[0];
+    }
+    $path = cached_path($path, @STOPWORD_FILES);
+    if (defined $path
+            && (exists $files{$path} || defined load_file($path))) {
+        return CORE::open($fh, '<', \$files{$path});
+    }
+    return CORE::open($fh) if @_ == 1;
+    return CORE::open($fh, $mode) if @_ == 2;
+    return CORE::open($fh, $mode, @rest);
+}
+
+sub rouge_exit (;$) {
+    die bless({status => defined $_[0] ? $_[0] : 0}, 'RougeWorker::Exit');
+}
+
+# Importing the replacements into package ROUGE before its code is
+# compiled makes them override the builtins in that package only.
+{
+    no warnings 'once';
+    *ROUGE::open = \&rouge_open;
+    *ROUGE::exit = \&rouge_exit;
+}
+
+open(my $fh, '<', $rouge_path) or die "Cannot open $rouge_path: $!\n";
+my $source = do { local $/; <$fh> };
+close($fh);
+$source =~ s/^__(?:END|DATA)__\b.*//ms;
+
+compile_rouge(
+    "package ROUGE;\nno strict;\nno warnings;\n"
+    . "sub run {\nlocal \@ARGV = \@_;\n#line 1 \"$rouge_path\"\n"
+    . $source . "\n;}\n1;\n");
+
+# Read-only ties of an exception database share one open database.
+if (defined &DB_File::TIEHASH) {
+    no warnings 'redefine';
+    my $tiehash = \&DB_File::TIEHASH;
+    *DB_File::TIEHASH = sub {
+        my (undef, $filename, $flags) = @_;
+        my $path = cached_path($filename, @EXCEPTION_DBS);
+        if (!defined $path || !defined $flags
+                || $flags & (O_CREAT | O_RDWR | O_WRONLY)) {
+            return $tiehash->(@_);
+        }
+        $databases{$path} ||= $tiehash->(@_);
+        return $databases{$path};
+    };
+}
+
+if (defined $data_dir) {
+    for my $name (@STOPWORD_FILES) {
+        my $path = cached_path("$data_dir/$name", @STOPWORD_FILES);
+        load_file($path) if defined $path;
+    }
+    if (defined &DB_File::TIEHASH) {
+        for my $name (@EXCEPTION_DBS) {
+            no warnings 'once';
+            my %db;
+            tie(%db, 'DB_File', "$data_dir/$name", Fcntl::O_RDONLY(), 0440,
+                $DB_File::DB_HASH);
+        }
+    }
+}
+
+# Values of ROUGE's package variables after compilation, which only
+# differ from a fresh process's for variables imported from modules.
+my %initial;
+
+sub package_variables {
+    my @variables;
+    no strict 'refs';
+    for my $name (keys %ROUGE::) {
+        next if $name =~ /::\z/;
+        my $glob = \$ROUGE::{$name};
+        next unless ref($glob) eq 'GLOB';
+        push @variables, [$name, $glob];
+    }
+    return @variables;
+}
+
+sub save_variables {
+    for (package_variables()) {
+        my ($name, $glob) = @$_;
+        my $array = *{$glob}{ARRAY};
+        my $hash = *{$glob}{HASH};
+        $initial{$name} = [
+            ${*{$glob}{SCALAR}},
+            $array ? [@$array] : [],
+            $hash ? {%$hash} : {}];
+    }
+}
+
+sub reset_variables {
+    no warnings 'untie';
+    for (package_variables()) {
+        my ($name, $glob) = @$_;
+        my ($scalar, $array, $hash) = @{$initial{$name} || [undef, [], {}]};
+        if (my $ref = *{$glob}{HASH}) {
+            untie(%$ref) if tied(%$ref);
+            %$ref = %$hash;
+        }
+        if (my $ref = *{$glob}{ARRAY}) {
+            untie(@$ref) if tied(@$ref);
+            @$ref = @$array;
+        }
+        my $ref = *{$glob}{SCALAR};
+        eval { $$ref = $scalar };
+    }
+}
+
+sub run_job {
+    my $output = '';
+    my $status = 0;
+    open(my $stdout, '>&', \*STDOUT) or die "Cannot save STDOUT: $!\n";
+    close(STDOUT);
+    open(STDOUT, '>', \$output) or die "Cannot redirect STDOUT: $!\n";
+    {
+        local ($/, $,, $\, $") = ($/, $,, $\, $");
+        local $0 = $rouge_path;
+        unless (eval { ROUGE::run(@_); 1 }) {
+            if (ref($@) eq 'RougeWorker::Exit') {
+                $status = $@->{status};
+            } else {
+                print STDERR $@;
+                $status = 1;
+            }
+        }
+    }
+    select(STDOUT);
+    close(STDOUT);
+    open(STDOUT, '>&', $stdout) or die "Cannot restore STDOUT: $!\n";
+    close($stdout);
+    binmode(STDOUT);
+    $| = 1;
+    reset_variables();
+    return ($status, $output);
+}
+
+save_variables();
+binmode(STDOUT);
+$| = 1;
+while (defined(my $line = <STDIN>)) {
+    $line =~ s/\r?\n\z//;
+    my ($status, $output) = run_job(split(/\t/, $line));
+    print STDOUT $status, ' ', length($output), "\n", $output;
+}
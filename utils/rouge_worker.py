@@ -0,0 +1,157 @@
+from __future__ import print_function, unicode_literals, division
+
+import os
+import threading
+
+from subprocess import CalledProcessError, PIPE, Popen
+try:
+    from queue import Queue
+except ImportError:
+    from Queue import Queue
+
+from pyrouge.utils import log
+
+
+DRIVER_PATH = os.path.join(os.path.dirname(__file__), "rouge_worker.pl")
+
+
+class RougeWorker(object):
+    """
+    A long-lived perl process running rouge_worker.pl, which compiles
+    ROUGE-1.5.5.pl once, opens the WordNet exception database and the
+    stopword list of data_dir once and then evaluates one job at a time
+    in-process.
+
+    """
+
+    def __init__(self, perl_path, rouge_path, data_dir=None):
+        self.command = [perl_path, DRIVER_PATH, rouge_path]
+        if data_dir:
+            self.command.append(data_dir)
+        self.process = Popen(self.command, stdin=PIPE, stdout=PIPE)
+
+    def run(self, options):
+        """
+        Run ROUGE with the command line options, which must not contain
+        tabs or newlines.
+
+        Returns: ROUGE output as bytes.
+
+        """
+        self.process.stdin.write(("\t".join(options) + "\n").encode("UTF-8"))
+        self.process.stdin.flush()
+        header = self.process.stdout.readline()
+        if not header:
+            raise Exception(
+                "ROUGE worker {} exited unexpectedly.".format(
+                    " ".join(self.command)))
+        status, length = header.split()
+        output = self.process.stdout.read(int(length))
+        if int(status):
+            raise CalledProcessError(
+                int(status), self.command[2:3] + options, output)
+        return output
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.wait()
+        self.process.stdout.close()
+
+    def kill(self):
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+        self.process.stdin.close()
+        self.process.stdout.close()
+
+
+class RougeWorkerPool(object):
+    """
+    A fixed number of RougeWorker processes which are reused across
+    evaluations. run() may be called from several threads at once; each
+    call waits for an idle worker.
+
+    This can be used within Python like this:
+
+    with RougeWorkerPool(4, 'perl', '/PATH/TO/ROUGE-1.5.5.pl') as pool:
+        for config_file in config_files:
+            print(pool.run(['-e', data_dir, '-a', config_file]))
+
+    """
+
+    def __init__(self, size, perl_path, rouge_path, data_dir=None):
+        self.log = log.get_global_console_logger()
+        self.size = size
+        self._perl_path = perl_path
+        self._rouge_path = rouge_path
+        self._data_dir = data_dir
+        self._idle = Queue()
+        self._workers = set()
+        self._lock = threading.Lock()
+        self._closed = False
+        for _ in range(size):
+            self._idle.put(self.__start_worker())
+        self.log.info(
+            "Started {} ROUGE workers for {}.".format(size, rouge_path))
+
+    def run(self, options):
+        """
+        Run ROUGE with the command line options on the next idle worker.
+
+        Returns: ROUGE output as bytes.
+
+        """
+        worker = self._idle.get()
+        try:
+            output = worker.run(options)
+        except BaseException:
+            # The worker may have stopped in the middle of a reply, which
+            # the next job would read as its own, so it is replaced.
+            self.__replace_worker(worker)
+            raise
+        if worker.process.poll() is not None:
+            self.__replace_worker(worker)
+        else:
+            self._idle.put(worker)
+        return output
+
+    def close(self):
+        """
+        Stop all workers. Workers which are still running a job are
+        killed.
+
+        """
+        with self._lock:
+            self._closed = True
+            workers = list(self._workers)
+            self._workers.clear()
+        idle = set()
+        while not self._idle.empty():
+            idle.add(self._idle.get())
+        for worker in workers:
+            if worker in idle:
+                worker.close()
+            else:
+                worker.kill()
+
+    def __start_worker(self):
+        worker = RougeWorker(
+            self._perl_path, self._rouge_path, self._data_dir)
+        with self._lock:
+            self._workers.add(worker)
+        return worker
+
+    def __replace_worker(self, worker):
+        with self._lock:
+            self._workers.discard(worker)
+            closed = self._closed
+        worker.kill()
+        if not closed:
+            self.log.info("Restarting ROUGE worker.")
+            self._idle.put(self.__start_worker())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
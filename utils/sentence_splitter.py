@@ -1,5 +1,7 @@
 from __future__ import print_function, unicode_literals, division
 
+from functools import partial
+
 from pyrouge.utils import log
 from pyrouge.utils.string_utils import cleanup
 from pyrouge.utils.file_utils import DirectoryProcessor
@@ -39,10 +41,40 @@ class PunktSentenceSplitter:
         text = cleanup(text)
         return self.sent_detector.tokenize(text.strip())
 
+    def split_to_string(self, text):
+        """Splits text and returns its sentences, one per line."""
+        return "\n".join(self.split(text))
+
     @staticmethod
-    def split_files(input_dir, output_dir, lang="en", punkt_data_path=None):
-        ss = PunktSentenceSplitter(lang, punkt_data_path)
-        DirectoryProcessor.process(input_dir, output_dir, ss.split)
+    def split_files(input_dir, output_dir, lang="en", punkt_data_path=None,
+                    workers=1):
+        function = split_to_string
+        if lang != "en" or punkt_data_path:
+            function = partial(
+                split_to_string, language=lang,
+                punkt_data_path=punkt_data_path)
+        DirectoryProcessor.process(input_dir, output_dir, function, workers)
+
+
+# PunktSentenceSplitter per (language, punkt_data_path), created on first
+# use in each process.
+_splitters = {}
+
+
+def split_to_string(text, language="en", punkt_data_path=None):
+    """
+    Split text with a PunktSentenceSplitter which is loaded once per
+    process, and return its sentences, one per line. Unlike the bound
+    method PunktSentenceSplitter.split_to_string, this function (and a
+    functools.partial of it) can be pickled for worker processes, which
+    then load their own splitter.
+
+    """
+    key = (language, punkt_data_path)
+    if key not in _splitters:
+        _splitters[key] = PunktSentenceSplitter(language, punkt_data_path)
+    return _splitters[key].split_to_string(text)
+
 
 if __name__ == '__main__':
     text = "Punkt knows that the periods in Mr. Smith and Johann S. Bach do "
@@ -0,0 +1,189 @@
+from __future__ import print_function, unicode_literals, division
+
+import codecs
+import gzip
+import json
+import os
+import tarfile
+import zipfile
+
+
+class SummarySource(object):
+    """
+    A collection of named summaries which are read without extracting
+    them to one file per summary, e.g. from a JSONL file or an archive.
+    The names play the role of the filenames of system_dir and model_dir,
+    so system and model filename patterns are matched against them.
+
+    """
+
+    def __str__(self):
+        return self.path
+
+    def names(self):
+        """
+        Return the names of all summaries, without keeping their texts.
+
+        """
+        return [name for name, _ in self.items()]
+
+    def items(self, names=None):
+        """
+        Yield (name, text) tuples of all summaries, or of the summaries
+        with the given names, in the order in which they are stored.
+
+        """
+        raise NotImplementedError
+
+    def read(self, names):
+        """
+        Return a dictionary mapping the given names to the texts of their
+        summaries.
+
+        """
+        return dict(self.items(names))
+
+
+class DirectorySource(SummarySource):
+    """
+    The summaries of a directory, one file per summary, named by their
+    filenames.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def names(self):
+        return sorted(
+            name for name in os.listdir(self.path)
+            if os.path.isfile(os.path.join(self.path, name)))
+
+    def items(self, names=None):
+        for name in self.names() if names is None else sorted(names):
+            with codecs.open(os.path.join(self.path, name), "r",
+                             encoding="UTF-8") as f:
+                yield name, f.read()
+
+
+class JsonlSource(SummarySource):
+    """
+    Summaries stored as JSON records, one per line, optionally gzipped.
+    A summary is named by the id_field of its record and its text is the
+    text_field. If the text_field holds a list of texts, e.g. several
+    reference summaries of a document, they are named "<id>.1",
+    "<id>.2", and so on, so that a model filename pattern like
+    "#ID#[.][0-9]+" matches them.
+
+    One file can hold both system and model summaries:
+
+    systems = JsonlSource("data.jsonl", text_field="summary")
+    models = JsonlSource("data.jsonl", text_field="references")
+
+    """
+
+    def __init__(self, path, id_field="id", text_field="text"):
+        self.path = path
+        self.id_field = id_field
+        self.text_field = text_field
+
+    def names(self):
+        return [name for name, _ in self.__records(texts=False)]
+
+    def items(self, names=None):
+        if names is not None:
+            names = set(names)
+        for name, text in self.__records():
+            if names is None or name in names:
+                yield name, text
+
+    def __records(self, texts=True):
+        if self.path.endswith(".gz"):
+            f = codecs.getreader("UTF-8")(gzip.open(self.path))
+        else:
+            f = codecs.open(self.path, "r", encoding="UTF-8")
+        with f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                doc_id = "{}".format(record[self.id_field])
+                value = record[self.text_field]
+                if not isinstance(value, list):
+                    yield doc_id, value if texts else None
+                    continue
+                for i, text in enumerate(value, start=1):
+                    yield "{}.{}".format(doc_id, i), text if texts else None
+
+
+class TarSource(SummarySource):
+    """
+    The regular files of a (compressed) tar archive, named by their
+    member names. Summaries are read in a single sequential pass over
+    the archive, so tar shards can also be read from pipes or tape-like
+    storage.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def names(self):
+        with tarfile.open(self.path, "r|*") as tar:
+            return [member.name for member in tar if member.isfile()]
+
+    def items(self, names=None):
+        if names is not None:
+            names = set(names)
+        with tarfile.open(self.path, "r|*") as tar:
+            for member in tar:
+                if not member.isfile() or \
+                        names is not None and member.name not in names:
+                    continue
+                yield member.name, \
+                    tar.extractfile(member).read().decode("UTF-8")
+
+
+class ZipSource(SummarySource):
+    """
+    The files of a zip archive, named by their member names.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def names(self):
+        with zipfile.ZipFile(self.path) as archive:
+            return [name for name in archive.namelist()
+                    if not name.endswith("/")]
+
+    def items(self, names=None):
+        if names is not None:
+            names = set(names)
+        with zipfile.ZipFile(self.path) as archive:
+            for name in archive.namelist():
+                if name.endswith("/") or \
+                        names is not None and name not in names:
+                    continue
+                yield name, archive.read(name).decode("UTF-8")
+
+
+def open_summary_source(path, **kwargs):
+    """
+    Return the SummarySource of a directory, JSONL file (.jsonl, .json,
+    .jsonl.gz), tar archive or zip archive. Keyword arguments are passed
+    on to JsonlSource.
+
+    """
+    if isinstance(path, SummarySource):
+        return path
+    if os.path.isdir(path):
+        return DirectorySource(path)
+    if path.endswith((".jsonl", ".json", ".jsonl.gz", ".json.gz")):
+        return JsonlSource(path, **kwargs)
+    if zipfile.is_zipfile(path):
+        return ZipSource(path)
+    if tarfile.is_tarfile(path):
+        return TarSource(path)
+    raise Exception("Cannot read summaries from {}.".format(path))
@@ -0,0 +1,115 @@
+from __future__ import print_function, unicode_literals, division
+
+import os
+import shutil
+import tempfile
+
+
+# Directories backed by RAM, tried in this order.
+RAM_DIRS = ["/dev/shm"]
+# Minimum free space of a RAM directory for it to be used, so that
+# small ones (e.g. the 64 MB /dev/shm of a Docker container) are not
+# filled up.
+MIN_RAM_DIR_FREE_BYTES = 1 << 28
+
+
+def ram_dir(min_free_bytes=MIN_RAM_DIR_FREE_BYTES):
+    """
+    Return a writable RAM-backed directory with at least min_free_bytes
+    of free space, or None if there is none.
+
+    """
+    for path in RAM_DIRS:
+        if not (os.path.isdir(path) and os.access(path, os.W_OK)):
+            continue
+        try:
+            stat = os.statvfs(path)
+        except (AttributeError, OSError):
+            continue
+        if stat.f_bavail * stat.f_frsize >= min_free_bytes:
+            return path
+    return None
+
+
+class Workspace(object):
+    """
+    A private temporary directory for the files pyrouge generates, such
+    as converted summaries and ROUGE configuration files, which are
+    written once and read by ROUGE shortly afterwards. It is placed in a
+    RAM-backed directory such as /dev/shm if there is one, so those
+    files never touch the disk, and it is removed with everything in it
+    when the workspace is closed. Directories which may not fit into RAM
+    can be put on disk instead (cf. mkdtemp).
+
+    with Workspace() as workspace:
+        config_file = os.path.join(workspace.path, "rouge_conf.xml")
+        ...
+
+    """
+
+    def __init__(self, parent=None, prefix="pyrouge_", use_ram=True):
+        """
+            parent:     Directory to create the workspace in. By default
+                        a RAM-backed directory if use_ram is set and one
+                        is available (cf. ram_dir), otherwise the
+                        default temporary directory.
+
+        """
+        if parent is None and use_ram:
+            parent = ram_dir()
+        self.in_ram = parent is not None and parent in RAM_DIRS
+        self.prefix = prefix
+        self.path = tempfile.mkdtemp(prefix=prefix, dir=parent)
+        self._disk_path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def closed(self):
+        return self.path is None
+
+    def mkdtemp(self, prefix="tmp", on_disk=False):
+        """
+        Create a new directory in the workspace and return its path.
+
+            on_disk:    Create the directory in the default temporary
+                        directory even if the workspace is in RAM, e.g.
+                        after writing to RAM failed with ENOSPC. It is
+                        still removed when the workspace is closed.
+
+        """
+        if self.closed:
+            raise Exception("The workspace has been closed.")
+        parent = self.path
+        if on_disk and self.in_ram:
+            if self._disk_path is None:
+                self._disk_path = tempfile.mkdtemp(prefix=self.prefix)
+            parent = self._disk_path
+        return tempfile.mkdtemp(prefix=prefix, dir=parent)
+
+    def contains(self, path):
+        """
+        Return whether path lies in the workspace, including the
+        directories created on disk by mkdtemp.
+
+        """
+        if path is None or self.closed:
+            return False
+        path = os.path.abspath(path)
+        return any(
+            root is not None and path.startswith(os.path.join(root, ""))
+            for root in (os.path.abspath(self.path), self._disk_path))
+
+    def close(self):
+        """
+        Remove the workspace and all files in it.
+
+        """
+        for path in (self.path, self._disk_path):
+            if path is not None:
+                shutil.rmtree(path, ignore_errors=True)
+        self.path = self._disk_path = None